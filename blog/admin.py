@@ -3,7 +3,56 @@ from django.contrib.auth.models import User, Group  # Модели пользо
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin  # Базовый класс админки пользователей
 from django.utils import timezone  # Утилиты для работы с временем
 from django.utils.html import format_html  # Утилита для безопасного форматирования HTML
-from .models import Post, Comment, UserProfile, Category, Notification, SiteSettings  # Модели приложения blog
+from django.db.models import Count, OuterRef, Subquery  # Подзапросы для счетчиков в списках
+from django.db.models.functions import Coalesce  # Ноль вместо NULL, если связанных строк нет
+from .models import Post, Comment, UserProfile, Category, Notification, SiteSettings, Tag, PostTag  # Модели приложения blog
+from .auth import invalidate_principal  # Сброс кэшированного принципала пользователя
+from .paginators import EstimatedCountPaginator  # Пагинация больших таблиц без точного COUNT(*)
+from .tasks import enqueue, fan_out_posts, recount_author_stats  # Пересчет счетчиков авторов и рассылка по лентам после массовых изменений
+
+def related_count(queryset, field):
+    """Коррелированный подзапрос-счетчик: выполняется только для строк текущей страницы"""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+# Фильтр по имени пользователя: поле ввода вместо списка всех пользователей
+class UsernameFilter(admin.SimpleListFilter):  # Базовый фильтр, подклассы задают field_path
+    template = 'admin/blog/input_filter.html'  # Шаблон с полем ввода
+    title = 'user'  # Заголовок фильтра
+    parameter_name = 'username'  # Параметр строки запроса
+    field_path = 'user'  # Внешний ключ на пользователя
+    placeholder = 'username'  # Подсказка в поле ввода
+
+    def lookups(self, request, model_admin):  # Варианты не перечисляются - в этом весь смысл
+        return ()
+
+    def has_output(self):  # Фильтр показывается и без вариантов
+        return True
+
+    def queryset(self, request, queryset):  # Точное совпадение по уникальному индексу username
+        if self.value():
+            return queryset.filter(**{f'{self.field_path}__username': self.value().strip()})
+        return queryset
+
+    def choices(self, changelist):  # Ссылка "All" и остальные параметры для формы
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'All',
+            'hidden_params': [(key, value) for key, value in changelist.params.items() if key not in (self.parameter_name, 'p')],
+        }
+
+# Фильтр постов и комментариев по автору
+class AuthorFilter(UsernameFilter):
+    title = 'author'  # Заголовок фильтра
+    parameter_name = 'author_username'  # Параметр строки запроса
+    field_path = 'author'  # Внешний ключ на автора
+
+# Фильтр уведомлений по получателю
+class RecipientFilter(UsernameFilter):
+    title = 'user'  # Заголовок фильтра
+    parameter_name = 'user_username'  # Параметр строки запроса
+    field_path = 'user'  # Внешний ключ на получателя
 
 # Inline форма для отображения профиля пользователя в админке пользователя
 class UserProfileInline(admin.StackedInline):  # Inline форма для встроенного редактирования профиля
@@ -18,8 +67,11 @@ class UserAdmin(BaseUserAdmin):  # Кастомная админ-панель д
     inlines = [UserProfileInline]  # Включаем inline форму профиля
     list_display = ['username', 'email', 'first_name', 'last_name', 'is_staff', 'is_active', 'get_banned_status', 'date_joined']  # Колонки в списке пользователей
     list_filter = ['is_staff', 'is_superuser', 'is_active', 'profile__is_banned', 'date_joined']  # Фильтры в боковой панели
+    list_select_related = ['profile']  # Профиль одним JOIN вместо запроса на строку
     search_fields = ['username', 'email', 'first_name', 'last_name']  # Поля для поиска
     actions = ['ban_users', 'unban_users', 'activate_users', 'deactivate_users']  # Действия над выбранными пользователями
+    paginator = EstimatedCountPaginator  # Оценка числа строк вместо COUNT(*)
+    show_full_result_count = False  # Без второго COUNT(*) по всей таблице при поиске
     
     def get_banned_status(self, obj):  # Метод для получения статуса блокировки
         try:
@@ -30,75 +82,133 @@ class UserAdmin(BaseUserAdmin):  # Кастомная админ-панель д
     get_banned_status.boolean = True  # Отображать как иконку boolean (зеленая/красная)
 
     def ban_users(self, request, queryset):  # Действие блокировки пользователей
-        for user in queryset:  # Перебираем выбранных пользователей
-            profile, created = UserProfile.objects.get_or_create(user=user)  # Создаем или получаем профиль пользователя
-            profile.is_banned = True  # Устанавливаем флаг блокировки
-            profile.ban_reason = "Banned by admin"  # Устанавливаем причину блокировки
-            profile.save()  # Сохраняем изменения
-        self.message_user(request, f"{queryset.count()} users have been banned.")  # Показываем сообщение о результате
+        updated = UserProfile.ban_users(queryset.values_list('pk', flat=True), reason="Banned by admin")  # Один UPDATE для всех выбранных
+        self.message_user(request, f"{updated} users have been banned.")  # Показываем сообщение о результате
     ban_users.short_description = "Ban selected users"  # Описание действия в админке
 
     def unban_users(self, request, queryset):  # Действие разблокировки пользователей
-        for user in queryset:  # Перебираем выбранных пользователей
-            profile, created = UserProfile.objects.get_or_create(user=user)  # Создаем или получаем профиль
-            profile.is_banned = False  # Снимаем флаг блокировки
-            profile.ban_reason = ""  # Очищаем причину блокировки
-            profile.ban_expires = None  # Сбрасываем время истечения блокировки
-            profile.save()  # Сохраняем изменения
-        self.message_user(request, f"{queryset.count()} users have been unbanned.")  # Сообщение о результате
+        updated = UserProfile.unban_users(queryset.values_list('pk', flat=True))  # Один UPDATE для всех выбранных
+        self.message_user(request, f"{updated} users have been unbanned.")  # Сообщение о результате
     unban_users.short_description = "Unban selected users"  # Описание действия
 
+    def set_active(self, queryset, is_active):  # Один UPDATE для всех выбранных; update() не отправляет post_save
+        user_ids = list(queryset.exclude(is_active=is_active).values_list('pk', flat=True))  # Только те, кто действительно меняется
+        updated = User.objects.filter(pk__in=user_ids).update(is_active=is_active)
+        invalidate_principal(*user_ids)  # Иначе JWT деактивированного принимается до истечения кэша
+        return updated
+
+    def activate_users(self, request, queryset):  # Действие активации пользователей
+        updated = self.set_active(queryset, True)
+        self.message_user(request, f"{updated} users have been activated.")  # Сообщение о результате
+    activate_users.short_description = "Activate selected users"  # Описание действия
+
+    def deactivate_users(self, request, queryset):  # Действие деактивации пользователей
+        updated = self.set_active(queryset.exclude(pk=request.user.pk), False)  # Себя не деактивируем
+        self.message_user(request, f"{updated} users have been deactivated.")  # Сообщение о результате
+    deactivate_users.short_description = "Deactivate selected users"  # Описание действия
+
 # Админ-панель для категорий
 class CategoryAdmin(admin.ModelAdmin):  # Класс админки для модели Category
     list_display = ['name', 'color_display', 'post_count', 'created_date']  # Колонки в списке категорий
     list_filter = ['created_date']  # Фильтр по дате создания
     search_fields = ['name', 'description']  # Поиск по названию и описанию
     
+    def get_queryset(self, request):  # Число постов считается в запросе списка
+        return super().get_queryset(request).annotate(_post_count=related_count(Post.objects.all(), 'category'))
+    
     def color_display(self, obj):  # Метод для отображения цвета категории
         return format_html('<span style="display: inline-block; width: 20px; height: 20px; background-color: {}; border: 1px solid #555;"></span> {}', obj.color, obj.color)  # HTML для отображения цветного квадратика
     color_display.short_description = 'Color'  # Название колонки
     
     def post_count(self, obj):  # Метод подсчета постов в категории
-        return obj.posts.count()  # Количество связанных постов
+        return obj._post_count  # Значение из аннотации запроса
     post_count.short_description = 'Posts'  # Название колонки
+    post_count.admin_order_field = '_post_count'  # Сортировка по аннотации
+
+# Админ-панель для тегов
+class TagAdmin(admin.ModelAdmin):  # Класс админки для модели Tag
+    list_display = ['name', 'slug', 'post_count']  # Колонки в списке тегов
+    search_fields = ['name', 'slug']  # Поиск по названию и slug
+    ordering = ['-post_count', 'name']  # Сначала популярные (индекс blog_tag_cloud_idx)
+    readonly_fields = ['post_count']  # Счетчик поддерживается автоматически
 
 # Админ-панель для постов
 class PostAdmin(admin.ModelAdmin):  # Класс админки для модели Post
-    list_display = ['title', 'author', 'category', 'status', 'published_date', 'view_count', 'like_count', 'comment_count']  # Колонки в списке постов
-    list_filter = ['status', 'category', 'created_date', 'published_date', 'author']  # Фильтры по статусу, категории, датам и автору
+    list_display = ['title', 'author', 'category', 'status', 'publish_at', 'published_date', 'view_count', 'like_count', 'comment_count']  # Колонки в списке постов
+    list_filter = ['status', 'category', 'created_date', 'published_date', AuthorFilter]  # Фильтры по статусу, категории, датам и автору
+    list_select_related = ['author', 'category']  # Автор и категория одним JOIN
     search_fields = ['title', 'content', 'excerpt', 'tags']  # Поиск по заголовку, содержимому, описанию и тегам
     list_editable = ['status']  # Поле статуса редактируется прямо в списке
     readonly_fields = ['views', 'created_date', 'updated_date', 'published_date']  # Поля только для чтения
     prepopulated_fields = {'slug': ['title']}  # Автоматическая генерация slug из заголовка
     date_hierarchy = 'published_date'  # Иерархический фильтр по дате публикации
-    filter_horizontal = ['likes']  # Горизонтальный фильтр для лайков
+    autocomplete_fields = ['author', 'category', 'likes']  # Поиск по мере ввода вместо списка всех пользователей
     actions = ['publish_posts', 'unpublish_posts', 'archive_posts']  # Действия над постами
+    paginator = EstimatedCountPaginator  # Оценка числа строк вместо COUNT(*)
+    show_full_result_count = False  # Без второго COUNT(*) по всей таблице при фильтрации
+    
+    def get_queryset(self, request):  # Счетчики считаются подзапросами только для строк страницы
+        return super().get_queryset(request).annotate(
+            _like_count=related_count(Post.likes.through.objects.all(), 'post'),
+            _comment_count=related_count(Comment.objects.filter(is_active=True), 'post'),
+        )
     
     def view_count(self, obj):  # Метод отображения количества просмотров
         return obj.views  # Возвращаем количество просмотров
     view_count.short_description = 'Views'  # Название колонки
     
     def like_count(self, obj):  # Метод отображения количества лайков
-        return obj.like_count()  # Вызываем метод модели для подсчета лайков
+        return obj._like_count  # Значение из аннотации запроса
     like_count.short_description = 'Likes'  # Название колонки
+    like_count.admin_order_field = '_like_count'  # Сортировка по аннотации
     
     def comment_count(self, obj):  # Метод отображения количества комментариев
-        return obj.comment_count()  # Вызываем метод модели для подсчета комментариев
+        return obj._comment_count  # Значение из аннотации запроса
     comment_count.short_description = 'Comments'  # Название колонки
+    comment_count.admin_order_field = '_comment_count'  # Сортировка по аннотации
+    
+    def set_status(self, queryset, **fields):  # Массовая смена статуса с пересчетом счетчиков тегов и авторов
+        post_ids = list(queryset.values_list('pk', flat=True))  # Выбранные посты (не больше страницы)
+        updated = Post.objects.filter(pk__in=post_ids).update(**fields)  # Один UPDATE, сигналы post_save не отправляются
+        Tag.recount(set(PostTag.objects.filter(post_id__in=post_ids).values_list('tag_id', flat=True)))  # Поэтому теги пересчитываем сами
+        enqueue(recount_author_stats, post_ids=post_ids)  # И счетчики авторов (после коммита)
+        return updated
     
     def publish_posts(self, request, queryset):  # Действие публикации постов
-        updated = queryset.update(status='published', published_date=timezone.now())  # Обновляем статус и дату публикации
+        post_ids = list(queryset.exclude(status='published').values_list('pk', flat=True))  # Впервые публикуемые - в ленты подписчиков
+        updated = self.set_status(queryset, status='published', published_date=timezone.now())  # Обновляем статус и дату публикации
+        enqueue(fan_out_posts, post_ids)
         self.message_user(request, f"{updated} posts have been published.")  # Сообщение о результате
     publish_posts.short_description = "Publish selected posts"  # Описание действия
+    
+    def unpublish_posts(self, request, queryset):  # Действие снятия постов с публикации
+        updated = self.set_status(queryset, status='draft')  # Возвращаем в черновики
+        self.message_user(request, f"{updated} posts have been unpublished.")  # Сообщение о результате
+    unpublish_posts.short_description = "Unpublish selected posts"  # Описание действия
+    
+    def archive_posts(self, request, queryset):  # Действие архивации постов
+        updated = self.set_status(queryset, status='archived')  # Переводим в архив
+        self.message_user(request, f"{updated} posts have been archived.")  # Сообщение о результате
+    archive_posts.short_description = "Archive selected posts"  # Описание действия
 
 # Админ-панель для комментариев
 class CommentAdmin(admin.ModelAdmin):  # Класс админки для модели Comment
-    list_display = ['author', 'post_preview', 'text_preview', 'is_active', 'created_date', 'like_count', 'reply_count']  # Колонки в списке комментариев
-    list_filter = ['is_active', 'created_date', 'post__category']  # Фильтры по активности, дате и категории поста
+    list_display = ['author', 'post_preview', 'text_preview', 'status', 'created_date', 'like_count', 'reply_count']  # Колонки в списке комментариев
+    list_filter = ['status', 'created_date', 'post__category', AuthorFilter]  # Фильтры по состоянию модерации, дате, категории поста и автору
+    list_select_related = ['author', 'post']  # Автор и пост одним JOIN вместо запроса на строку
     search_fields = ['text', 'author__username', 'post__title']  # Поиск по тексту, автору и заголовку поста
-    list_editable = ['is_active']  # Поле активности редактируется в списке
     readonly_fields = ['created_date', 'updated_date']  # Поля только для чтения
-    actions = ['activate_comments', 'deactivate_comments']  # Действия активации/деактивации комментариев
+    autocomplete_fields = ['post', 'author', 'parent', 'likes']  # Поиск по мере ввода вместо выпадающих списков
+    actions = ['approve_comments', 'reject_comments']  # Массовая модерация одним UPDATE
+    ordering = ['-pk']  # Порядок создания по первичному ключу - без сортировки всей таблицы
+    paginator = EstimatedCountPaginator  # Оценка числа строк вместо COUNT(*)
+    show_full_result_count = False  # Без второго COUNT(*) по всей таблице при фильтрации
+    
+    def get_queryset(self, request):  # Счетчики считаются подзапросами только для строк страницы
+        return super().get_queryset(request).annotate(
+            _like_count=related_count(Comment.likes.through.objects.all(), 'comment'),
+            _reply_count=related_count(Comment.objects.filter(is_active=True), 'parent'),
+        )
     
     def post_preview(self, obj):  # Превью поста для комментария
         return obj.post.title[:50] + '...' if len(obj.post.title) > 50 else obj.post.title  # Обрезаем длинные заголовки
@@ -109,29 +219,51 @@ class CommentAdmin(admin.ModelAdmin):  # Класс админки для мод
     text_preview.short_description = 'Comment'  # Название колонки
     
     def like_count(self, obj):  # Количество лайков комментария
-        return obj.like_count()  # Вызываем метод модели
+        return obj._like_count  # Значение из аннотации запроса
     like_count.short_description = 'Likes'  # Название колонки
+    like_count.admin_order_field = '_like_count'  # Сортировка по аннотации
     
     def reply_count(self, obj):  # Количество ответов на комментарий
-        return obj.reply_count()  # Вызываем метод модели
+        return obj._reply_count  # Значение из аннотации запроса
     reply_count.short_description = 'Replies'  # Название колонки
+    reply_count.admin_order_field = '_reply_count'  # Сортировка по аннотации
+    
+    def approve_comments(self, request, queryset):  # Действие одобрения комментариев
+        approved = Comment.approve(queryset.values_list('pk', flat=True))  # Один UPDATE, уведомления авторам в Celery
+        self.message_user(request, f"{approved} comments have been approved.")  # Сообщение о результате
+    approve_comments.short_description = "Approve selected comments"  # Описание действия
     
-    def activate_comments(self, request, queryset):  # Действие активации комментариев
-        updated = queryset.update(is_active=True)  # Обновляем поле активности
-        self.message_user(request, f"{updated} comments have been activated.")  # Сообщение о результате
-    activate_comments.short_description = "Activate selected comments"  # Описание действия
+    def reject_comments(self, request, queryset):  # Действие отклонения комментариев
+        rejected = Comment.reject(queryset.values_list('pk', flat=True))  # Один UPDATE
+        self.message_user(request, f"{rejected} comments have been rejected.")  # Сообщение о результате
+    reject_comments.short_description = "Reject selected comments"  # Описание действия
 
 # Админ-панель для уведомлений
 class NotificationAdmin(admin.ModelAdmin):  # Класс админки для модели Notification
     list_display = ['user', 'notification_type', 'title_preview', 'is_read', 'created_date']  # Колонки в списке уведомлений
-    list_filter = ['notification_type', 'is_read', 'created_date']  # Фильтры по типу, статусу и дате
+    list_filter = ['notification_type', 'is_read', 'created_date', RecipientFilter]  # Фильтры по типу, статусу, дате и получателю
+    list_select_related = ['user']  # Получатель одним JOIN вместо запроса на строку
     search_fields = ['title', 'message', 'user__username']  # Поиск по заголовку, сообщению и пользователю
     readonly_fields = ['created_date']  # Поля только для чтения
+    autocomplete_fields = ['user', 'related_post', 'related_comment']  # Поиск по мере ввода вместо выпадающих списков
     actions = ['mark_as_read', 'mark_as_unread']  # Действия для отметки прочитанности
+    ordering = ['-pk']  # Порядок создания по первичному ключу - без сортировки всей таблицы
+    paginator = EstimatedCountPaginator  # Оценка числа строк вместо COUNT(*)
+    show_full_result_count = False  # Без второго COUNT(*) по всей таблице при фильтрации
     
     def title_preview(self, obj):  # Превью заголовка уведомления
         return obj.title[:50] + '...' if len(obj.title) > 50 else obj.title  # Обрезаем длинные заголовки
     title_preview.short_description = 'Title'  # Название колонки
+    
+    def mark_as_read(self, request, queryset):  # Действие отметки уведомлений прочитанными
+        updated = queryset.filter(is_read=False).update(is_read=True)  # Один UPDATE только для непрочитанных
+        self.message_user(request, f"{updated} notifications have been marked as read.")  # Сообщение о результате
+    mark_as_read.short_description = "Mark selected notifications as read"  # Описание действия
+    
+    def mark_as_unread(self, request, queryset):  # Действие отметки уведомлений непрочитанными
+        updated = queryset.filter(is_read=True).update(is_read=False)  # Один UPDATE только для прочитанных
+        self.message_user(request, f"{updated} notifications have been marked as unread.")  # Сообщение о результате
+    mark_as_unread.short_description = "Mark selected notifications as unread"  # Описание действия
 
 # Админ-панель для настроек сайта (Singleton)
 class SiteSettingsAdmin(admin.ModelAdmin):  # Класс админки для модели SiteSettings
@@ -147,6 +279,7 @@ admin.site.unregister(Group)  # Удаляем стандартную админ
 # Регистрируем кастомные админки
 admin.site.register(User, UserAdmin)  # Регистрируем кастомную админку пользователей
 admin.site.register(Category, CategoryAdmin)  # Регистрируем админку категорий
+admin.site.register(Tag, TagAdmin)  # Регистрируем админку тегов
 admin.site.register(Post, PostAdmin)  # Регистрируем админку постов
 admin.site.register(Comment, CommentAdmin)  # Регистрируем админку комментариев
 admin.site.register(Notification, NotificationAdmin)  # Регистрируем админку уведомлений
@@ -0,0 +1,26 @@
+# JWT аутентификация с кэшированным принципалом пользователя
+from django.utils.translation import gettext_lazy as _  # Импортируем функцию перевода сообщений
+from rest_framework_simplejwt.authentication import JWTAuthentication  # Импортируем стандартную JWT аутентификацию
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken  # Импортируем исключения аутентификации
+from rest_framework_simplejwt.settings import api_settings  # Импортируем настройки Simple JWT
+
+from blog.auth import CachedPrincipalUser, get_principal  # Кэшированный принципал пользователя
+
+
+# Аутентификация по JWT без загрузки строки User на каждом запросе
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):  # Метод получения пользователя по проверенному токену
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)  # Проверка хэша пароля требует строку User
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]  # Идентификатор пользователя из токена
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        principal = get_principal(user_id)  # Данные из кэша (запрос к БД только при промахе)
+        if principal is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not principal['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return CachedPrincipalUser(principal)
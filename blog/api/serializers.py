@@ -1,6 +1,11 @@
+import os  # Импортируем os для разбора имени файла
 from rest_framework import serializers  # Импортируем модуль serializers из Django REST Framework
+from django.core.exceptions import ValidationError as DjangoValidationError  # Импортируем ошибку валидации модели
 from django.contrib.auth.models import User  # Импортируем модель пользователя Django
-from blog.models import Post, Comment, Category, UserProfile, Notification  # Импортируем модели нашего приложения
+from blog.models import Post, Comment, Category, UserProfile, Notification, NotificationArchive, ChunkedUpload, Tag, RelatedPost, PostRevision  # Импортируем модели нашего приложения
+from blog.images import variant_urls  # URL уменьшенных копий изображений
+from blog.forms import UploadImageField  # Поле изображения с проверкой по заголовку
+from blog.uploads import CHUNKED_UPLOAD_CHUNK_SIZE, CHUNKED_UPLOAD_MAX_SIZE, IMAGE_UPLOAD_CONTENT_TYPES, IMAGE_UPLOAD_EXTENSIONS  # Ограничения загрузок
 
 # Сериализатор для модели Category
 class CategorySerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели Category
@@ -10,14 +15,27 @@ class CategorySerializer(serializers.ModelSerializer):  # Базовый сер
         model = Category  # Модель для сериализации
         fields = ['id', 'name', 'description', 'color', 'created_date', 'post_count']  # Поля для включения в сериализацию
 
+# Сериализатор для модели Tag
+class TagSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели Tag
+    class Meta:  # Метакласс с настройками сериализатора
+        model = Tag  # Модель для сериализации
+        fields = ['id', 'name', 'slug', 'post_count']  # post_count - число опубликованных постов с тегом
+
 # Сериализатор для модели User
 class UserSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели User
     profile = serializers.SerializerMethodField()  # Дополнительное поле для профиля пользователя (кастомный метод)
-    post_count = serializers.IntegerField(read_only=True)  # Дополнительное поле для количества постов пользователя
+    post_count = serializers.IntegerField(read_only=True)  # Опубликованных постов (аннотация из AuthorStats, иначе поле не выводится)
+    comment_count = serializers.IntegerField(read_only=True)  # Видимых комментариев пользователя
+    likes_received = serializers.IntegerField(read_only=True)  # Лайков на постах пользователя
+    views_received = serializers.IntegerField(read_only=True)  # Просмотров постов пользователя
+    follower_count = serializers.IntegerField(read_only=True)  # Подписчиков пользователя
     
     class Meta:  # Метакласс с настройками сериализатора
         model = User  # Модель для сериализации
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'date_joined', 'profile', 'post_count']  # Включаемые поля
+        fields = [
+            'id', 'username', 'email', 'first_name', 'last_name', 'date_joined', 'profile',
+            'post_count', 'comment_count', 'likes_received', 'views_received', 'follower_count',
+        ]  # Включаемые поля
     
     def get_profile(self, obj):  # Метод для получения данных профиля пользователя
         try:  # Пытаемся получить профиль пользователя
@@ -26,7 +44,8 @@ class UserSerializer(serializers.ModelSerializer):  # Базовый сериа
                 'bio': profile.bio,  # Биография пользователя
                 'location': profile.location,  # Местоположение пользователя
                 'website': profile.website,  # Веб-сайт пользователя
-                'avatar': profile.avatar.url if profile.avatar else None,  # URL аватара (если есть)
+                'avatar': profile.avatar_small_url,  # URL уменьшенного аватара (оригинал, пока копии не готовы)
+                'avatar_variants': variant_urls(profile.avatar, profile.avatar_variants),  # Все размеры аватара
                 'email_verified': profile.email_verified  # Статус верификации email
             }
         except UserProfile.DoesNotExist:  # Если профиль не существует
@@ -35,6 +54,7 @@ class UserSerializer(serializers.ModelSerializer):  # Базовый сериа
 # Сериализатор для модели UserProfile
 class UserProfileSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели UserProfile
     user = UserSerializer(read_only=True)  # Поле user с вложенным сериализатором User (только для чтения)
+    avatar = serializers.ImageField(required=False, allow_null=True, _DjangoImageField=UploadImageField)  # Аватар (проверка по заголовку)
     
     class Meta:  # Метакласс с настройками сериализатора
         model = UserProfile  # Модель для сериализации
@@ -48,14 +68,23 @@ class CommentSerializer(serializers.ModelSerializer):  # Базовый сери
     
     class Meta:  # Метакласс с настройками сериализатора
         model = Comment  # Модель для сериализации
-        fields = ['id', 'post', 'author', 'parent', 'text', 'created_date', 'updated_date', 'is_active', 'likes', 'like_count', 'replies']  # Включаемые поля
-        read_only_fields = ['author', 'created_date', 'updated_date', 'likes']  # Поля только для чтения (не редактируются)
+        fields = ['id', 'post', 'author', 'parent', 'text', 'created_date', 'updated_date', 'is_active', 'status', 'likes', 'like_count', 'replies']  # Включаемые поля
+        read_only_fields = ['author', 'created_date', 'updated_date', 'is_active', 'status', 'likes']  # Поля только для чтения (видимость меняет только модерация)
     
     def get_replies(self, obj):  # Метод для получения ответов на комментарий
         if obj.replies.exists():  # Проверяем, есть ли ответы на этот комментарий
             return CommentSerializer(obj.replies.filter(is_active=True), many=True).data  # Сериализуем ответы рекурсивно
         return []  # Возвращаем пустой список, если ответов нет
 
+# Сериализатор комментария в очереди модерации (плоский, без вложенных запросов)
+class ModerationCommentSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели Comment
+    author = serializers.CharField(source='author.username', read_only=True)  # Имя автора (author загружен select_related)
+    post_title = serializers.CharField(source='post.title', read_only=True)  # Заголовок поста (post загружен select_related)
+
+    class Meta:  # Метакласс с настройками сериализатора
+        model = Comment  # Модель для сериализации
+        fields = ['id', 'post', 'post_title', 'parent', 'author', 'text', 'created_date', 'status']  # Включаемые поля
+
 # Сериализатор для модели Post (полная версия)
 class PostSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели Post
     author = UserSerializer(read_only=True)  # Поле author с вложенным сериализатором User (только для чтения)
@@ -63,32 +92,122 @@ class PostSerializer(serializers.ModelSerializer):  # Базовый сериа
     comments = serializers.SerializerMethodField()  # Дополнительное поле для комментариев к посту
     like_count = serializers.IntegerField(read_only=True)  # Дополнительное поле для количества лайков поста
     comment_count = serializers.IntegerField(read_only=True)  # Дополнительное поле для количества комментариев к посту
+    image_variants = serializers.SerializerMethodField()  # URL уменьшенных копий изображения
+    image_blurhash = serializers.SerializerMethodField()  # Blurhash плейсхолдер изображения
+    image = serializers.ImageField(required=False, allow_null=True, _DjangoImageField=UploadImageField)  # Изображение (проверка по заголовку)
+    content_html = serializers.CharField(source='rendered.html', read_only=True)  # Готовый безопасный HTML содержимого
+    toc = serializers.ListField(source='rendered.toc', read_only=True)  # Оглавление по заголовкам содержимого
+    word_count = serializers.IntegerField(source='rendered.word_count', read_only=True)  # Число слов
+    reading_time = serializers.IntegerField(source='rendered.reading_time', read_only=True)  # Время чтения в минутах
     
     class Meta:  # Метакласс с настройками сериализатора
         model = Post  # Модель для сериализации
-        fields = ['id', 'title', 'slug', 'content', 'excerpt', 'author', 'category', 'status', 'created_date', 'published_date', 'updated_date', 'image', 'views', 'likes', 'tags', 'like_count', 'comment_count', 'comments']  # Включаемые поля
+        fields = ['id', 'title', 'slug', 'content', 'content_html', 'toc', 'word_count', 'reading_time', 'excerpt', 'author', 'category', 'status', 'publish_at', 'created_date', 'published_date', 'updated_date', 'image', 'image_variants', 'image_blurhash', 'views', 'likes', 'tags', 'like_count', 'comment_count', 'comments']  # Включаемые поля
         read_only_fields = ['author', 'created_date', 'published_date', 'updated_date', 'views', 'likes']  # Поля только для чтения
     
+    def validate(self, data):  # Проверка отложенной публикации (та же, что Post.clean() в формах)
+        post = Post(
+            status=data.get('status', getattr(self.instance, 'status', 'draft')),
+            publish_at=data.get('publish_at', getattr(self.instance, 'publish_at', None)),
+        )
+        try:
+            post.clean()
+        except DjangoValidationError as error:
+            raise serializers.ValidationError({'publish_at': error.messages})
+        return data
+
     def get_comments(self, obj):  # Метод для получения комментариев к посту
         comments = obj.comments.filter(is_active=True, parent=None).order_by('-created_date')[:5]  # Получаем 5 последних активных комментариев без родителя
         return CommentSerializer(comments, many=True).data  # Сериализуем комментарии и возвращаем данные
 
+    def get_image_variants(self, obj):  # Метод для получения URL уменьшенных копий изображения
+        return variant_urls(obj.image, obj.image_variants)
+
+    def get_image_blurhash(self, obj):  # Метод для получения blurhash плейсхолдера
+        return obj.image_variants.get('blurhash') if obj.image else None
+
 # Сериализатор для модели Post (сокращенная версия для списков)
 class PostListSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели Post (оптимизированный для списков)
     author = UserSerializer(read_only=True)  # Поле author с вложенным сериализатором User (только для чтения)
     category = CategorySerializer(read_only=True)  # Поле category с вложенным сериализатором Category (только для чтения)
     like_count = serializers.IntegerField(read_only=True)  # Дополнительное поле для количества лайков поста
     comment_count = serializers.IntegerField(read_only=True)  # Дополнительное поле для количества комментариев к посту
+    thumbnail = serializers.SerializerMethodField()  # URL уменьшенной копии изображения для списков
+    image_blurhash = serializers.SerializerMethodField()  # Blurhash плейсхолдер изображения
     
     class Meta:  # Метакласс с настройками сериализатора
         model = Post  # Модель для сериализации
-        fields = ['id', 'title', 'slug', 'excerpt', 'author', 'category', 'status', 'created_date', 'published_date', 'image', 'views', 'likes', 'tags', 'like_count', 'comment_count']  # Включаемые поля (без полного content и comments для оптимизации)
+        fields = ['id', 'title', 'slug', 'excerpt', 'author', 'category', 'status', 'created_date', 'published_date', 'image', 'thumbnail', 'image_blurhash', 'views', 'likes', 'tags', 'like_count', 'comment_count']  # Включаемые поля (без полного content и comments для оптимизации)
+
+    def get_thumbnail(self, obj):  # Метод для получения URL уменьшенной копии (WebP, иначе оригинал)
+        return obj.thumbnail_webp_url
+
+    def get_image_blurhash(self, obj):  # Метод для получения blurhash плейсхолдера
+        return obj.image_variants.get('blurhash') if obj.image else None
+
+# Сериализатор для загрузки изображения по частям
+class ChunkedUploadSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели ChunkedUpload
+    chunk_size = serializers.SerializerMethodField()  # Максимальный размер одной части
+
+    class Meta:  # Метакласс с настройками сериализатора
+        model = ChunkedUpload  # Модель для сериализации
+        fields = ['id', 'filename', 'content_type', 'size', 'offset', 'status', 'chunk_size', 'created_at', 'updated_at']  # Включаемые поля
+        read_only_fields = ['offset', 'status', 'created_at', 'updated_at']  # Поля только для чтения
+
+    def get_chunk_size(self, obj):  # Метод для получения размера части
+        return CHUNKED_UPLOAD_CHUNK_SIZE
+
+    def validate_filename(self, value):  # Проверка расширения файла до начала загрузки
+        if os.path.splitext(value)[1].lower() not in IMAGE_UPLOAD_EXTENSIONS:
+            raise serializers.ValidationError('Допустимы только файлы с расширением .jpg, .jpeg, .png, .gif или .webp.')
+        return value
+
+    def validate_content_type(self, value):  # Проверка типа файла до начала загрузки
+        if value not in IMAGE_UPLOAD_CONTENT_TYPES:
+            raise serializers.ValidationError('Допустимы только изображения JPEG, PNG, GIF или WebP.')
+        return value
+
+    def validate_size(self, value):  # Проверка размера файла до начала загрузки
+        if value <= 0 or value > CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Размер файла должен быть от 1 байта до {CHUNKED_UPLOAD_MAX_SIZE // (1024 * 1024)} МБ.')
+        return value
 
 # Сериализатор для модели Notification
 class NotificationSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели Notification
     class Meta:  # Метакласс с настройками сериализатора
         model = Notification  # Модель для сериализации
-        fields = ['id', 'notification_type', 'title', 'message', 'is_read', 'created_date', 'related_post', 'related_comment']  # Включаемые поля
+        fields = ['id', 'notification_type', 'title', 'message', 'is_read', 'created_date', 'related_post', 'related_comment', 'actor_count', 'recent_actors']  # Включаемые поля
+
+# Сериализатор архивного уведомления (те же поля, что у NotificationSerializer)
+class ArchivedNotificationSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели NotificationArchive
+    is_read = serializers.BooleanField(default=True, read_only=True)  # В архив попадают только прочитанные
+    related_post = serializers.IntegerField(source='related_post_id', read_only=True)  # id связанного поста
+    related_comment = serializers.IntegerField(source='related_comment_id', read_only=True)  # id связанного комментария
+
+    class Meta:  # Метакласс с настройками сериализатора
+        model = NotificationArchive  # Модель для сериализации
+        fields = ['id', 'notification_type', 'title', 'message', 'is_read', 'created_date', 'related_post', 'related_comment', 'archived_date']  # Включаемые поля
+
+# Сериализатор похожего поста (готовый список из таблицы RelatedPost)
+class RelatedPostSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели RelatedPost
+    id = serializers.IntegerField(source='related.id', read_only=True)  # id похожего поста
+    title = serializers.CharField(source='related.title', read_only=True)  # Заголовок
+    slug = serializers.CharField(source='related.slug', read_only=True)  # Slug для ссылки
+    excerpt = serializers.CharField(source='related.excerpt', read_only=True)  # Краткое описание
+    published_date = serializers.DateTimeField(source='related.published_date', read_only=True)  # Дата публикации
+
+    class Meta:  # Метакласс с настройками сериализатора
+        model = RelatedPost  # Модель для сериализации
+        fields = ['id', 'title', 'slug', 'excerpt', 'published_date', 'score']  # Включаемые поля
+
+# Сериализатор ревизии поста (текст восстанавливается только для одной ревизии)
+class PostRevisionSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели PostRevision
+    editor = serializers.CharField(source='editor.username', read_only=True, default=None)  # Кто сохранил (editor загружен select_related)
+    is_snapshot = serializers.BooleanField(read_only=True)  # Полный снимок или дельта
+
+    class Meta:  # Метакласс с настройками сериализатора
+        model = PostRevision  # Модель для сериализации
+        fields = ['number', 'created_date', 'editor', 'title', 'content_length', 'is_snapshot']  # Включаемые поля
 
 # Сериализатор для регистрации пользователей
 class RegisterSerializer(serializers.ModelSerializer):  # Базовый сериализатор на основе модели User для регистрации
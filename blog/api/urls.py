@@ -8,8 +8,10 @@ router = DefaultRouter()  # Создаем экземпляр DefaultRouter дл
 router.register(r'posts', views.PostViewSet)  # Регистрируем ViewSet для постов (создает URL /api/posts/)
 router.register(r'comments', views.CommentViewSet)  # Регистрируем ViewSet для комментариев (создает URL /api/comments/)
 router.register(r'categories', views.CategoryViewSet)  # Регистрируем ViewSet для категорий (создает URL /api/categories/)
+router.register(r'tags', views.TagViewSet)  # Регистрируем ViewSet для тегов (создает URL /api/tags/)
 router.register(r'users', views.UserProfileViewSet)  # Регистрируем ViewSet для пользователей (создает URL /api/users/)
 router.register(r'notifications', views.NotificationViewSet)  # Регистрируем ViewSet для уведомлений (создает URL /api/notifications/)
+router.register(r'uploads', views.ChunkedUploadViewSet)  # Регистрируем ViewSet для загрузки изображений по частям (создает URL /api/uploads/)
 
 app_name = 'api'  # Определяем имя приложения для URL reverse resolution (используется в шаблонах как 'api:name')
 
@@ -29,4 +31,5 @@ urlpatterns = [  # Главный список URL паттернов API при
     
     # Site info - маршруты для получения информации о сайте
     path('site-info/', views.site_info, name='site_info'),  # Получение публичной информации о сайте (название, описание, настройки)
+    path('autocomplete/', views.autocomplete, name='autocomplete'),  # Подсказки при вводе (посты, пользователи, категории)
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 # Импорт модулей Django REST Framework
-from rest_framework import viewsets, status, permissions  # Импортируем основные классы DRF: ViewSet, статусы HTTP и разрешения
+from rest_framework import viewsets, mixins, status, permissions  # Импортируем основные классы DRF: ViewSet, миксины, статусы HTTP и разрешения
 from rest_framework.decorators import action, api_view, permission_classes  # Импортируем декораторы для кастомных действий и API views
 from rest_framework.response import Response  # Импортируем класс для создания HTTP ответов
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly  # Импортируем классы разрешений
@@ -7,15 +7,32 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken  # Импортируем класс для работы с JWT refresh токенами
 from django.contrib.auth import authenticate, login, logout  # Импортируем функции аутентификации Django
 from django.contrib.auth.models import User  # Импортируем модель пользователя Django
+from django.db import transaction  # Импортируем управление транзакциями
 from django.db.models import Q, Count  # Импортируем Q объекты и функцию подсчета для сложных запросов к БД
+from django.db.models.functions import Coalesce  # Значение по умолчанию для пользователей без строки счетчиков
+from django.core.exceptions import ValidationError  # Импортируем исключение валидации Django
+from django.core.files import File  # Импортируем обертку файла для сохранения в FileField
+from django.http import StreamingHttpResponse  # Импортируем потоковый HTTP ответ
+from django.shortcuts import get_object_or_404  # Импортируем получение объекта или 404
 from django_filters.rest_framework import DjangoFilterBackend  # Импортируем бэкенд фильтрации DRF
-from blog .models import Post, Comment, Category, UserProfile, Notification  # Импортируем модели нашего приложения
+from blog .models import Post, Comment, Category, Follow, UserProfile, Notification, NotificationArchive, ChunkedUpload, Tag, RelatedPost  # Импортируем модели нашего приложения
+from blog.uploads import append_chunk, discard_chunked_upload, finalize_chunked_upload  # Загрузка файлов по частям
+from blog.transfer import CONTENT_TYPES, FORMATS, PostImporter, export_rows, read_rows, render_rows  # Импорт и экспорт постов
+from blog.notifications import notify_like  # Объединение уведомлений о лайках
+from blog.live import broadcast_comment  # Live-поток комментариев поста
+from blog.autocomplete import AUTOCOMPLETE_TYPES, suggest  # Подсказки при вводе
+from blog.revisions import unified_diff  # Разница версий поста
+from blog import drafts, feed  # Автосохранение черновиков правки и лента подписок
 from .serializers import (  # Импортируем все сериализаторы из текущего пакета
     PostSerializer, PostListSerializer, CommentSerializer,  # Сериализаторы для постов и комментариев
-    CategorySerializer, UserSerializer, NotificationSerializer,  # Сериализаторы для категорий, пользователей и уведомлений
-    RegisterSerializer, LoginSerializer  # Сериализаторы для регистрации и авторизации
+    CategorySerializer, TagSerializer, UserSerializer, NotificationSerializer, ArchivedNotificationSerializer,  # Сериализаторы для категорий, тегов, пользователей и уведомлений
+    RegisterSerializer, LoginSerializer,  # Сериализаторы для регистрации и авторизации
+    ModerationCommentSerializer,  # Сериализатор очереди модерации
+    RelatedPostSerializer,  # Сериализатор похожих постов
+    PostRevisionSerializer,  # Сериализатор ревизий поста
+    ChunkedUploadSerializer  # Сериализатор загрузки по частям
 )
-from blog.views import get_site_settings, is_user_banned  # Импортируем функции из views.py основного приложения
+from blog.views import get_site_settings, is_user_banned, parse_after, pending_comments_page  # Импортируем функции из views.py основного приложения
 
 # ViewSet для работы с категориями
 class CategoryViewSet(viewsets.ModelViewSet):  # Класс ViewSet для автоматического CRUD API категорий
@@ -23,6 +40,13 @@ class CategoryViewSet(viewsets.ModelViewSet):  # Класс ViewSet для ав
     serializer_class = CategorySerializer  # Класс сериализатора для категорий
     permission_classes = [IsAuthenticatedOrReadOnly]  # Разрешения: аутентифицированные пользователи могут писать, все - читать
 
+# ViewSet для тегов (только чтение; теги создаются из строки тегов поста)
+class TagViewSet(viewsets.ReadOnlyModelViewSet):  # Класс ViewSet только для чтения тегов
+    queryset = Tag.objects.filter(post_count__gt=0).order_by('-post_count', 'name')  # Облако тегов по индексу blog_tag_cloud_idx
+    serializer_class = TagSerializer  # Класс сериализатора для тегов
+    permission_classes = [IsAuthenticatedOrReadOnly]  # Разрешения: теги доступны для чтения всем
+    lookup_field = 'slug'  # GET /tags/{slug}/
+
 # ViewSet для работы с постами
 class PostViewSet(viewsets.ModelViewSet):  # Класс ViewSet для постов блога
     queryset = Post.objects.select_related('author', 'category').prefetch_related('comments', 'likes')  # Оптимизированный QuerySet с предзагрузкой связанных данных
@@ -47,12 +71,22 @@ class PostViewSet(viewsets.ModelViewSet):  # Класс ViewSet для пост
             queryset = queryset.filter(  # Показываем опубликованные посты или посты самого пользователя
                 Q(status='published') | Q(author=self.request.user)
             )
+
+        tag = self.request.query_params.get('tag')  # Фильтр ?tag=<slug> по таблице связей, а не по подстроке
+        if tag:
+            queryset = queryset.filter(post_tags__tag__slug=tag)
         
         return queryset  # Возвращаем отфильтрованный QuerySet
 
     def perform_create(self, serializer):  # Метод выполняется при создании нового поста
         serializer.save(author=self.request.user)  # Автоматически устанавливаем текущего пользователя как автора
 
+    def perform_update(self, serializer):  # Метод выполняется при изменении поста
+        serializer.instance.edited_by = self.request.user  # Редактор ревизии
+        serializer.save()
+        if {'title', 'content'} & serializer.validated_data.keys():
+            drafts.discard(serializer.instance.pk)  # Черновик устарел
+
     @action(detail=True, methods=['post'])  # Кастомное действие для лайка/анлайка поста
     def like(self, request, pk=None):  # POST /posts/{id}/like/
         if is_user_banned(request.user):  # Проверяем, не заблокирован ли пользователь
@@ -65,12 +99,23 @@ class PostViewSet(viewsets.ModelViewSet):  # Класс ViewSet для пост
         else:  # Если не лайкнул
             post.likes.add(request.user)  # Добавляем лайк
             liked = True  # Флаг что пост лайкнут
+            notify_like(request.user, post)  # Лайки за окно объединяются в одно уведомление
         
         return Response({  # Возвращаем JSON ответ с результатом
             'liked': liked,  # Статус лайка (true/false)
             'like_count': post.likes.count()  # Общее количество лайков
         })
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])  # Лента постов авторов, на которых подписан пользователь
+    def feed(self, request):  # GET /posts/feed/?before=<next_before предыдущей страницы> - новые первыми
+        try:
+            before = feed.parse_cursor(request.query_params['before']) if request.query_params.get('before') else None
+        except ValueError:
+            return Response({'error': 'before - значение next_before предыдущей страницы'}, status=status.HTTP_400_BAD_REQUEST)
+        posts, next_before = feed.page(request.user, before)
+        serializer = PostListSerializer(posts, many=True, context=self.get_serializer_context())
+        return Response({'results': serializer.data, 'next_before': next_before and feed.format_cursor(next_before)})
+
     @action(detail=True, methods=['get'])  # Кастомное действие для получения комментариев к посту
     def comments(self, request, pk=None):  # GET /posts/{id}/comments/
         post = self.get_object()  # Получаем объект поста по ID
@@ -78,6 +123,108 @@ class PostViewSet(viewsets.ModelViewSet):  # Класс ViewSet для пост
         serializer = CommentSerializer(comments, many=True)  # Сериализуем комментарии
         return Response(serializer.data)  # Возвращаем JSON ответ с данными комментариев
 
+    @action(detail=True, methods=['get'])  # Кастомное действие для получения похожих постов
+    def related(self, request, pk=None):  # GET /posts/{id}/related/
+        post = self.get_object()  # Проверяем доступ к посту
+        links = RelatedPost.objects.filter(post=post, related__status='published').select_related('related')  # Один запрос по индексу (post, rank)
+        return Response(RelatedPostSerializer(links, many=True).data)
+
+    def author_only(self, post, error):  # История правок и черновики доступны только автору и администраторам
+        if post.author_id != self.request.user.pk and not self.request.user.is_staff:
+            return Response({'error': error}, status=status.HTTP_403_FORBIDDEN)
+        return None
+
+    @action(detail=True, methods=['get'])  # Кастомное действие для списка ревизий поста
+    def revisions(self, request, pk=None):  # GET /posts/{id}/revisions/ - новые первыми, постранично
+        post = self.get_object()  # Проверяем доступ к посту
+        forbidden = self.author_only(post, 'История правок доступна только автору')
+        if forbidden:
+            return forbidden
+        revisions = post.revisions.select_related('editor').defer('data').order_by('-number')  # Данные дельт для списка не нужны
+        page = self.paginate_queryset(revisions)
+        return self.get_paginated_response(PostRevisionSerializer(page, many=True).data)
+
+    @action(detail=True, methods=['get'], url_path=r'revisions/(?P<number>\d+)')  # Кастомное действие для текста ревизии
+    def revision(self, request, pk=None, number=None):  # GET /posts/{id}/revisions/{number}/
+        post = self.get_object()
+        forbidden = self.author_only(post, 'История правок доступна только автору')
+        if forbidden:
+            return forbidden
+        revision = get_object_or_404(post.revisions.select_related('editor'), number=number)
+        return Response({**PostRevisionSerializer(revision).data, 'content': revision.content()})  # Снимок и не больше SNAPSHOT_INTERVAL дельт
+
+    @action(detail=True, methods=['get'])  # Кастомное действие для разницы двух ревизий
+    def diff(self, request, pk=None):  # GET /posts/{id}/diff/?from=3&to=5 (по умолчанию - последняя правка)
+        post = self.get_object()
+        forbidden = self.author_only(post, 'История правок доступна только автору')
+        if forbidden:
+            return forbidden
+        revisions = post.revisions.defer('data')
+        try:
+            to_number = int(request.query_params.get('to') or revisions.values_list('number', flat=True).first() or 0)
+            from_number = int(request.query_params.get('from') or to_number - 1)
+        except ValueError:
+            return Response({'error': 'Параметры from и to - номера ревизий'}, status=status.HTTP_400_BAD_REQUEST)
+        old = get_object_or_404(revisions, number=from_number)
+        new = get_object_or_404(revisions, number=to_number)
+        return Response({
+            'from': from_number,
+            'to': to_number,
+            'title': [old.title, new.title] if old.title != new.title else None,  # Изменение заголовка
+            'diff': unified_diff(old.content(), new.content(), f'#{from_number}', f'#{to_number}'),  # Строки unified diff
+        })
+
+    @action(detail=True, methods=['get', 'patch', 'delete'])  # Кастомное действие для автосохранения черновика правки
+    def draft(self, request, pk=None):  # GET/PATCH/DELETE /posts/{id}/draft/
+        post = self.get_object()
+        forbidden = self.author_only(post, 'Черновик доступен только автору')
+        if forbidden:
+            return forbidden
+        if request.method == 'GET':  # Полный текст отдается один раз при открытии редактора
+            return Response(drafts.load(post))
+        if request.method == 'DELETE':  # Отказ от черновика
+            drafts.discard(post.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if is_user_banned(request.user):
+            return Response({'error': 'Вы заблокированы'}, status=status.HTTP_403_FORBIDDEN)
+        version = request.data.get('version')
+        if not isinstance(version, int):
+            return Response({'error': 'Укажите version - номер версии, к которой применяется дельта'}, status=status.HTTP_400_BAD_REQUEST)
+        try:  # PATCH {"version": 3, "ops": [{"pos": 120, "delete": 5, "insert": "текст"}], "title": "..."}
+            draft = drafts.update(post, version, request.data.get('ops', []), request.data.get('title'))
+        except drafts.DraftError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        except drafts.DraftConflict as conflict:  # Клиент загружает текущую версию (GET) и повторяет
+            return Response({'error': 'Черновик изменен', 'version': conflict.version}, status=status.HTTP_409_CONFLICT)
+        return Response({'version': draft['version'], 'length': len(draft['content'])})  # Текст обратно не передается
+
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[permissions.IsAdminUser])  # Выгрузка постов (только staff)
+    def export_posts(self, request):  # GET /posts/export/?data_format=jsonl|csv&status=published
+        data_format = request.query_params.get('data_format', 'jsonl')  # Параметр format занят DRF под выбор рендерера
+        if data_format not in FORMATS:
+            return Response({'error': f'Допустимые форматы: {", ".join(FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = Post.objects.all()
+        if request.query_params.get('status'):
+            queryset = queryset.filter(status=request.query_params['status'])
+        response = StreamingHttpResponse(  # Тело формируется по мере выборки пакетов, без буферизации в памяти
+            render_rows(export_rows(queryset), data_format), content_type=CONTENT_TYPES[data_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="posts.{data_format}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAdminUser])  # Загрузка постов (только staff)
+    def import_posts(self, request):  # POST /posts/import/ с телом JSONL (application/x-ndjson) или CSV (text/csv)
+        if request.stream is None:  # Пустое тело запроса
+            return Response({'error': 'Передайте файл в теле запроса'}, status=status.HTTP_400_BAD_REQUEST)
+        data_format = 'csv' if request.content_type.startswith('text/csv') else 'jsonl'
+        importer = PostImporter(
+            default_author_id=request.user.pk,  # Строки без автора принадлежат импортирующему
+            create_categories=request.query_params.get('create_categories') in ('1', 'true'),
+        )
+        result = importer.run(read_rows(request.stream, data_format))  # Тело читается потоком, request.data не используется
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED if result.created else status.HTTP_200_OK)
+
 # ViewSet для работы с комментариями
 class CommentViewSet(viewsets.ModelViewSet):  # Класс ViewSet для комментариев
     queryset = Comment.objects.select_related('author', 'post', 'parent').prefetch_related('replies', 'likes')  # Оптимизированный QuerySet с предзагрузкой связей
@@ -91,7 +238,28 @@ class CommentViewSet(viewsets.ModelViewSet):  # Класс ViewSet для ком
         if is_user_banned(self.request.user):  # Проверяем, не заблокирован ли пользователь
             return Response({'error': 'Заблокированные пользователи не могут комментировать'}, status=status.HTTP_403_FORBIDDEN)  # Возвращаем ошибку
         
-        serializer.save(author=self.request.user)  # Автоматически устанавливаем текущего пользователя как автора комментария
+        comment = serializer.save(author=self.request.user, **Comment.initial_state(self.request.user))  # Автор - текущий пользователь; при модерации комментарий скрыт
+        broadcast_comment(comment)  # Читатели поста получат комментарий без перезагрузки (если он опубликован)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])  # Очередь модерации (только staff)
+    def pending(self, request):  # GET /comments/pending/?after=<id>
+        comments, next_after = pending_comments_page(parse_after(request.query_params.get('after')))
+        return Response({
+            'results': ModerationCommentSerializer(comments, many=True).data,
+            'next_after': next_after,  # Курсор следующей страницы (None - конец очереди)
+        })
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])  # Массовая модерация (только staff)
+    def moderate(self, request):  # POST /comments/moderate/ {"approve": [id, ...], "reject": [id, ...]}
+        try:
+            approve = [int(pk) for pk in request.data.get('approve', [])]
+            reject = [int(pk) for pk in request.data.get('reject', [])]
+        except (TypeError, ValueError):
+            return Response({'error': 'Ожидаются списки id'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'approved': Comment.approve(approve) if approve else 0,  # Один UPDATE, уведомления авторам в Celery
+            'rejected': Comment.reject(reject) if reject else 0,  # Один UPDATE
+        })
 
     @action(detail=True, methods=['post'])  # Кастомное действие для лайка/анлайка комментария
     def like(self, request, pk=None):  # POST /comments/{id}/like/
@@ -105,6 +273,7 @@ class CommentViewSet(viewsets.ModelViewSet):  # Класс ViewSet для ком
         else:  # Если не лайкнул
             comment.likes.add(request.user)  # Добавляем лайк
             liked = True  # Флаг что комментарий лайкнут
+            notify_like(request.user, comment.post, comment)  # Лайки за окно объединяются в одно уведомление
         
         return Response({  # Возвращаем JSON ответ с результатом
             'liked': liked,  # Статус лайка (true/false)
@@ -113,7 +282,13 @@ class CommentViewSet(viewsets.ModelViewSet):  # Класс ViewSet для ком
 
 # ViewSet для работы с профилями пользователей (только чтение)
 class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):  # Класс ViewSet только для чтения профилей пользователей
-    queryset = User.objects.all().select_related('profile').annotate(post_count=Count('blog_posts'))  # QuerySet пользователей с профилем и количеством постов
+    queryset = User.objects.all().select_related('profile').annotate(
+        post_count=Coalesce('stats__posts_published', 0),
+        comment_count=Coalesce('stats__comments_made', 0),
+        likes_received=Coalesce('stats__likes_received', 0),
+        views_received=Coalesce('stats__views_received', 0),
+        follower_count=Coalesce('stats__followers', 0),
+    ).order_by('pk')  # Пользователи с профилем и готовыми счетчиками из AuthorStats (JOIN вместо COUNT по постам)
     serializer_class = UserSerializer  # Класс сериализатора для пользователей
     permission_classes = [IsAuthenticatedOrReadOnly]  # Разрешения: аутентифицированные пользователи могут писать, все - читать
 
@@ -131,7 +306,7 @@ class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):  # Класс ViewSet 
                             'bio': profile.bio,  # Биография
                             'location': profile.location,  # Местоположение
                             'website': profile.website,  # Веб-сайт
-                            'avatar': profile.avatar.url if profile.avatar else None,  # URL аватара
+                            'avatar': profile.avatar_medium_url,  # URL уменьшенного аватара
                             'birth_date': profile.birth_date,  # Дата рождения
                             'email_verified': profile.email_verified  # Статус верификации email
                         }
@@ -148,6 +323,17 @@ class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):  # Класс ViewSet 
             # Здесь может быть логика обновления профиля
             return Response({'message': 'Profile updated successfully'})  # Возвращаем сообщение об успехе
 
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])  # Подписка на автора
+    def follow(self, request, pk=None):  # POST /users/{id}/follow/ - подписаться, DELETE - отписаться
+        author = self.get_object()  # Получаем автора по ID
+        if author.pk == request.user.pk:
+            return Response({'error': 'Нельзя подписаться на себя'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.method == 'DELETE':
+            Follow.unfollow(request.user.pk, author.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        created = Follow.follow(request.user.pk, author.pk)
+        return Response({'following': True}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
 # ViewSet для работы с уведомлениями
 class NotificationViewSet(viewsets.ModelViewSet):  # Класс ViewSet для уведомлений
     queryset = Notification.objects.all()  # Базовый QuerySet для уведомлений
@@ -170,6 +356,85 @@ class NotificationViewSet(viewsets.ModelViewSet):  # Класс ViewSet для 
         serializer = self.get_serializer(notifications, many=True)  # Сериализуем уведомления
         return Response(serializer.data)  # Возвращаем JSON ответ с данными
 
+    @action(detail=False, methods=['get'])  # Кастомное действие для истории уведомлений
+    def archived(self, request):  # GET /notifications/archived/ - прочитанные уведомления, перенесенные в архив
+        archived = NotificationArchive.objects.filter(user=request.user)  # Индекс blog_notifarch_user_idx
+        page = self.paginate_queryset(archived)  # Архив большой - отдаем только страницами
+        serializer = ArchivedNotificationSerializer(page, many=True)  # Сериализуем страницу архива
+        return self.get_paginated_response(serializer.data)  # Возвращаем страницу с ссылками на соседние
+
+# ViewSet для возобновляемой загрузки изображений по частям
+class ChunkedUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    queryset = ChunkedUpload.objects.all()  # Базовый QuerySet загрузок
+    serializer_class = ChunkedUploadSerializer  # Класс сериализатора загрузок
+    permission_classes = [IsAuthenticated]  # Только аутентифицированные пользователи могут загружать файлы
+
+    def get_queryset(self):  # Метод получения отфильтрованного QuerySet
+        queryset = super().get_queryset().filter(user=self.request.user)  # Только загрузки текущего пользователя
+        if self.action == 'chunk':
+            queryset = queryset.select_for_update()  # Блокируем загрузку от параллельной записи частей
+        return queryset
+
+    def perform_create(self, serializer):  # POST /uploads/ - начало загрузки (имя, тип и размер файла)
+        serializer.save(user=self.request.user)  # Владелец загрузки - текущий пользователь
+
+    def perform_destroy(self, instance):  # DELETE /uploads/{id}/ - отмена загрузки
+        discard_chunked_upload(instance)  # Удаляем временный файл
+        instance.delete()
+
+    @action(detail=True, methods=['put'])  # Кастомное действие для отправки очередной части файла
+    def chunk(self, request, pk=None):  # PUT /uploads/{id}/chunk/ с заголовком Upload-Offset и телом-частью файла
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))  # Смещение части в файле
+            length = int(request.headers.get('Content-Length') or 0)  # Размер части
+        except ValueError:
+            return Response({'error': 'Требуются заголовки Upload-Offset и Content-Length'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            upload = self.get_object()  # Строка загрузки заблокирована до конца транзакции
+            try:
+                new_offset = append_chunk(upload, request.stream, offset, length)  # Тело читается потоком, без буферизации в памяти
+            except ValidationError as e:
+                code = status.HTTP_409_CONFLICT if e.code in ('offset_mismatch', 'complete') else status.HTTP_400_BAD_REQUEST
+                return Response({'error': e.messages[0], 'offset': upload.offset}, status=code, headers={'Upload-Offset': str(upload.offset)})
+
+            upload.offset = new_offset
+            if new_offset == upload.size:  # Получена последняя часть - проверяем заголовок изображения
+                try:
+                    finalize_chunked_upload(upload)
+                except ValidationError as e:
+                    discard_chunked_upload(upload)
+                    upload.delete()
+                    return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+                upload.status = 'complete'
+            upload.save(update_fields=['offset', 'status', 'updated_at'])
+
+        return Response(self.get_serializer(upload).data, headers={'Upload-Offset': str(upload.offset)})
+
+    @action(detail=True, methods=['post'])  # Кастомное действие для прикрепления загруженного файла
+    def attach(self, request, pk=None):  # POST /uploads/{id}/attach/ {"post": id} или {"target": "avatar"}
+        upload = self.get_object()  # Получаем загрузку текущего пользователя
+        if not upload.is_complete:
+            return Response({'error': 'Загрузка еще не завершена'}, status=status.HTTP_409_CONFLICT)
+
+        if request.data.get('target') == 'avatar':
+            instance, field_name = UserProfile.for_user(request.user), 'avatar'  # Аватар текущего пользователя
+        else:
+            post = Post.objects.filter(pk=request.data.get('post')).first()  # Пост, к которому прикрепляется изображение
+            if post is None:
+                return Response({'error': 'Пост не найден'}, status=status.HTTP_404_NOT_FOUND)
+            if post.author_id != request.user.id and not request.user.is_staff:  # Проверяем права доступа
+                return Response({'error': 'Нет прав доступа'}, status=status.HTTP_403_FORBIDDEN)
+            instance, field_name = post, 'image'
+
+        path, filename = finalize_chunked_upload(upload)  # Имя с расширением по реальному формату файла
+        with open(path, 'rb') as f:
+            getattr(instance, field_name).save(filename, File(f), save=False)  # Копируем файл в storage
+        instance.save()  # Сигнал post_save ставит генерацию уменьшенных копий в очередь
+        discard_chunked_upload(upload)
+        upload.delete()
+        return Response({field_name: getattr(instance, field_name).url})
+
 # API endpoint для регистрации нового пользователя
 @api_view(['POST'])  # Декоратор для создания API view
 @permission_classes([AllowAny])  # Разрешения: доступ открыт всем (включая анонимных пользователей)
@@ -247,3 +512,12 @@ def site_info(request):  # GET /api/site_info/
         'allow_registration': settings.allow_registration,  # Разрешена ли регистрация
         'allow_comments': settings.allow_comments,  # Разрешены ли комментарии
     })
+
+# API endpoint подсказок при вводе
+@api_view(['GET'])  # Декоратор для создания API view
+@permission_classes([AllowAny])  # Разрешения: доступ открыт всем
+def autocomplete(request):  # GET /api/autocomplete/?q=<префикс>&types=posts,users,categories
+    """Подсказки по префиксу для постов, пользователей и категорий"""
+    types = request.query_params.get('types')  # Типы через запятую (по умолчанию все)
+    types = [name.strip() for name in types.split(',')] if types else AUTOCOMPLETE_TYPES
+    return Response(suggest(request.query_params.get('q', ''), types))
@@ -0,0 +1,87 @@
+# Кэшированный принципал пользователя: id, права и состояние блокировки без запросов к БД
+from django.conf import settings  # Импортируем настройки Django
+from django.contrib.auth.models import User  # Импортируем модель пользователя Django
+from django.core.cache import cache  # Импортируем кэш Django
+from django.db import transaction  # Импортируем управление транзакциями
+from django.utils import timezone  # Импортируем утилиты времени
+from django.utils.functional import SimpleLazyObject, empty  # Импортируем ленивую обертку объекта
+
+PRINCIPAL_CACHE_PREFIX = 'auth_principal'  # Префикс ключей (семейство обслуживается L1 кэшем)
+PRINCIPAL_CACHE_TIMEOUT = getattr(settings, 'AUTH_PRINCIPAL_CACHE_TIMEOUT', 300)  # Время жизни принципала в кэше (секунды)
+USER_ATTRIBUTES = {'id', 'username', 'is_active', 'is_staff', 'is_superuser'}  # Атрибуты User, доступные без загрузки строки
+PRINCIPAL_FIELDS = {  # Поле принципала -> выражение для values()
+    'id': 'id',
+    'username': 'username',
+    'is_active': 'is_active',
+    'is_staff': 'is_staff',
+    'is_superuser': 'is_superuser',
+    'is_banned': 'profile__is_banned',
+    'ban_expires': 'profile__ban_expires',
+}
+
+
+def principal_cache_key(user_id):
+    return f'{PRINCIPAL_CACHE_PREFIX}:{user_id}'
+
+
+def get_principal(user_id):
+    """Словарь с данными пользователя для авторизации (один запрос при промахе кэша) или None"""
+    key = principal_cache_key(user_id)
+    principal = cache.get(key)
+    if principal is None:
+        row = User.objects.filter(pk=user_id).values(*PRINCIPAL_FIELDS.values()).first()
+        if row is None:
+            return None  # Пользователь удален
+        principal = {name: row[lookup] for name, lookup in PRINCIPAL_FIELDS.items()}
+        principal['is_banned'] = bool(principal['is_banned'])  # Профиля может не быть
+        cache.set(key, principal, PRINCIPAL_CACHE_TIMEOUT)
+    return principal
+
+
+def invalidate_principal(*user_ids):
+    """
+    Сбрасывает закэшированные принципалы (после блокировки, смены прав и т.п.).
+    Ключи удаляются сразу и еще раз после коммита: параллельный запрос мог
+    закэшировать состояние до коммита на PRINCIPAL_CACHE_TIMEOUT.
+    """
+    if user_ids:
+        keys = [principal_cache_key(user_id) for user_id in user_ids]
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))  # Вне транзакции выполняется сразу
+
+
+def principal_is_banned(principal):
+    """Действует ли блокировка (истекшая блокировка не считается, без записи в БД)"""
+    if not principal or not principal['is_banned']:
+        return False
+    return principal['ban_expires'] is None or principal['ban_expires'] > timezone.now()
+
+
+# Пользователь из кэшированного принципала: id, права и статус доступны без запроса,
+# полная строка User загружается только при обращении к остальным атрибутам
+class CachedPrincipalUser(SimpleLazyObject):
+    def __init__(self, principal):
+        self.__dict__['_principal'] = principal
+        super().__init__(lambda: User.objects.get(pk=principal['id']))
+
+    def __getattr__(self, name):
+        principal = self.__dict__['_principal']
+        if self._wrapped is empty:
+            if name == 'pk':
+                return principal['id']
+            if name in USER_ATTRIBUTES:
+                return principal[name]
+            if name == 'is_authenticated':
+                return True
+            if name == 'is_anonymous':
+                return False
+            self._setup()
+        return getattr(self._wrapped, name)
+
+    def __eq__(self, other):
+        if self._wrapped is empty and isinstance(other, User):
+            return other.pk == self._principal['id']  # Сравнение по pk, как у моделей
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return hash(self._principal['id'])
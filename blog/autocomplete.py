@@ -0,0 +1,161 @@
+# Подсказки при вводе: посты, пользователи и категории по префиксу и триграммному сходству
+import hashlib  # Импортируем hashlib для ключей кэша
+import threading  # Импортируем блокировку для построения префиксных деревьев
+import time  # Импортируем time для начального поколения данных
+
+from django.conf import settings  # Импортируем настройки Django
+from django.contrib.auth.models import User  # Импортируем модель пользователя Django
+from django.core.cache import cache  # Импортируем кэш Django
+from django.db import connections  # Импортируем подключения к базам данных
+from django.db.models import Case, FloatField, Func, IntegerField, Q, TextField, Value, When  # Импортируем выражения ORM
+from django.db.models.functions import Cast, Upper  # Импортируем функции приведения типа и верхнего регистра
+
+from .models import Category, Post  # Импортируем модели приложения
+
+AUTOCOMPLETE_CACHE_PREFIX = 'autocomplete'  # Префикс ключей (семейство обслуживается L1 кэшем)
+AUTOCOMPLETE_CACHE_TIMEOUT = getattr(settings, 'AUTOCOMPLETE_CACHE_TIMEOUT', 30)  # Время жизни ответа в кэше (секунды)
+AUTOCOMPLETE_LIMIT = getattr(settings, 'AUTOCOMPLETE_LIMIT', 8)  # Подсказок каждого типа
+AUTOCOMPLETE_MIN_LENGTH = 2  # Более короткие префиксы не дают триграмм и не ищутся
+AUTOCOMPLETE_MAX_LENGTH = 64  # Длинный ввод обрезается
+AUTOCOMPLETE_TYPES = ('posts', 'users', 'categories')  # Типы подсказок
+
+
+# Префиксное дерево для баз без pg_trgm (SQLite в тестах и разработке)
+class Trie:
+    def __init__(self):
+        self.root = {}  # Узел: символ -> дочерний узел, ключ None -> записи, заканчивающиеся в узле
+
+    def insert(self, key, entry):
+        """Добавляет запись по ключу (ключ уже нормализован)"""
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(entry)
+
+    def search(self, prefix, limit):
+        """Не больше limit записей с ключом, начинающимся с prefix, в порядке ключей; без повторов"""
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        found, seen, stack = [], set(), [node]
+        while stack and len(found) < limit:  # Обход в глубину в лексикографическом порядке
+            node = stack.pop()
+            for entry in node.get(None, ()):
+                if entry['id'] not in seen:  # Запись индексируется по каждому слову
+                    seen.add(entry['id'])
+                    found.append(entry)
+                    if len(found) == limit:
+                        break
+            stack.extend(node[char] for char in sorted((c for c in node if c is not None), reverse=True))
+        return found
+
+
+# Источник подсказок одного типа: выборка, поле поиска и представление записи
+class Source:
+    def __init__(self, name, field, queryset, entry):
+        self.generation_key = f'{AUTOCOMPLETE_CACHE_PREFIX}:generation:{name}'  # Счетчик изменений в общем кэше (один на все процессы)
+        self.field = field  # Поле, по которому ищем
+        self.queryset = queryset  # Функция, возвращающая выборку кандидатов
+        self.entry = entry  # Запись ответа по строке values()
+        self.trie = None  # Префиксное дерево (строится лениво, только без PostgreSQL)
+        self.trie_generation = None  # Поколение данных, по которому построено дерево
+        self.lock = threading.Lock()
+
+    def search(self, prefix, limit):
+        """Подсказки по префиксу: pg_trgm на PostgreSQL, префиксное дерево в остальных случаях"""
+        queryset = self.queryset()
+        if connections[queryset.db].vendor == 'postgresql':
+            return self.search_trigram(prefix, limit)
+        return self.get_trie().search(prefix, limit)
+
+    def search_trigram(self, prefix, limit):
+        """Префиксные совпадения первыми, затем по убыванию сходства (GIN индекс по UPPER(field) gin_trgm_ops)"""
+        key, needle = Upper(Cast(self.field, TextField())), prefix.upper()  # Выражение совпадает с выражением индекса
+        rows = (
+            self.queryset().alias(key=key)
+            .filter(Q(key__startswith=needle) | Q(key__trigram_similar=needle))  # LIKE 'X%' и оператор % обслуживает GIN индекс
+            .annotate(
+                is_prefix=Case(When(key__startswith=needle, then=Value(0)), default=Value(1), output_field=IntegerField()),
+                similarity=Func(key, Value(needle), function='SIMILARITY', output_field=FloatField()),
+            )
+            .order_by('is_prefix', '-similarity', self.field)
+        )
+        return [self.entry(row) for row in rows.values('pk', self.field)[:limit]]
+
+    def generation(self):
+        """Текущее поколение данных типа; меняется при invalidate() в любом процессе"""
+        generation = cache.get(self.generation_key)
+        if generation is None:  # Еще не было изменений или ключ вытеснен: новое значение не совпадет с прежними поколениями
+            cache.add(self.generation_key, time.time_ns(), None)
+            generation = cache.get(self.generation_key, 0)
+        return generation
+
+    def get_trie(self):
+        generation = self.generation()
+        with self.lock:
+            if self.trie is None or self.trie_generation != generation:  # Данные менялись, возможно в другом процессе
+                trie = Trie()
+                for row in self.queryset().values('pk', self.field).iterator():
+                    entry = self.entry(row)
+                    for word in set(normalize(row[self.field]).split()):  # Поиск с начала любого слова
+                        trie.insert(word, entry)
+                    trie.insert(normalize(row[self.field]), entry)  # И по началу всей строки (с пробелами)
+                self.trie, self.trie_generation = trie, generation
+            return self.trie
+
+    def invalidate(self):
+        """Сбрасывает префиксное дерево после изменения данных: здесь сразу, в остальных процессах - по поколению"""
+        try:
+            cache.incr(self.generation_key)
+        except ValueError:  # Ключа нет (вытеснен)
+            cache.set(self.generation_key, time.time_ns(), None)
+        with self.lock:
+            self.trie = None
+
+
+# Источники подсказок по типам
+SOURCES = {
+    'posts': Source(
+        'posts', 'title', lambda: Post.objects.filter(status='published'),
+        lambda row: {'id': row['pk'], 'title': row['title']},
+    ),
+    'users': Source(
+        'users', 'username', lambda: User.objects.filter(is_active=True),
+        lambda row: {'id': row['pk'], 'username': row['username']},
+    ),
+    'categories': Source(
+        'categories', 'name', lambda: Category.objects.all(),
+        lambda row: {'id': row['pk'], 'name': row['name']},
+    ),
+}
+
+
+def normalize(text):
+    """Нижний регистр, без лишних пробелов, не длиннее AUTOCOMPLETE_MAX_LENGTH"""
+    return ' '.join(text.lower().split())[:AUTOCOMPLETE_MAX_LENGTH]
+
+
+def cache_key(prefix, types):
+    digest = hashlib.md5(prefix.encode(), usedforsecurity=False).hexdigest()  # Ключ безопасен для любого backend кэша
+    return f'{AUTOCOMPLETE_CACHE_PREFIX}:{",".join(types)}:{digest}'
+
+
+def suggest(text, types=AUTOCOMPLETE_TYPES):
+    """Подсказки каждого типа из types; ответ кэшируется по нормализованному префиксу"""
+    prefix = normalize(text)
+    types = [name for name in AUTOCOMPLETE_TYPES if name in types]  # Известные типы в постоянном порядке
+    if len(prefix) < AUTOCOMPLETE_MIN_LENGTH or not types:
+        return {name: [] for name in types}
+    key = cache_key(prefix, types)
+    result = cache.get(key)
+    if result is None:
+        result = {name: SOURCES[name].search(prefix, AUTOCOMPLETE_LIMIT) for name in types}
+        cache.set(key, result, AUTOCOMPLETE_CACHE_TIMEOUT)
+    return result
+
+
+def invalidate(name):
+    """Сбрасывает префиксное дерево типа (кэш ответов истекает сам за AUTOCOMPLETE_CACHE_TIMEOUT)"""
+    SOURCES[name].invalidate()
@@ -0,0 +1,255 @@
+# Импорт модулей для многоуровневого кэша (L1 в памяти процесса + L2 в Redis)
+import json  # Импортируем модуль для сериализации сообщений инвалидации
+import logging  # Импортируем модуль логирования
+import os  # Импортируем модуль os для определения PID процесса
+import pickle  # Импортируем pickle для хранения копий значений в L1
+import threading  # Импортируем модуль потоков для подписчика pub/sub
+import time  # Импортируем модуль времени для TTL записей L1
+import uuid  # Импортируем uuid для идентификации экземпляра кэша
+from collections import OrderedDict  # Импортируем упорядоченный словарь для LRU
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT  # Импортируем маркер таймаута по умолчанию
+from django.core.cache.backends.redis import RedisCache  # Импортируем стандартный Redis backend Django
+
+logger = logging.getLogger(__name__)  # Логгер модуля
+
+_MISSING = object()  # Маркер отсутствующего значения (None может быть валидным значением кэша)
+_FLUSH_ALL = '*'  # Специальный ключ в сообщении инвалидации: очистить весь L1
+
+
+# Ограниченный LRU-кэш в памяти процесса с TTL для каждой записи
+class L1Store:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries  # Максимальное количество записей (LRU вытесняет самые старые)
+        self._data = OrderedDict()  # key -> (pickled_value, expires_at)
+        self._lock = threading.Lock()  # Блокировка: L1 разделяется потоками воркера и подписчиком
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING  # Промах L1
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]  # Запись устарела - удаляем
+                return _MISSING
+            self._data.move_to_end(key)  # Отмечаем запись как недавно использованную
+        return pickle.loads(value)  # Возвращаем копию, чтобы вызывающий код не мутировал кэш
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            self.delete(key)  # Нулевой TTL - семейство ключей не кэшируется в L1
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (pickled, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)  # Вытесняем наименее недавно использованную запись
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not _MISSING
+
+
+# Redis-кэш с локальным L1 слоем для сверхгорячих ключей
+class TieredRedisCache(RedisCache):
+    """
+    Обертка над RedisCache с ограниченным LRU в памяти процесса.
+
+    Дополнительные ключи OPTIONS (остальные передаются Redis клиенту как есть):
+        L1_MAX_ENTRIES - размер LRU (по умолчанию 1024)
+        L1_TIMEOUT - TTL в L1 для ключей вне семейств (по умолчанию 0 - не кэшировать)
+        L1_KEY_FAMILIES - {префикс ключа: TTL в секундах} для горячих семейств ключей
+        L1_CHANNEL - канал Redis pub/sub для инвалидации L1 в других воркерах
+    """
+
+    def __init__(self, server, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        self._l1_max_entries = int(options.pop('L1_MAX_ENTRIES', 1024))
+        self._l1_default_timeout = float(options.pop('L1_TIMEOUT', 0))
+        families = options.pop('L1_KEY_FAMILIES', {})
+        # Сортируем префиксы по длине, чтобы более специфичный префикс выигрывал
+        self._l1_families = sorted(families.items(), key=lambda item: len(item[0]), reverse=True)
+        channel = options.pop('L1_CHANNEL', None)
+        params['OPTIONS'] = options  # Redis клиент получает только свои опции
+        super().__init__(server, params)
+        self._l1_channel = channel or f'{self.key_prefix or "cache"}:l1-invalidate'
+        self._instance_id = uuid.uuid4().hex  # Собственные сообщения инвалидации игнорируются
+        self._l1 = L1Store(self._l1_max_entries)
+        self._subscriber_pid = None  # PID процесса, в котором запущен подписчик (после fork нужен новый)
+        self._subscriber_lock = threading.Lock()
+
+    # ------------------------------------------------------------------ L1 --
+
+    def _l1_ttl(self, key, timeout=DEFAULT_TIMEOUT):
+        """TTL записи в L1: TTL семейства ключа, но не дольше таймаута в Redis"""
+        ttl = self._l1_default_timeout
+        for prefix, family_ttl in self._l1_families:
+            if key.startswith(prefix):
+                ttl = float(family_ttl)
+                break
+        backend_timeout = self.get_backend_timeout(timeout)
+        if backend_timeout is not None:
+            ttl = min(ttl, backend_timeout)
+        return ttl
+
+    def _l1_store(self, key, full_key, value, timeout=DEFAULT_TIMEOUT):
+        ttl = self._l1_ttl(key, timeout)
+        if ttl > 0:
+            self._ensure_subscriber()  # Кэшировать локально можно только при активной инвалидации
+            self._l1.set(full_key, value, ttl)
+
+    def _invalidate(self, *full_keys):
+        """Удаляет ключи из локального L1 и рассылает инвалидацию другим воркерам"""
+        for full_key in full_keys:
+            self._l1.delete(full_key)
+        self._publish(list(full_keys))
+
+    def _publish(self, full_keys):
+        if not self._l1_families and self._l1_default_timeout <= 0:
+            return  # L1 выключен - рассылать нечего
+        payload = json.dumps({'sender': self._instance_id, 'keys': full_keys})
+        try:
+            self._cache.get_client(write=True).publish(self._l1_channel, payload)
+        except Exception:  # Недоступность pub/sub не должна ломать запись в кэш
+            logger.warning('L1 cache invalidation publish failed', exc_info=True)
+
+    def _ensure_subscriber(self):
+        pid = os.getpid()
+        if self._subscriber_pid == pid:
+            return
+        with self._subscriber_lock:
+            if self._subscriber_pid == pid:
+                return
+            if self._subscriber_pid is not None:
+                self._l1.clear()  # После fork данные родителя больше не инвалидируются
+            self._subscriber_pid = pid
+            thread = threading.Thread(target=self._listen, name='l1-cache-invalidation', daemon=True)
+            thread.start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                pubsub = self._cache.get_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._l1_channel)
+                backoff = 1
+                for message in pubsub.listen():
+                    self._handle_message(message.get('data'))
+            except Exception:
+                logger.warning('L1 cache invalidation listener disconnected', exc_info=True)
+            # Во время разрыва соединения могли быть пропущены инвалидации
+            self._l1.clear()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _handle_message(self, data):
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get('sender') == self._instance_id:
+            return  # Собственное сообщение: локальный L1 уже актуален
+        for full_key in message.get('keys', []):
+            if full_key == _FLUSH_ALL:
+                self._l1.clear()
+                return
+            self._l1.delete(full_key)
+
+    # -------------------------------------------------------- cache API --
+
+    def get(self, key, default=None, version=None):
+        full_key = self.make_and_validate_key(key, version=version)
+        value = self._l1.get(full_key)
+        if value is not _MISSING:
+            return value  # Попадание в L1 - без сетевого запроса
+        value = self._cache.get(full_key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._l1_store(key, full_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        result = {}
+        missing = {}
+        for key in keys:
+            full_key = self.make_and_validate_key(key, version=version)
+            value = self._l1.get(full_key)
+            if value is _MISSING:
+                missing[full_key] = key
+            else:
+                result[key] = value
+        if missing:
+            for full_key, value in self._cache.get_many(missing.keys()).items():
+                key = missing[full_key]
+                result[key] = value
+                self._l1_store(key, full_key, value)
+        return result
+
+    def has_key(self, key, version=None):
+        full_key = self.make_and_validate_key(key, version=version)
+        if full_key in self._l1:
+            return True
+        return self._cache.has_key(full_key)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        super().set(key, value, timeout, version)
+        full_key = self.make_and_validate_key(key, version=version)
+        self._invalidate(full_key)
+        self._l1_store(key, full_key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = super().set_many(data, timeout, version)
+        full_keys = {key: self.make_and_validate_key(key, version=version) for key in data}
+        if full_keys:
+            self._invalidate(*full_keys.values())
+        for key, value in data.items():
+            self._l1_store(key, full_keys[key], value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = super().add(key, value, timeout, version)
+        if added:
+            # Промахи не кэшируются в L1, поэтому рассылать инвалидацию не нужно
+            full_key = self.make_and_validate_key(key, version=version)
+            self._l1_store(key, full_key, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self.make_and_validate_key(key, version=version)
+        self._invalidate(full_key)  # TTL в Redis изменился - L1 мог пережить ключ
+        return super().touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        deleted = super().delete(key, version)
+        self._invalidate(self.make_and_validate_key(key, version=version))
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        if not keys:
+            return
+        super().delete_many(keys, version)
+        self._invalidate(*[self.make_and_validate_key(key, version=version) for key in keys])
+
+    def incr(self, key, delta=1, version=None):
+        value = super().incr(key, delta, version)
+        self._invalidate(self.make_and_validate_key(key, version=version))
+        return value
+
+    def clear(self):
+        result = super().clear()
+        self._l1.clear()
+        self._publish([_FLUSH_ALL])
+        return result
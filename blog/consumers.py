@@ -2,7 +2,9 @@ import json  # Импортируем модуль для работы с JSON 
 from channels.generic.websocket import AsyncWebsocketConsumer  # Импортируем базовый класс для асинхронных WebSocket потребителей
 from channels.db import database_sync_to_async  # Импортируем декоратор для синхронных операций с БД в асинхронных потребителях
 from django.contrib.auth.models import User  # Импортируем модель пользователя Django
-from .models import Notification  # Импортируем модель уведомлений
+from .live import post_group  # Группа каналов читателей поста
+from .models import Notification, Post  # Импортируем модели уведомлений и постов
+from .notifications import serialize  # Данные уведомления для WebSocket сообщения
 
 # Потребитель WebSocket для real-time уведомлений
 class NotificationConsumer(AsyncWebsocketConsumer):  # Класс для обработки WebSocket подключений уведомлений
@@ -44,6 +46,12 @@ class NotificationConsumer(AsyncWebsocketConsumer):  # Класс для обр
             'notification': notification  # Данные уведомления
         }))
 
+    async def send_notifications(self, event):  # Метод для отправки накопленных уведомлений (после ограничения частоты)
+        await self.send(text_data=json.dumps({  # Отправляем JSON сообщение клиенту
+            'type': 'notifications',  # Тот же тип, что и ответ на get_notifications
+            'notifications': event['notifications']  # Последние непрочитанные уведомления
+        }))
+
     @database_sync_to_async  # Декоратор для безопасного доступа к БД из асинхронного кода
     def get_user_notifications(self):  # Метод получения уведомлений пользователя из БД
         user = self.scope["user"]  # Получаем пользователя из scope WebSocket соединения
@@ -55,17 +63,32 @@ class NotificationConsumer(AsyncWebsocketConsumer):  # Класс для обр
             is_read=False  # Только непрочитанные уведомления
         ).order_by('-created_date')[:10]  # Сортируем по дате создания и берем последние 10
         
-        return [  # Возвращаем список словарей с данными уведомлений
-            {
-                'id': n.id,  # ID уведомления
-                'title': n.title,  # Заголовок уведомления
-                'message': n.message,  # Сообщение уведомления
-                'type': n.notification_type,  # Тип уведомления
-                'created_date': n.created_date.isoformat(),  # Дата создания в ISO формате
-                'is_read': n.is_read  # Статус прочитанности
-            }
-            for n in notifications  # Проходим по всем уведомлениям
-        ]
+        return [serialize(n) for n in notifications]  # Возвращаем список словарей с данными уведомлений
+
+# Потребитель WebSocket для live-потока комментариев поста (только получение)
+class PostCommentsConsumer(AsyncWebsocketConsumer):  # Класс для читателей страницы поста
+    async def connect(self):  # Метод вызывается при подключении к потоку комментариев
+        self.post_id = int(self.scope['url_route']['kwargs']['post_id'])  # ID поста из URL маршрута
+        if not await self.post_is_published():  # Комментарии черновиков не транслируются
+            await self.close()
+            return
+        self.room_group_name = post_group(self.post_id)  # Группа post_<pk>
+        await self.channel_layer.group_add(self.room_group_name, self.channel_name)  # Подписываемся на новые комментарии
+        await self.accept()  # Принимаем WebSocket соединение
+
+    async def disconnect(self, close_code):  # Метод вызывается при отключении от потока
+        if hasattr(self, 'room_group_name'):  # Соединение могло быть отклонено в connect
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+
+    async def comment_created(self, event):  # Новый опубликованный комментарий (рассылает blog.live.broadcast_comment)
+        await self.send(text_data=json.dumps({  # Отправляем JSON сообщение клиенту
+            'type': 'new_comment',  # Тип сообщения - новый комментарий
+            'comment': event['comment']  # Данные комментария и готовый HTML фрагмент
+        }))
+
+    @database_sync_to_async  # Декоратор для безопасного доступа к БД из асинхронного кода
+    def post_is_published(self):  # Проверка, что пост существует и опубликован
+        return Post.objects.filter(pk=self.post_id, status='published').exists()
 
 # Потребитель WebSocket для чата
 class ChatConsumer(AsyncWebsocketConsumer):  # Класс для обработки WebSocket подключений чата
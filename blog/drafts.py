@@ -0,0 +1,138 @@
+# Автосохранение правок поста: черновик в кэше (Redis) обновляется дельтами, в БД пишется не чаще раза в интервал
+import logging  # Импортируем модуль логирования
+import time  # Импортируем паузу ожидания блокировки
+from contextlib import contextmanager  # Импортируем декоратор контекстных менеджеров
+
+from django.conf import settings  # Импортируем настройки Django
+from django.core.cache import cache  # Импортируем кэш Django (Redis в продакшене)
+from django.db import transaction  # Импортируем управление транзакциями
+
+from .models import PostDraft  # Импортируем модель сохраненных черновиков
+
+logger = logging.getLogger(__name__)  # Логгер модуля
+DRAFT_TIMEOUT = getattr(settings, 'DRAFT_CACHE_TIMEOUT', 7 * 24 * 3600)  # Время жизни черновика в кэше (копия есть в БД)
+PERSIST_DELAY = getattr(settings, 'DRAFT_PERSIST_DELAY', 30)  # Черновик пишется в БД не чаще раза в столько секунд
+MAX_OPS = 100  # Операций в одном автосохранении
+LOCK_TIMEOUT = 5  # Время жизни блокировки черновика в секундах
+LOCK_ATTEMPTS = 20  # Попыток взять блокировку...
+LOCK_WAIT = 0.05  # ...с паузой между ними в секундах
+
+
+class DraftError(ValueError):
+    """Некорректная дельта"""
+
+
+class DraftConflict(Exception):
+    """Черновик уже изменен другим автосохранением (или занят): клиенту нужна текущая версия"""
+
+    def __init__(self, version):
+        super().__init__(f'Текущая версия черновика: {version}')
+        self.version = version
+
+
+def draft_key(post_id):
+    return f'post_draft:{post_id}'
+
+
+def current(post_id):
+    """Черновик {'version', 'title', 'content'} из кэша или БД, None - черновика нет"""
+    draft = cache.get(draft_key(post_id))
+    if draft is None:
+        row = PostDraft.objects.filter(post_id=post_id).values('version', 'title', 'content').first()
+        if row:
+            cache.add(draft_key(post_id), row, DRAFT_TIMEOUT)  # add: не затираем черновик, записанный параллельно
+            draft = cache.get(draft_key(post_id), row)
+    return draft
+
+
+def load(post):
+    """Черновик поста; без черновика - текущая версия поста с номером 0"""
+    # Позиции дельт считаются по textarea.value в браузере, где переводы строк - "\n"
+    return current(post.pk) or {'version': 0, 'title': post.title, 'content': post.content.replace('\r\n', '\n')}
+
+
+def apply_ops(text, ops):
+    """
+    Применяет дельту: список операций {'pos', 'delete', 'insert'} по порядку,
+    каждая удаляет delete символов с позиции pos и вставляет insert.
+    """
+    if not isinstance(ops, list) or len(ops) > MAX_OPS:
+        raise DraftError(f'ops - список не длиннее {MAX_OPS} операций')
+    for op in ops:
+        if not isinstance(op, dict):
+            raise DraftError('Операция - объект {pos, delete, insert}')
+        pos, delete, insert = op.get('pos'), op.get('delete', 0), op.get('insert', '')
+        if not all(isinstance(value, int) and value >= 0 for value in (pos, delete)) or not isinstance(insert, str):
+            raise DraftError('pos и delete - неотрицательные целые, insert - строка')
+        if pos + delete > len(text):
+            raise DraftError(f'Операция выходит за конец текста ({len(text)} символов)')
+        text = text[:pos] + insert + text[pos + delete:]
+    return text
+
+
+@contextmanager
+def locked(post_id):
+    """Блокировка черновика на время чтения-изменения-записи (между процессами, через кэш)"""
+    key = f'post_draft_lock:{post_id}'
+    for _attempt in range(LOCK_ATTEMPTS):
+        if cache.add(key, 1, LOCK_TIMEOUT):
+            break
+        time.sleep(LOCK_WAIT)
+    else:
+        raise DraftConflict(None)  # Черновик занят: клиент повторит автосохранение
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+def update(post, version, ops=(), title=None):
+    """
+    Применяет дельту к черновику версии version и возвращает новый черновик.
+    Если черновик уже другой версии, бросает DraftConflict (клиент загружает
+    текущую версию и повторяет).
+    """
+    if title is not None and (not isinstance(title, str) or len(title) > PostDraft._meta.get_field('title').max_length):
+        raise DraftError('Некорректный заголовок')
+    with locked(post.pk):
+        draft = load(post)
+        if version != draft['version']:
+            raise DraftConflict(draft['version'])
+        draft = {
+            'version': version + 1,
+            'title': draft['title'] if title is None else title,
+            'content': apply_ops(draft['content'], list(ops)),
+        }
+        cache.set(draft_key(post.pk), draft, DRAFT_TIMEOUT)
+    schedule_persist(post.pk)
+    return draft
+
+
+def schedule_persist(post_id):
+    """Ставит запись черновика в БД через PERSIST_DELAY секунд, если она еще не запланирована"""
+    if not cache.add(f'post_draft_persist:{post_id}', 1, PERSIST_DELAY):
+        return  # Запись уже запланирована и возьмет последнюю версию
+    from .tasks import persist_post_draft  # Локальный импорт: tasks импортирует модели
+
+    def schedule():
+        try:
+            persist_post_draft.apply_async((post_id,), countdown=PERSIST_DELAY)
+        except Exception:  # Недоступный брокер не должен ломать автосохранение (черновик остается в кэше)
+            logger.exception('Failed to schedule draft persist for post %s', post_id)
+    transaction.on_commit(schedule)
+
+
+def persist(post_id):
+    """Записывает черновик из кэша в БД; возвращает записанную версию (None - черновика нет)"""
+    cache.delete(f'post_draft_persist:{post_id}')  # Следующее автосохранение запланирует новую запись
+    draft = cache.get(draft_key(post_id))
+    if draft is None:
+        return None  # Черновик уже применен к посту или удален
+    PostDraft.store(post_id, draft)
+    return draft['version']
+
+
+def discard(post_id):
+    """Удаляет черновик после сохранения поста"""
+    cache.delete(draft_key(post_id))
+    PostDraft.objects.filter(post_id=post_id).delete()
@@ -0,0 +1,235 @@
+# Лента подписок: id постов в ленте пользователя в Redis (рассылка при публикации), посты авторов с огромным числом подписчиков читаются из БД
+from collections import defaultdict  # Импортируем словарь со значениями по умолчанию
+from datetime import datetime, timedelta, timezone  # Импортируем перевод score (микросекунды) обратно в дату
+
+from django.conf import settings  # Импортируем настройки Django
+from django.core.cache import cache  # Импортируем кэш Django (Redis в продакшене)
+from django.db.models import Q  # Импортируем Q объекты для условия курсора
+
+from .models import Follow, Post  # Импортируем модели подписок и постов
+
+FEED_LENGTH = getattr(settings, 'FEED_LENGTH', 500)  # Сколько последних постов хранит лента пользователя
+FEED_TIMEOUT = getattr(settings, 'FEED_CACHE_TIMEOUT', 7 * 24 * 3600)  # Лента неактивного пользователя истекает и строится заново из БД
+FANOUT_MAX_FOLLOWERS = getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 10000)  # Посты авторов с большим числом подписчиков не рассылаются
+FANOUT_BATCH_SIZE = 1000  # Подписчиков в одной задаче рассылки
+FEED_PAGE_SIZE = 20  # Постов на странице ленты
+SENTINEL = 0  # Маркер построенной ленты (score 0, всегда последний): пустая лента отличается от отсутствующей
+MEMBER_WIDTH = 12  # id поста дополняется нулями: Redis упорядочивает посты с равным score по id
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def timeline_key(user_id):
+    return f'timeline:{user_id}'
+
+
+def score(published_date):
+    """Score поста: время публикации в микросекундах (целое число точно хранится в double Redis)"""
+    return (published_date - EPOCH) // timedelta(microseconds=1)
+
+
+def parse_cursor(value):
+    """Курсор "<score>_<id поста>" из next_before в (score, id); ValueError, если он некорректен"""
+    entry_score, _, pk = value.partition('_')
+    cursor = int(entry_score), int(pk)
+    try:
+        EPOCH + timedelta(microseconds=cursor[0])  # Курсор сравнивается с датой публикации в БД
+    except OverflowError:
+        raise ValueError(value)
+    return cursor
+
+
+def format_cursor(cursor):
+    return f'{cursor[0]}_{cursor[1]}'
+
+
+def _newest_first(rows):
+    """Порядок ленты: score, а при равном времени публикации - id поста, по убыванию"""
+    return sorted(rows, key=lambda entry: (entry[1], entry[0]), reverse=True)
+
+
+# Ленты в сортированных множествах Redis: post_id со score - временем публикации
+class RedisTimelines:
+    def __init__(self, client):
+        self.client = client  # Клиент redis-py кэша по умолчанию
+
+    def key(self, user_id):
+        return cache.make_key(timeline_key(user_id))  # С KEY_PREFIX кэша, как остальные ключи приложения
+
+    @staticmethod
+    def members(entries):
+        return {f'{pk:0{MEMBER_WIDTH}d}': entry_score for pk, entry_score in entries.items()}
+
+    def existing(self, user_ids):
+        """Пользователи из user_ids, у которых лента построена"""
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.exists(self.key(user_id))
+        return [user_id for user_id, exists in zip(user_ids, pipe.execute()) if exists]
+
+    def push(self, user_ids, entries):
+        """Добавляет посты {post_id: score} в ленты и обрезает их до FEED_LENGTH (один проход по сети)"""
+        pipe = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            key = self.key(user_id)
+            pipe.zadd(key, self.members(entries))  # Повторная рассылка того же поста ничего не дублирует
+            pipe.zremrangebyrank(key, 1, -(FEED_LENGTH + 1))  # Самые старые посты; маркер (ранг 0) остается
+        pipe.execute()
+
+    def store(self, user_id, entries):
+        key = self.key(user_id)
+        pipe = self.client.pipeline()  # MULTI: лента заменяется целиком
+        pipe.delete(key)
+        pipe.zadd(key, self.members({SENTINEL: 0, **entries}))
+        pipe.expire(key, FEED_TIMEOUT)
+        pipe.execute()
+
+    def page(self, user_id, before, limit):
+        """[(post_id, score)] после курсора before (score, post_id), новые первыми; None - ленты нет"""
+        key = self.key(user_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.expire(key, FEED_TIMEOUT)  # Лента активного пользователя не истекает
+        if before is not None:
+            pipe.zrangebyscore(key, before[0], before[0], withscores=True)  # Посты с временем курсора (обычно единицы)
+        pipe.zrevrangebyscore(key, '+inf' if before is None else f'({before[0]}', f'({SENTINEL}', start=0, num=limit, withscores=True)
+        exists, *results = pipe.execute()
+        if not exists:
+            return None
+        rows = [(int(member), int(entry_score)) for result in results for member, entry_score in result]
+        return _newest_first(entry for entry in rows if before is None or (entry[1], entry[0]) < before)[:limit]
+
+    def remove(self, user_id, post_ids):
+        self.client.zrem(self.key(user_id), *(f'{pk:0{MEMBER_WIDTH}d}' for pk in post_ids))
+
+    def delete(self, user_id):
+        self.client.delete(self.key(user_id))
+
+
+# Ленты в обычном кэше (LocMemCache в разработке и тестах): то же поведение без атомарных операций Redis
+class CacheTimelines:
+    def existing(self, user_ids):
+        found = cache.get_many([timeline_key(user_id) for user_id in user_ids])
+        return [user_id for user_id in user_ids if timeline_key(user_id) in found]
+
+    def push(self, user_ids, entries):
+        found = cache.get_many([timeline_key(user_id) for user_id in user_ids])
+        for user_id in user_ids:
+            if timeline_key(user_id) in found:
+                self.store(user_id, {**found[timeline_key(user_id)], **entries})
+
+    def store(self, user_id, entries):
+        cache.set(timeline_key(user_id), dict(_newest_first(entries.items())[:FEED_LENGTH]), FEED_TIMEOUT)
+
+    def page(self, user_id, before, limit):
+        timeline = cache.get(timeline_key(user_id))
+        if timeline is None:
+            return None
+        return [(pk, entry_score) for pk, entry_score in _newest_first(timeline.items()) if before is None or (entry_score, pk) < before][:limit]
+
+    def remove(self, user_id, post_ids):
+        timeline = cache.get(timeline_key(user_id))
+        if timeline is not None:
+            self.store(user_id, {pk: score for pk, score in timeline.items() if pk not in post_ids})
+
+    def delete(self, user_id):
+        cache.delete(timeline_key(user_id))
+
+
+def timelines():
+    """Хранилище лент: Redis кэша по умолчанию, а если кэш не в Redis - сам кэш"""
+    for client in (getattr(cache, '_cache', None), getattr(cache, 'client', None)):  # Redis backend Django или django_redis
+        if hasattr(client, 'get_client'):
+            return RedisTimelines(client.get_client(write=True))
+    return CacheTimelines()
+
+
+def pushed_authors(follower_id):
+    """Авторы подписчика, чьи посты рассылаются по лентам"""
+    return Follow.objects.filter(follower_id=follower_id).exclude(author__stats__followers__gt=FANOUT_MAX_FOLLOWERS).values('author_id')
+
+
+def pulled_authors(follower_id):
+    """Авторы подписчика с огромным числом подписчиков: их посты читаются из БД при показе ленты"""
+    return Follow.objects.filter(follower_id=follower_id, author__stats__followers__gt=FANOUT_MAX_FOLLOWERS).values('author_id')
+
+
+def recent_posts(author_ids, before=None, limit=FEED_LENGTH):
+    """[(post_id, score)] последних опубликованных постов авторов после курсора before (индекс blog_post_author_feed_idx)"""
+    posts = Post.objects.filter(author_id__in=author_ids, status='published')
+    if before is not None:
+        published = EPOCH + timedelta(microseconds=before[0])
+        posts = posts.filter(Q(published_date__lt=published) | Q(published_date=published, pk__lt=before[1]))
+    rows = posts.order_by('-published_date', '-pk').values_list('pk', 'published_date')[:limit]
+    return [(pk, score(published)) for pk, published in rows]
+
+
+def rebuild(user_id, store):
+    """Строит ленту из БД (новая подписка, лента истекла или вытеснена)"""
+    store.store(user_id, dict(recent_posts(pushed_authors(user_id))))
+
+
+def reset(user_id):
+    """Удаляет ленту после изменения подписок: следующее чтение построит ее заново"""
+    timelines().delete(user_id)
+
+
+def page(user, before=None, limit=FEED_PAGE_SIZE):
+    """
+    Страница ленты: посты после курсора before ((score, id) последнего поста
+    предыдущей страницы), новые первыми, и курсор следующей страницы (None -
+    постов больше нет). Посты с одинаковым временем публикации упорядочены по id.
+    Рассылаемые посты читаются из ленты, посты авторов с огромным числом
+    подписчиков - одним запросом к БД; обе части ограничены размером страницы.
+    """
+    store = timelines()
+    pushed = store.page(user.pk, before, limit)
+    if pushed is None:
+        rebuild(user.pk, store)
+        pushed = store.page(user.pk, before, limit) or []
+    merged = dict(recent_posts(pulled_authors(user.pk), before, limit))
+    merged.update(pushed)  # Пост мог попасть в ленту до того, как подписчиков у автора стало слишком много
+    rows = _newest_first(merged.items())[:limit]
+    if not rows:
+        return [], None
+    posts = Post.objects.filter(status='published').select_related('author', 'category').in_bulk([pk for pk, _score in rows])
+    stale = [pk for pk, _score in rows if pk not in posts]
+    if stale:
+        store.remove(user.pk, stale)  # Удаленные и снятые с публикации посты
+    last_pk, last_score = rows[-1]
+    return [posts[pk] for pk, _score in rows if pk in posts], (last_score, last_pk) if len(rows) == limit else None
+
+
+def fan_out(post_ids):
+    """
+    Рассылает опубликованные посты в ленты подписчиков их авторов: подписчики
+    читаются по индексу пакетами по FANOUT_BATCH_SIZE, каждый пакет - отдельная
+    задача push_to_timelines. Возвращает число пакетов.
+    """
+    from .tasks import push_to_timelines  # Локальный импорт: tasks импортирует этот модуль
+
+    by_author = defaultdict(list)
+    posts = Post.objects.filter(pk__in=post_ids, status='published').exclude(author__stats__followers__gt=FANOUT_MAX_FOLLOWERS)
+    for pk, author_id, published in posts.values_list('pk', 'author_id', 'published_date'):
+        by_author[author_id].append([pk, score(published)])
+    batches = 0
+    for author_id, entries in by_author.items():
+        last_id = 0
+        while True:
+            follower_ids = list(
+                Follow.objects.filter(author_id=author_id, follower_id__gt=last_id).order_by('follower_id')
+                .values_list('follower_id', flat=True)[:FANOUT_BATCH_SIZE]
+            )
+            if not follower_ids:
+                break
+            last_id = follower_ids[-1]
+            push_to_timelines.delay(follower_ids, entries)
+            batches += 1
+    return batches
+
+
+def push(user_ids, entries):
+    """Добавляет посты [[post_id, score]] в построенные ленты пользователей; возвращает число лент"""
+    store = timelines()
+    existing = store.existing(user_ids)  # Непостроенные ленты получат пост при построении из БД
+    if existing:
+        store.push(existing, {pk: entry_score for pk, entry_score in entries})
+    return len(existing)
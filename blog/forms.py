@@ -3,6 +3,20 @@ from django.contrib.auth.forms import UserCreationForm  # Встроенная 
 from django.contrib.auth.models import User  # Модель пользователя Django
 from django.core.exceptions import ValidationError  # Исключения валидации
 from .models import Post, Comment, UserProfile, Category  # Модели приложения blog
+from .uploads import inspect_image_header  # Проверка изображения по заголовку
+
+# Поле изображения: учитывает отказ обработчика загрузки и проверяет только заголовок файла
+class UploadImageField(forms.ImageField):
+    def to_python(self, data):
+        reason = getattr(data, 'rejection_reason', None)  # Файл отклонен LimitedImageUploadHandler при загрузке
+        if reason:
+            raise ValidationError(reason, code='invalid_image')
+        f = forms.FileField.to_python(self, data)  # Базовые проверки без полного декодирования (ImageField вызывает verify())
+        if f is None:
+            return None
+        image_format, width, height = inspect_image_header(f)
+        f.content_type = f'image/{image_format.lower()}'  # MIME тип по фактическому формату
+        return f
 
 # Форма регистрации нового пользователя
 class RegisterForm(UserCreationForm):  # Наследуемся от UserCreationForm для добавления поля email
@@ -35,13 +49,15 @@ class LoginForm(forms.Form):  # Простая форма для входа
 class PostForm(forms.ModelForm):  # Форма на основе модели Post
     class Meta:  # Метаданные формы
         model = Post  # Модель Post
-        fields = ['title', 'content', 'excerpt', 'category', 'image', 'tags', 'status']  # Поля для редактирования
+        fields = ['title', 'content', 'excerpt', 'category', 'image', 'tags', 'status', 'publish_at']  # Поля для редактирования
+        field_classes = {'image': UploadImageField}  # Проверка изображения по заголовку
         widgets = {  # Настройки виджетов для стилизации
             'title': forms.TextInput(attrs={'class': 'matrix-input'}),  # Заголовок поста
             'content': forms.Textarea(attrs={'class': 'matrix-input', 'rows': 12}),  # Содержимое поста (большое текстовое поле)
             'excerpt': forms.Textarea(attrs={'class': 'matrix-input', 'rows': 3}),  # Краткое описание
             'tags': forms.TextInput(attrs={'class': 'matrix-input'}),  # Теги поста
             'status': forms.Select(attrs={'class': 'matrix-input'}),  # Статус публикации (выпадающий список)
+            'publish_at': forms.DateTimeInput(attrs={'class': 'matrix-input', 'type': 'datetime-local'}, format='%Y-%m-%dT%H:%M'),  # Время отложенной публикации
             'category': forms.Select(attrs={'class': 'matrix-input'}),  # Категория поста (выпадающий список)
         }
 
@@ -68,6 +84,7 @@ class UserProfileForm(forms.ModelForm):  # Форма для редактиро
     class Meta:
         model = UserProfile
         fields = ['bio', 'location', 'website', 'avatar', 'birth_date']  # Поля профиля
+        field_classes = {'avatar': UploadImageField}  # Проверка изображения по заголовку
         widgets = {
             'bio': forms.Textarea(attrs={'class': 'matrix-input', 'rows': 4}),  # Биография (текстовое поле)
             'location': forms.TextInput(attrs={'class': 'matrix-input'}),  # Местоположение
@@ -91,7 +108,7 @@ class UserUpdateForm(forms.ModelForm):  # Форма для редактиров
 # Форма поиска
 class SearchForm(forms.Form):  # Форма для поиска по сайту
     query = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'matrix-input'}))  # Поисковый запрос (необязательное поле)
-    search_in = forms.ChoiceField(choices=[('all', 'All'), ('posts', 'Posts'), ('users', 'Users')], initial='all', widget=forms.Select(attrs={'class': 'matrix-input'}))  # Где искать
+    search_in = forms.ChoiceField(choices=[('all', 'All'), ('posts', 'Posts'), ('users', 'Users')], initial='all', required=False, widget=forms.Select(attrs={'class': 'matrix-input'}))  # Где искать (по умолчанию везде)
 
 # Форма обратной связи
 class ContactForm(forms.Form):  # Форма для отправки сообщений администрации
@@ -0,0 +1,216 @@
+# Конвейер обработки изображений: варианты размеров, очистка метаданных, blurhash
+import io  # Импортируем модуль для работы с буферами в памяти
+import math  # Импортируем math для вычисления blurhash
+import os  # Импортируем os для работы с путями файлов
+
+from PIL import Image, ImageOps  # Импортируем Pillow для обработки изображений
+from django.conf import settings  # Импортируем настройки Django
+from django.core.files.base import ContentFile  # Импортируем обертку для сохранения байтов в storage
+
+# Варианты размеров: имя -> максимальная сторона в пикселях
+POST_IMAGE_SIZES = getattr(settings, 'POST_IMAGE_SIZES', {'thumb': 480, 'large': 1280})  # Карточки в списках и детальная страница
+AVATAR_SIZES = getattr(settings, 'AVATAR_SIZES', {'small': 96, 'medium': 240})  # Списки пользователей и страница профиля
+IMAGE_MAX_DIMENSION = getattr(settings, 'IMAGE_MAX_DIMENSION', 2560)  # Ограничение размера оригинала
+IMAGE_QUALITY = getattr(settings, 'IMAGE_QUALITY', 82)  # Качество сжатия вариантов
+
+# Форматы оригинала, которые перекодируются без метаданных (анимированные GIF не трогаем)
+_REENCODE_FORMATS = {'JPEG': 'JPEG', 'PNG': 'PNG', 'WEBP': 'WEBP', 'MPO': 'JPEG'}
+_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def variant_url(field_file, variants, size, fmt='jpeg'):
+    """URL варианта изображения или оригинала, если варианты еще не готовы"""
+    if not field_file:
+        return None
+    variant = variants.get(size) if variants else None
+    if variant and variants.get('source') == field_file.name and variant.get(fmt):
+        return field_file.storage.url(variant[fmt])
+    return field_file.url
+
+
+def image_needs_processing(field_file, variants):
+    """Нужно ли (пере)строить варианты: изображение загружено, заменено или удалено"""
+    if field_file:
+        return (variants or {}).get('source') != field_file.name
+    return bool(variants)
+
+
+def variant_urls(field_file, variants):
+    """Словарь URL всех вариантов изображения для API"""
+    if not field_file or not variants or variants.get('source') != field_file.name:
+        return {}
+    storage = field_file.storage
+    result = {}
+    for size, variant in variants.items():
+        if isinstance(variant, dict):
+            result[size] = {
+                'width': variant['width'],
+                'height': variant['height'],
+                'webp': storage.url(variant['webp']) if variant.get('webp') else None,
+                'jpeg': storage.url(variant['jpeg']),
+            }
+    return result
+
+
+def _flatten(image):
+    """Приводит изображение к RGB (прозрачность заливается белым фоном)"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)  # Pillow не переносит EXIF/ICC, если их не передать явно
+    return buffer.getvalue()
+
+
+def _replace(storage, name, content):
+    """Сохраняет файл под тем же именем (storage.save добавил бы суффикс)"""
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def build_variants(field_file, sizes, max_dimension=IMAGE_MAX_DIMENSION):
+    """
+    Обрабатывает загруженное изображение.
+
+    Оригинал перекодируется без метаданных и с ограничением размера,
+    рядом сохраняются WebP и JPEG варианты. Возвращает словарь для
+    хранения в БД: {'source': имя оригинала, 'blurhash': ..., 'color': ...,
+    <размер>: {'width', 'height', 'webp', 'jpeg'}}.
+    """
+    storage = field_file.storage
+    field_file.open('rb')
+    try:
+        image = Image.open(field_file)
+        image_format = image.format
+        animated = getattr(image, 'is_animated', False)
+        image.load()
+    finally:
+        field_file.close()
+
+    image = ImageOps.exif_transpose(image)  # Применяем поворот из EXIF до удаления метаданных
+    source_name = field_file.name
+
+    # Оригинал: без EXIF/GPS и не больше max_dimension по большей стороне
+    if image_format in _REENCODE_FORMATS and not animated:
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        target = _REENCODE_FORMATS[image_format]
+        original = image if target != 'JPEG' else _flatten(image)
+        options = {'quality': 90, 'optimize': True} if target in ('JPEG', 'WEBP') else {'optimize': True}
+        source_name = _replace(storage, field_file.name, _encode(original, target, **options))
+
+    stem, _ = os.path.splitext(source_name)
+    rgb = _flatten(image)
+    variants = {'source': source_name}
+    for size, dimension in sizes.items():
+        resized = rgb.copy()
+        resized.thumbnail((dimension, dimension), Image.LANCZOS)  # Не увеличивает маленькие изображения
+        variants[size] = {
+            'width': resized.width,
+            'height': resized.height,
+            'webp': _replace(storage, f'{stem}_{size}.webp', _encode(resized, 'WEBP', quality=IMAGE_QUALITY, method=4)),
+            'jpeg': _replace(storage, f'{stem}_{size}.jpg', _encode(resized, 'JPEG', quality=IMAGE_QUALITY, optimize=True, progressive=True)),
+        }
+
+    variants['blurhash'], variants['color'] = blurhash_encode(rgb)
+    return variants
+
+
+def delete_variants(storage, variants, keep=None):
+    """Удаляет файлы вариантов, не входящие в keep"""
+    keep = keep or set()
+    for variant in (variants or {}).values():
+        if isinstance(variant, dict):
+            for name in (variant.get('webp'), variant.get('jpeg')):
+                if name and name not in keep:
+                    storage.delete(name)
+
+
+def variant_names(variants):
+    """Множество имен файлов вариантов"""
+    names = set()
+    for variant in (variants or {}).values():
+        if isinstance(variant, dict):
+            names.update(name for name in (variant.get('webp'), variant.get('jpeg')) if name)
+    return names
+
+
+# ------------------------------------------------------------------ blurhash --
+
+def _encode83(value, length):
+    result = ''
+    for i in range(1, length + 1):
+        digit = (value // (83 ** (length - i))) % 83
+        result += _BASE83[digit]
+    return result
+
+
+def _srgb_to_linear(value):
+    value = value / 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash_encode(image, x_components=4, y_components=3):
+    """Кодирует изображение в blurhash и возвращает (hash, средний цвет '#rrggbb')"""
+    small = image.convert('RGB')
+    small.thumbnail((32, 32))  # Для blurhash достаточно маленькой копии
+    width, height = small.size
+    pixels = [tuple(_srgb_to_linear(c) for c in pixel) for pixel in small.getdata()]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                basis_y = cos_y[j][y]
+                for x in range(width):
+                    basis = basis_y * cos_x[i][x]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, int(math.floor(actual_max * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _encode83(0, 1)
+
+    dc_rgb = tuple(_linear_to_srgb(value) for value in dc)
+    result += _encode83((dc_rgb[0] << 16) + (dc_rgb[1] << 8) + dc_rgb[2], 4)
+
+    def quantise(value):
+        return max(0, min(18, int(math.floor(_sign_pow(value / max_value, 0.5) * 9 + 9.5))))
+
+    for factor in ac:
+        result += _encode83(quantise(factor[0]) * 19 * 19 + quantise(factor[1]) * 19 + quantise(factor[2]), 2)
+    return result, '#%02x%02x%02x' % dc_rgb
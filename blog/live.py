@@ -0,0 +1,59 @@
+# Рассылка событий через слой каналов: live-поток комментариев поста
+import logging  # Импортируем модуль логирования
+
+from asgiref.sync import async_to_sync  # Импортируем вызов асинхронного слоя каналов из синхронного кода
+from channels.layers import get_channel_layer  # Импортируем слой каналов Django Channels
+from django.db import transaction  # Импортируем управление транзакциями
+from django.template.loader import render_to_string  # Импортируем рендеринг фрагментов шаблонов
+
+logger = logging.getLogger(__name__)  # Логгер модуля
+
+
+def group_send(group, event):
+    """Отправляет событие в группу каналов; недоступный слой каналов не ломает запрос"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(group, event)
+    except Exception:
+        logger.exception('Failed to send %s to group %s', event.get('type'), group)
+
+
+def post_group(post_id):
+    """Группа каналов читателей поста (см. PostCommentsConsumer)"""
+    return f'post_{post_id}'
+
+
+def comment_payload(comment):
+    """Данные нового комментария и готовый HTML фрагмент (один рендер на всех читателей, без запросов к БД)"""
+    if comment.parent_id:
+        html = render_to_string('blog/_comment_reply.html', {'reply': comment, 'live': True})
+    else:
+        html = render_to_string('blog/_comment.html', {'comment': comment, 'live': True})  # live: без запросов лайков и ответов
+    return {
+        'id': comment.pk,  # ID комментария
+        'post': comment.post_id,  # ID поста
+        'parent': comment.parent_id,  # ID родительского комментария (None для верхнего уровня)
+        'author': comment.author.username,  # Имя автора
+        'text': comment.text,  # Текст комментария
+        'created_date': comment.created_date.isoformat(),  # Дата создания в ISO формате
+        'html': html,  # Фрагмент для вставки в список комментариев
+    }
+
+
+def send_comment(comment):
+    """Отправляет комментарий в группу поста (вызывается после коммита)"""
+    try:
+        payload = comment_payload(comment)
+    except Exception:  # Ошибка рендеринга не должна ломать публикацию комментария
+        logger.exception('Failed to render live comment %s', comment.pk)
+        return
+    group_send(post_group(comment.post_id), {'type': 'comment_created', 'comment': payload})
+
+
+def broadcast_comment(comment):
+    """Рассылает опубликованный комментарий читателям поста после коммита транзакции"""
+    if comment.status != 'approved' or not comment.is_active:
+        return  # Комментарии на модерации не показываются
+    transaction.on_commit(lambda: send_comment(comment))
@@ -0,0 +1,28 @@
+# Создание профилей для пользователей, у которых их нет
+from django.contrib.auth.models import User  # Импортируем модель пользователя Django
+from django.core.management.base import BaseCommand  # Импортируем базовый класс команд
+
+from blog.models import UserProfile  # Модель профиля пользователя
+
+
+class Command(BaseCommand):
+    help = 'Создает недостающие профили пользователей пакетами (bulk_create)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество профилей в одном INSERT')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        missing = User.objects.filter(profile__isnull=True).order_by('pk')
+        created, last_pk = 0, 0
+        while True:
+            user_ids = list(missing.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+            if not user_ids:
+                break
+            last_pk = user_ids[-1]
+            # Профиль мог появиться параллельно (сигнал или UserProfile.for_user): такие не считаем созданными
+            existing = set(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+            profiles = [UserProfile(user_id=user_id) for user_id in user_ids if user_id not in existing]
+            UserProfile.objects.bulk_create(profiles, ignore_conflicts=True)  # ignore_conflicts: гонка между проверкой и INSERT
+            created += len(profiles)
+        self.stdout.write(self.style.SUCCESS(f'Создано профилей: {created}'))
@@ -0,0 +1,45 @@
+# Экспорт постов в JSONL/CSV файл потоково
+import time  # Импортируем time для замера скорости
+
+from django.core.management.base import BaseCommand, CommandError  # Импортируем базовый класс команд
+
+from blog.models import Post  # Модель постов
+from blog.transfer import FORMATS, export_rows, render_rows  # Потоковый экспорт постов
+
+
+class Command(BaseCommand):
+    help = 'Экспортирует посты в JSONL или CSV потоково (выборка пакетами по первичному ключу)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help='Путь к файлу или "-" для stdout')
+        parser.add_argument('--format', choices=FORMATS, help='Формат файла (по умолчанию по расширению, иначе jsonl)')
+        parser.add_argument('--status', choices=[value for value, _ in Post.STATUS_CHOICES], help='Экспортировать только посты с этим статусом')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество постов в одном запросе')
+
+    def handle(self, *args, **options):
+        path = options['output']
+        data_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        queryset = Post.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+
+        started, count = time.monotonic(), 0
+        rows = export_rows(queryset, batch_size=options['batch_size'])
+        if path == '-':
+            for line in render_rows(rows, data_format):
+                self.stdout.write(line, ending='')  # Сводка пишется в stderr, stdout содержит только данные
+                count += 1
+        else:
+            try:
+                stream = open(path, 'w', encoding='utf-8', newline='')
+            except OSError as e:
+                raise CommandError(f'Не удалось открыть файл: {e}')
+            with stream:
+                for line in render_rows(rows, data_format):
+                    stream.write(line)
+                    count += 1
+
+        count -= data_format == 'csv'  # Строка заголовка CSV
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else 0
+        self.stderr.write(self.style.SUCCESS(f'Экспортировано постов: {count} за {elapsed:.1f} с ({rate:.0f} постов/с)'))
@@ -0,0 +1,124 @@
+# Сборщик мусора хранилища блобов: удаляет файлы, на которые больше никто не ссылается
+import os  # Импортируем os для обхода каталога блобов
+from collections import Counter  # Импортируем счетчик для пересчета ссылок
+from datetime import timedelta  # Импортируем интервалы времени
+
+from django.conf import settings  # Импортируем настройки Django
+from django.core.files.storage import default_storage  # Импортируем хранилище медиа файлов
+from django.core.management.base import BaseCommand, CommandError  # Импортируем базовый класс команд
+from django.db import transaction  # Импортируем управление транзакциями
+from django.utils import timezone  # Импортируем утилиты времени
+
+from blog.models import MediaBlob  # Счетчики ссылок на блобы
+from blog.signals import MEDIA_FIELDS  # Поля с изображениями, ссылающиеся на блобы
+from blog.storage import BLOB_PREFIX, ContentAddressedStorage, blob_references  # Хранилище блобов
+
+
+class Command(BaseCommand):
+    help = 'Удаляет блобы медиа хранилища без ссылок (--recount пересчитывает ссылки и удаляет файлы без записи MediaBlob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recount', action='store_true', help='Пересчитать счетчики ссылок по данным БД')
+        parser.add_argument('--grace-hours', type=int, default=getattr(settings, 'MEDIA_BLOB_GC_GRACE_HOURS', 24), help='Не трогать блобы, изменявшиеся за последние N часов')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Размер пакета запросов к БД')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет удалено')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('DEFAULT_FILE_STORAGE не является blog.storage.ContentAddressedStorage')
+        self.storage = default_storage
+        self.dry_run = options['dry_run']
+        self.batch_size = options['batch_size']
+        self.cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+
+        if options['recount']:
+            changed = self.recount()
+            self.stdout.write(f'Пересчитано счетчиков: {changed}')
+        removed = self.sweep_unreferenced()
+        if options['recount']:
+            removed += self.sweep_orphans()  # Без пересчета у ссылаемого блоба может не быть записи MediaBlob
+
+        verb = 'Будет удалено' if self.dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{verb} блобов: {removed}'))
+
+    def is_stale(self, name):
+        # Файл, которого давно не касались (дедупликация обновляет mtime при повторной загрузке)
+        try:
+            return os.path.getmtime(self.storage.path(name)) < self.cutoff.timestamp()
+        except FileNotFoundError:
+            return True
+
+    def recount(self):
+        """Пересчитывает ссылки по всем полям с изображениями"""
+        counts = Counter()
+        for model, (field_name, variants_field) in MEDIA_FIELDS.items():
+            queryset = model.objects.only('pk', field_name, variants_field)
+            for instance in queryset.iterator(chunk_size=self.batch_size):
+                counts.update(blob_references(getattr(instance, field_name), getattr(instance, variants_field)))
+
+        changed, seen, batch = 0, set(), []
+        now = timezone.now()
+        for blob in MediaBlob.objects.only('pk', 'name', 'ref_count').iterator(chunk_size=self.batch_size):
+            seen.add(blob.name)
+            if blob.ref_count != counts[blob.name]:
+                blob.ref_count, blob.updated_at = counts[blob.name], now
+                batch.append(blob)
+            if len(batch) >= self.batch_size:
+                changed += self._flush(batch)
+        changed += self._flush(batch)
+
+        missing = [MediaBlob(name=name, ref_count=count) for name, count in counts.items() if name not in seen]
+        if not self.dry_run:
+            MediaBlob.objects.bulk_create(missing, batch_size=self.batch_size, ignore_conflicts=True)
+        return changed + len(missing)
+
+    def _flush(self, batch):
+        count = len(batch)
+        if batch and not self.dry_run:
+            MediaBlob.objects.bulk_update(batch, ['ref_count', 'updated_at'], batch_size=self.batch_size)
+        batch.clear()
+        return count
+
+    def sweep_unreferenced(self):
+        """Удаляет блобы с нулевым счетчиком ссылок пакетами"""
+        removed, last_pk = 0, 0
+        while True:
+            with transaction.atomic():
+                candidates = list(
+                    MediaBlob.objects.select_for_update(skip_locked=True)
+                    .filter(ref_count__lte=0, updated_at__lt=self.cutoff, pk__gt=last_pk)
+                    .order_by('pk')[:self.batch_size]
+                )
+                if not candidates:
+                    break
+                last_pk = candidates[-1].pk
+                stale = [blob for blob in candidates if self.is_stale(blob.name)]
+                if not self.dry_run:
+                    MediaBlob.objects.filter(pk__in=[blob.pk for blob in stale]).delete()
+                    for blob in stale:
+                        self.storage.purge(blob.name)
+                removed += len(stale)
+        return removed
+
+    def sweep_orphans(self):
+        """Удаляет файлы блобов, для которых нет записи MediaBlob (незавершенные сохранения)"""
+        root = self.storage.path(BLOB_PREFIX)
+        removed, batch = 0, []
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                name = os.path.relpath(os.path.join(directory, filename), self.storage.location).replace(os.sep, '/')
+                if self.is_stale(name):
+                    batch.append(name)
+                if len(batch) >= self.batch_size:
+                    removed += self._purge_orphans(batch)
+        removed += self._purge_orphans(batch)
+        return removed
+
+    def _purge_orphans(self, batch):
+        known = set(MediaBlob.objects.filter(name__in=batch).values_list('name', flat=True))
+        orphans = [name for name in batch if name not in known]
+        if not self.dry_run:
+            for name in orphans:
+                self.storage.purge(name)
+        batch.clear()
+        return len(orphans)
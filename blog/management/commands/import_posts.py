@@ -0,0 +1,47 @@
+# Импорт постов из JSONL/CSV файла пакетами (bulk_create)
+import sys  # Импортируем sys для чтения из stdin
+
+from django.contrib.auth.models import User  # Импортируем модель пользователя Django
+from django.core.management.base import BaseCommand, CommandError  # Импортируем базовый класс команд
+
+from blog.transfer import FORMATS, PostImporter, read_rows  # Потоковый импорт постов
+
+
+class Command(BaseCommand):
+    help = 'Импортирует посты из JSONL или CSV файла потоково, пакетами bulk_create (посты с существующим slug пропускаются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу или "-" для stdin')
+        parser.add_argument('--format', choices=FORMATS, help='Формат файла (по умолчанию по расширению, иначе jsonl)')
+        parser.add_argument('--author', help='Имя пользователя для строк без колонки author')
+        parser.add_argument('--create-categories', action='store_true', help='Создавать отсутствующие категории')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество постов в одном INSERT')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+
+        default_author_id = None
+        if options['author']:
+            default_author_id = User.objects.filter(username=options['author']).values_list('pk', flat=True).first()
+            if default_author_id is None:
+                raise CommandError(f'Пользователь не найден: {options["author"]}')
+
+        importer = PostImporter(
+            default_author_id=default_author_id,
+            create_categories=options['create_categories'],
+            batch_size=options['batch_size'],
+        )
+        if path == '-':
+            result = importer.run(read_rows(sys.stdin.buffer, data_format))
+        else:
+            try:
+                stream = open(path, 'rb')
+            except OSError as e:
+                raise CommandError(f'Не удалось открыть файл: {e}')
+            with stream:
+                result = importer.run(read_rows(stream, data_format))
+
+        for number, message in result.errors:
+            self.stderr.write(f'Строка {number}: {message}')
+        self.stdout.write(self.style.SUCCESS(result.summary()))
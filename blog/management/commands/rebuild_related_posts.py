@@ -0,0 +1,15 @@
+# Полный пересчет похожих постов (то же делает ежедневная Celery задача blog.tasks.rebuild_related_posts)
+from django.core.management.base import BaseCommand  # Импортируем базовый класс команд
+
+from blog.related import rebuild_related_posts  # Расчет похожих постов
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает похожие посты для всех опубликованных постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Списков в одной транзакции')
+
+    def handle(self, *args, **options):
+        total = rebuild_related_posts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано списков похожих постов: {total}'))
@@ -0,0 +1,15 @@
+# Полная сверка счетчиков авторов (то же делает ежедневная Celery задача blog.tasks.reconcile_author_stats)
+from django.core.management.base import BaseCommand  # Импортируем базовый класс команд
+
+from blog.models import AuthorStats  # Счетчики авторов
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики всех авторов по постам, комментариям и лайкам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Пользователей в одном UPDATE')
+
+    def handle(self, *args, **options):
+        total = AuthorStats.reconcile(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано счетчиков авторов: {total}'))
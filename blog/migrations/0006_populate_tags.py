@@ -0,0 +1,53 @@
+# Перенос строковых тегов постов в таблицы Tag и PostTag пакетами
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.tags import parse_tags
+
+BATCH_SIZE = 1000
+
+
+def populate_tags(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Tag = apps.get_model('blog', 'Tag')
+    PostTag = apps.get_model('blog', 'PostTag')
+
+    tag_ids = {}  # slug -> id, общий для всех пакетов
+    last_pk = 0
+    while True:
+        batch = list(
+            Post.objects.exclude(tags='').filter(pk__gt=last_pk)
+            .order_by('pk').values_list('pk', 'tags')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        parsed = [(post_id, parse_tags(tags)) for post_id, tags in batch]
+
+        names = {slug: name for _, tags in parsed for slug, name in tags if slug not in tag_ids}
+        if names:
+            Tag.objects.bulk_create([Tag(slug=slug, name=name) for slug, name in names.items()], ignore_conflicts=True)
+            tag_ids.update(Tag.objects.filter(slug__in=names).values_list('slug', 'pk'))
+        PostTag.objects.bulk_create(
+            [PostTag(post_id=post_id, tag_id=tag_ids[slug]) for post_id, tags in parsed for slug, _ in tags],
+            ignore_conflicts=True,
+        )
+
+    published = (
+        PostTag.objects.filter(tag=OuterRef('pk'), post__status='published')
+        .order_by().values('tag').annotate(count=Count('pk')).values('count')
+    )
+    Tag.objects.update(post_count=Coalesce(Subquery(published), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+def mark_inactive_rejected(apps, schema_editor):
+    # Скрытые до появления модерации комментарии считаются отклоненными
+    Comment = apps.get_model('blog', 'Comment')
+    Comment.objects.filter(is_active=False).update(status='rejected')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_populate_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'На модерации'), ('approved', 'Одобрен'), ('rejected', 'Отклонен')], default='approved', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['status', 'id'], name='blog_comment_queue_idx'),
+        ),
+        migrations.RunPython(mark_inactive_rejected, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:30
+
+from django.db import migrations
+
+# Таблица, колонка, имя индекса: GIN индексы pg_trgm по UPPER(колонка) для подсказок при вводе
+TRIGRAM_INDEXES = [
+    ('blog_post', 'title', 'blog_post_title_trgm_idx'),
+    ('auth_user', 'username', 'auth_user_username_trgm_idx'),
+    ('blog_category', 'name', 'blog_category_name_trgm_idx'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Только PostgreSQL: на остальных базах подсказки строятся по префиксному дереву в памяти
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column, name in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _table, _column, name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0009_notification_coalescing'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def populate_author_stats(apps, schema_editor):
+    # Начальные счетчики для всех пользователей пакетами
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    AuthorStats = apps.get_model('blog', 'AuthorStats')
+    Like = Post._meta.get_field('likes').remote_field.through
+
+    def total(queryset, field):
+        return Coalesce(Subquery(queryset.order_by().values(field).annotate(count=Count('pk')).values('count')), 0)
+
+    last_pk = 0
+    while True:
+        user_ids = list(User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not user_ids:
+            break
+        last_pk = user_ids[-1]
+        AuthorStats.objects.bulk_create([AuthorStats(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+        AuthorStats.objects.filter(user_id__in=user_ids).update(
+            posts_published=total(Post.objects.filter(author_id=OuterRef('user_id'), status='published'), 'author'),
+            comments_made=total(Comment.objects.filter(author_id=OuterRef('user_id'), is_active=True, status='approved'), 'author'),
+            likes_received=total(Like.objects.filter(post__author_id=OuterRef('user_id')), 'post__author'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0011_related_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_published', models.PositiveIntegerField(default=0)),
+                ('comments_made', models.PositiveIntegerField(default=0)),
+                ('likes_received', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Author stats',
+            },
+        ),
+        migrations.RunPython(populate_author_stats, migrations.RunPython.noop),
+    ]
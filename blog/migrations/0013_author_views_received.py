@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:45
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def populate_views_received(apps, schema_editor):
+    # Просмотры постов для уже существующих строк счетчиков пакетами
+    Post = apps.get_model('blog', 'Post')
+    AuthorStats = apps.get_model('blog', 'AuthorStats')
+    views = Post.objects.filter(author_id=OuterRef('user_id')).order_by().values('author').annotate(total=Sum('views')).values('total')
+
+    last_pk = 0
+    while True:
+        user_ids = list(AuthorStats.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not user_ids:
+            break
+        last_pk = user_ids[-1]
+        AuthorStats.objects.filter(user_id__in=user_ids).update(views_received=Coalesce(Subquery(views), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_author_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='views_received',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_views_received, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:52
+
+from django.db import migrations, models
+
+from blog.rendering import render_content, source_hash
+
+BATCH_SIZE = 500
+
+
+def render_existing_posts(apps, schema_editor):
+    # HTML, оглавление и время чтения для существующих постов пакетами
+    Post = apps.get_model('blog', 'Post')
+    last_pk = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content')[:BATCH_SIZE])
+        if not posts:
+            break
+        last_pk = posts[-1].pk
+        for post in posts:
+            result = render_content(post.content)
+            post.content_html, post.toc = result['html'], result['toc']
+            post.word_count, post.reading_time = result['word_count'], result['reading_time']
+            post.rendered_hash = source_hash(post.content)
+        Post.objects.bulk_update(posts, ['content_html', 'toc', 'word_count', 'reading_time', 'rendered_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_author_views_received'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='rendered_hash',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='toc',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('blog', '0014_post_rendering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('snapshot_number', models.PositiveIntegerField()),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('title', models.CharField(max_length=200)),
+                ('data', models.BinaryField()),
+                ('content_hash', models.CharField(max_length=32)),
+                ('content_length', models.PositiveIntegerField(default=0)),
+                ('editor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='post_revisions', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='blog.post')),
+            ],
+            options={
+                'ordering': ['post', '-number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postrevision',
+            constraint=models.UniqueConstraint(fields=('post', 'number'), name='blog_postrevision_number_unique'),
+        ),
+    ]
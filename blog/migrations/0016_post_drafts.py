@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_post_revisions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostDraft',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='draft', serialize=False, to='blog.post')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('title', models.CharField(max_length=200)),
+                ('content', models.TextField()),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,8 +1,21 @@
-from django.db import models  # Импорт модуля для работы с моделями Django
+import uuid  # Импорт генератора UUID (идентификаторы загрузок)
+from collections import defaultdict  # Импорт словаря со значениями по умолчанию
+from datetime import timedelta  # Импорт интервалов времени
+from django.db import IntegrityError, models, transaction  # Импорт модуля для работы с моделями Django и транзакциями
+from django.db.models import Count, OuterRef, Subquery, Sum  # Импорт выражений для подзапросов и агрегатов
+from django.db.models.functions import Coalesce, Greatest  # Импорт функций значения по умолчанию для NULL и максимума
 from django.contrib.auth.models import User  # Импорт стандартной модели пользователя Django
 from django.utils import timezone  # Импорт утилит для работы с временными зонами
 from django.urls import reverse  # Импорт функции для генерации URL
 from django.core.exceptions import ValidationError  # Импорт исключений для валидации
+from django.core.cache import cache  # Импорт кэша Django
+from django.utils.functional import cached_property  # Импорт свойства, вычисляемого один раз
+from .images import variant_url  # URL уменьшенных копий изображений
+from .auth import invalidate_principal  # Сброс кэшированного состояния пользователя
+from .slugs import allocate_slug, assign_slugs, slug_base  # Выделение уникальных slug
+from .tags import TAG_NAME_MAX_LENGTH, parse_tags  # Разбор строки тегов
+from .rendering import RENDER_INLINE_MAX_LENGTH, render_content, source_hash  # HTML и метаданные содержимого поста
+from .revisions import apply_delta, make_delta, pack, unpack  # Дельты и снимки ревизий
 
 # Модель категорий для группировки постов в блоге
 class Category(models.Model):
@@ -11,6 +24,9 @@ class Category(models.Model):
     color = models.CharField(max_length=7, default='#00ff41')  # Цвет категории в HEX формате для UI
     created_date = models.DateTimeField(auto_now_add=True)  # Дата создания категории (автоматически устанавливается)
     
+    CACHE_KEY = 'categories'  # Ключ кэша списка с числом постов (семейство 'categories' обслуживается L1 кэшем)
+    CACHE_TIMEOUT = 300  # Время жизни списка в кэше (секунды)
+
     class Meta:
         verbose_name_plural = "Categories"  # Множественное название для админ панели
         ordering = ['name']  # Сортировка по названию
@@ -18,10 +34,24 @@ class Category(models.Model):
     def __str__(self):
         return self.name  # Строковое представление категории
 
+    @classmethod
+    def with_post_counts(cls):
+        """Категории с числом постов (post_count) для боковых панелей - из кэша, без запроса на каждую страницу"""
+        categories = cache.get(cls.CACHE_KEY)
+        if categories is None:
+            categories = list(cls.objects.annotate(post_count=Count('posts')).order_by('name'))  # Meta.ordering в GROUP BY запросах не применяется
+            cache.set(cls.CACHE_KEY, categories, cls.CACHE_TIMEOUT)
+        return categories
+
+    @classmethod
+    def invalidate_cache(cls):
+        cache.delete(cls.CACHE_KEY)  # Во всех воркерах через L1 инвалидацию
+
 # Модель постов блога - основная модель для хранения статей
 class Post(models.Model):
     STATUS_CHOICES = [
         ('draft', 'Черновик'),  # Статус: черновик
+        ('scheduled', 'Запланирован'),  # Статус: ждет отложенной публикации (см. blog.publishing)
         ('published', 'Опубликован'),  # Статус: опубликован
         ('archived', 'Архивирован'),  # Статус: архивирован
     ]
@@ -30,47 +60,141 @@ class Post(models.Model):
     slug = models.SlugField(max_length=200, unique=True, blank=True)  # URL-friendly версия заголовка (уникальная)
     content = models.TextField()  # Основное содержимое поста
     excerpt = models.TextField(max_length=300, blank=True)  # Краткое описание поста (до 300 символов)
+    content_html = models.TextField(blank=True, editable=False)  # Готовый безопасный HTML содержимого
+    toc = models.JSONField(default=list, blank=True, editable=False)  # Оглавление: [{'level', 'title', 'anchor'}]
+    word_count = models.PositiveIntegerField(default=0, editable=False)  # Число слов в содержимом
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)  # Время чтения в минутах
+    rendered_hash = models.CharField(max_length=32, blank=True, editable=False)  # md5 текста, по которому построен HTML ('' - ждет Celery задачу)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='blog_posts')  # Автор поста
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='posts')  # Категория поста
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')  # Статус публикации
     created_date = models.DateTimeField(default=timezone.now)  # Дата создания
     published_date = models.DateTimeField(blank=True, null=True)  # Дата публикации (только для опубликованных постов)
+    publish_at = models.DateTimeField(blank=True, null=True)  # Время отложенной публикации (для запланированных постов)
     updated_date = models.DateTimeField(auto_now=True)  # Дата последнего обновления
     image = models.ImageField(upload_to='posts/%Y/%m/%d/', blank=True, null=True)  # Изображение поста
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # Уменьшенные копии изображения и blurhash (заполняет Celery задача)
     views = models.PositiveIntegerField(default=0)  # Счетчик просмотров
     likes = models.ManyToManyField(User, related_name='post_likes', blank=True)  # Пользователи, которые лайкнули пост
-    tags = models.CharField(max_length=200, blank=True)  # Теги для поиска и группировки
+    tags = models.CharField(max_length=200, blank=True)  # Теги через запятую (исходная строка, из нее строятся связи tag_set)
+    tag_set = models.ManyToManyField('Tag', through='PostTag', related_name='posts', blank=True)  # Нормализованные теги (синхронизируются сигналом)
     
     class Meta:
         ordering = ['-published_date', '-created_date']  # Сортировка: сначала новые опубликованные, затем черновики
+        indexes = [
+            models.Index(fields=['publish_at'], name='blog_post_due_idx', condition=models.Q(status='scheduled')),  # Очередь отложенной публикации
+            models.Index(fields=['author', '-published_date'], name='blog_post_author_feed_idx'),  # Последние посты автора (лента подписок)
+        ]
     
     def __str__(self):
         return self.title  # Строковое представление поста
+
+    def clean(self):
+        """Запланированному посту нужно время публикации в будущем"""
+        if self.status == 'scheduled' and (not self.publish_at or self.publish_at <= timezone.now()):
+            raise ValidationError('Для отложенной публикации укажите время в будущем.')
     
     def get_absolute_url(self):
         return reverse('post_detail', kwargs={'pk': self.pk, 'slug': self.slug})  # Абсолютный URL поста
     
+    SLUG_SAVE_ATTEMPTS = 3  # Сколько раз пересчитать slug при гонке параллельных сохранений
+    RENDERED_FIELDS = ['content_html', 'toc', 'word_count', 'reading_time', 'rendered_hash']  # Поля, заполняемые render()
+
     def save(self, *args, **kwargs):
-        # Автоматическая генерация slug если он не заполнен
+        self.fill_defaults()
         if not self.slug:
-            from django.utils.text import slugify
-            base_slug = slugify(self.title)  # Создаем базовый slug из заголовка
-            if not base_slug:
-                base_slug = 'post'  # Fallback slug если заголовок пустой
-            self.slug = base_slug
-            counter = 1
-            # Делаем slug уникальным, добавляя номер если такой slug уже существует
-            while Post.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
-                self.slug = f"{base_slug}-{counter}"
-                counter += 1
+            self._save_with_generated_slug(*args, **kwargs)  # Slug выдается одним запросом, гонки ловит unique индекс
+            return
+        super().save(*args, **kwargs)  # Сохраняем объект
+
+    def fill_defaults(self):
+        """Заполняет дату публикации, excerpt и HTML (общая логика save() и bulk_create_with_slugs())"""
         # Устанавливаем дату публикации при смене статуса на "опубликован"
         if self.status == 'published' and not self.published_date:
             self.published_date = timezone.now()
         # Автоматически создаем excerpt из content если он не заполнен
         if not self.excerpt and self.content:
             self.excerpt = self.content[:297] + '...' if len(self.content) > 300 else self.content
-        super().save(*args, **kwargs)  # Сохраняем объект
-    
+        if 'content' not in self.get_deferred_fields():
+            self.render(inline=True)
+
+    def render(self, inline=False):
+        """
+        Перестраивает HTML, оглавление и время чтения, если текст изменился.
+        При inline=True крупные посты не рендерятся, а помечаются для Celery
+        задачи render_post_content. Возвращает True, если поля изменены.
+        """
+        text_hash = source_hash(self.content)
+        if self.rendered_hash == text_hash:
+            return False  # Например, правка заголовка или статуса
+        if inline and len(self.content) > RENDER_INLINE_MAX_LENGTH:
+            self.content_html, self.rendered_hash = '', ''  # Старый HTML не показывается, пока задача не выполнится
+            return True
+        for field, value in render_content(self.content).items():
+            setattr(self, 'content_html' if field == 'html' else field, value)
+        self.rendered_hash = text_hash
+        self.__dict__.pop('rendered', None)
+        return True
+
+    @cached_property
+    def rendered(self):
+        """HTML и метаданные для шаблона и API (крупный пост, ожидающий задачу, рендерится на лету)"""
+        if self.rendered_hash:
+            return {'html': self.content_html, 'toc': self.toc, 'word_count': self.word_count, 'reading_time': self.reading_time}
+        return render_content(self.content)
+
+    def _save_with_generated_slug(self, *args, **kwargs):
+        # Параллельный запрос мог занять тот же номер: откатываем savepoint и выдаем следующий
+        base = slug_base(self.title, self._meta.get_field('slug').max_length)
+        for attempt in range(self.SLUG_SAVE_ATTEMPTS):
+            self.slug = allocate_slug(Post.objects.exclude(pk=self.pk), base)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                if attempt == self.SLUG_SAVE_ATTEMPTS - 1 or not Post.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
+                    self.slug = ''
+                    raise  # Ошибка не связана со slug или попытки исчерпаны
+
+    @classmethod
+    def bulk_create_with_slugs(cls, posts, batch_size=500):
+        """
+        Массовое создание постов (импорт): slug назначаются за один проход,
+        без запроса на каждый пост. Сигналы post_save не отправляются.
+        """
+        for post in posts:
+            post.fill_defaults()
+        created = []
+        for start in range(0, len(posts), batch_size):
+            batch = posts[start:start + batch_size]
+            generated = [post for post in batch if not post.slug]  # Сбрасываются при повторной попытке
+            for attempt in range(cls.SLUG_SAVE_ATTEMPTS):
+                assign_slugs(batch, cls.objects.all())
+                try:
+                    with transaction.atomic():
+                        created.extend(cls.objects.bulk_create(batch))
+                    break
+                except IntegrityError:
+                    if attempt == cls.SLUG_SAVE_ATTEMPTS - 1:
+                        raise
+                    for post in generated:
+                        post.slug = ''
+        PostTag.sync([post for post in created if post.tags])  # bulk_create не отправляет post_save
+        if any(post.category_id for post in created):
+            Category.invalidate_cache()  # Счетчики постов в категориях
+        from .tasks import enqueue, fan_out_posts, recount_author_stats, render_post_content  # Локальный импорт: tasks импортирует модели
+        if any(post.status == 'published' for post in created):
+            enqueue(recount_author_stats, post_ids=[post.pk for post in created])
+            enqueue(fan_out_posts, [post.pk for post in created if post.status == 'published'])  # Ленты подписчиков
+        pending = [post.pk for post in created if not post.rendered_hash]
+        if pending:
+            enqueue(render_post_content, pending)  # Крупные посты, пропущенные fill_defaults()
+        from .publishing import arm  # Локальный импорт: publishing импортирует модели
+        for publish_at in {post.publish_at for post in created if post.status == 'scheduled'}:
+            arm(publish_at)  # Таймеры отложенной публикации (сигнал post_save не отправляется)
+        return created
+
     def like_count(self):
         return self.likes.count()  # Количество лайков поста
     
@@ -80,8 +204,222 @@ class Post(models.Model):
     def is_published(self):
         return self.status == 'published'  # Проверка статуса публикации
 
+    @property
+    def thumbnail_url(self):
+        return variant_url(self.image, self.image_variants, 'thumb')  # Маленькая копия для списков (JPEG)
+
+    @property
+    def thumbnail_webp_url(self):
+        return variant_url(self.image, self.image_variants, 'thumb', 'webp')  # Маленькая копия для списков (WebP)
+
+    @property
+    def large_image_url(self):
+        return variant_url(self.image, self.image_variants, 'large')  # Копия для детальной страницы (JPEG)
+
+    @property
+    def large_image_webp_url(self):
+        return variant_url(self.image, self.image_variants, 'large', 'webp')  # Копия для детальной страницы (WebP)
+
+# Модель тега: нормализованные теги постов со счетчиком опубликованных постов
+class Tag(models.Model):
+    name = models.CharField(max_length=TAG_NAME_MAX_LENGTH)  # Название тега (как его впервые написал автор)
+    slug = models.SlugField(max_length=TAG_NAME_MAX_LENGTH, unique=True, allow_unicode=True)  # Ключ тега в URL и фильтрах
+    post_count = models.PositiveIntegerField(default=0)  # Количество опубликованных постов с тегом (пересчитывается при изменениях)
+
+    class Meta:
+        ordering = ['name']  # Сортировка по названию
+        indexes = [
+            models.Index(fields=['-post_count', 'name'], name='blog_tag_cloud_idx'),  # Облако тегов: самые популярные
+        ]
+
+    def __str__(self):
+        return self.name  # Строковое представление тега
+
+    def get_absolute_url(self):
+        return reverse('tag_posts', kwargs={'slug': self.slug})  # Страница постов с тегом
+
+    @classmethod
+    def recount(cls, tag_ids):
+        """Пересчитывает post_count для указанных тегов одним UPDATE"""
+        if not tag_ids:
+            return 0
+        published = (
+            PostTag.objects.filter(tag=OuterRef('pk'), post__status='published')
+            .order_by().values('tag').annotate(count=Count('pk')).values('count')
+        )
+        return cls.objects.filter(pk__in=tag_ids).update(post_count=Coalesce(Subquery(published), 0))
+
+# Связь поста с тегом (промежуточная таблица Post.tag_set)
+class PostTag(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_tags')  # Пост
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='post_tags')  # Тег
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'post'], name='blog_posttag_unique'),  # Индекс для страниц тегов
+        ]
+
+    @classmethod
+    def sync(cls, posts):
+        """
+        Приводит связи постов с тегами в соответствие со строкой Post.tags
+        и пересчитывает счетчики затронутых тегов (запросы не зависят от числа постов).
+        """
+        wanted = {post.pk: dict(parse_tags(post.tags)) for post in posts}  # id поста -> {slug: название}
+        if not wanted:
+            return
+        names = {slug: name for tags in wanted.values() for slug, name in tags.items()}
+        tag_ids = dict(Tag.objects.filter(slug__in=names).values_list('slug', 'pk')) if names else {}
+        missing = names.keys() - tag_ids.keys()
+        if missing:
+            Tag.objects.bulk_create([Tag(slug=slug, name=names[slug]) for slug in missing], ignore_conflicts=True)
+            tag_ids.update(Tag.objects.filter(slug__in=missing).values_list('slug', 'pk'))
+
+        current = defaultdict(dict)  # id поста -> {id тега: id связи}
+        for pk, post_id, tag_id in cls.objects.filter(post_id__in=wanted).values_list('pk', 'post_id', 'tag_id'):
+            current[post_id][tag_id] = pk
+        stale, new, affected = [], [], set()
+        for post_id, tags in wanted.items():
+            wanted_ids = {tag_ids[slug] for slug in tags if slug in tag_ids}
+            stale.extend(pk for tag_id, pk in current[post_id].items() if tag_id not in wanted_ids)
+            new.extend(cls(post_id=post_id, tag_id=tag_id) for tag_id in wanted_ids - current[post_id].keys())
+            affected |= wanted_ids | current[post_id].keys()  # Статус поста мог измениться - пересчитываем все его теги
+        if stale:
+            cls.objects.filter(pk__in=stale).delete()
+        if new:
+            cls.objects.bulk_create(new, ignore_conflicts=True)
+        Tag.recount(affected)
+
+# Ревизии поста: полный снимок или дельта от предыдущей ревизии (см. blog.revisions)
+class PostRevision(models.Model):
+    SNAPSHOT_INTERVAL = 20  # Снимок не реже чем раз в столько ревизий: версия собирается не больше чем из стольких строк
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='revisions')  # Пост
+    number = models.PositiveIntegerField()  # Номер ревизии в пределах поста, с 1
+    snapshot_number = models.PositiveIntegerField()  # Номер снимка, от которого строится цепочка дельт (равен number у снимка)
+    editor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='post_revisions')  # Кто сохранил
+    created_date = models.DateTimeField(default=timezone.now)  # Дата правки
+    title = models.CharField(max_length=200)  # Заголовок версии
+    data = models.BinaryField()  # zlib(JSON): текст снимка или дельта от предыдущей ревизии
+    content_hash = models.CharField(max_length=32)  # md5 текста версии (дельта строится, только если прежний текст совпадает)
+    content_length = models.PositiveIntegerField(default=0)  # Длина текста версии
+
+    class Meta:
+        ordering = ['post', '-number']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'number'], name='blog_postrevision_number_unique'),  # Индекс для цепочки и списка ревизий
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} #{self.number}'
+
+    @property
+    def is_snapshot(self):
+        return self.snapshot_number == self.number
+
+    @classmethod
+    def record(cls, post, previous=None, editor_id=None):
+        """
+        Сохраняет текущую версию поста. previous - (заголовок, текст) до правки,
+        None для нового поста. У поста без истории (импорт, посты старше
+        ревизий) сначала сохраняется снимок прежней версии.
+        """
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    return cls._append(post, previous, editor_id)
+            except IntegrityError:
+                if attempt:
+                    raise  # Параллельная правка заняла номер: повторяем от новой последней ревизии
+
+    @classmethod
+    def _append(cls, post, previous, editor_id):
+        last = None
+        if previous is not None:
+            last = cls.objects.filter(post=post).order_by('-number').only('number', 'snapshot_number', 'content_hash').first()
+            if last is None:
+                last = cls._snapshot(post, 1, *previous, None, created_date=post.created_date)
+
+        number = last.number + 1 if last else 1
+        if last and last.content_hash == source_hash(previous[1]) and number - last.snapshot_number < cls.SNAPSHOT_INTERVAL:
+            data = pack(make_delta(previous[1], post.content))
+            if len(data) < len(pack(post.content)):  # Иначе снимок не больше дельты
+                return cls.objects.create(
+                    post=post, number=number, snapshot_number=last.snapshot_number, editor_id=editor_id, title=post.title,
+                    data=data, content_hash=source_hash(post.content), content_length=len(post.content),
+                )
+        return cls._snapshot(post, number, post.title, post.content, editor_id)  # Новый пост, конец интервала или расхождение с историей
+
+    @classmethod
+    def _snapshot(cls, post, number, title, content, editor_id, **kwargs):
+        return cls.objects.create(
+            post=post, number=number, snapshot_number=number, editor_id=editor_id, title=title,
+            data=pack(content), content_hash=source_hash(content), content_length=len(content), **kwargs,
+        )
+
+    def content(self):
+        """Текст версии: ближайший снимок и следующие дельты одним запросом по индексу (post, number)"""
+        text = ''
+        for data in (
+            PostRevision.objects.filter(post_id=self.post_id, number__gte=self.snapshot_number, number__lte=self.number)
+            .order_by('number').values_list('data', flat=True)
+        ):
+            value = unpack(data)
+            text = value if isinstance(value, str) else apply_delta(text, value)
+        return text
+
+# Автосохраненный черновик правки поста (рабочая копия - в кэше, см. blog.drafts)
+class PostDraft(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='draft')  # Редактируемый пост
+    version = models.PositiveIntegerField(default=0)  # Версия черновика (растет с каждым автосохранением)
+    title = models.CharField(max_length=200)  # Заголовок черновика
+    content = models.TextField()  # Текст черновика
+    updated_date = models.DateTimeField(auto_now=True)  # Дата последней записи в БД
+
+    def __str__(self):
+        return f'Draft of {self.post_id} v{self.version}'
+
+    @classmethod
+    def store(cls, post_id, draft):
+        """Сохраняет черновик из кэша, если он новее записанного (запоздавшая задача не откатывает версию)"""
+        fields = {'version': draft['version'], 'title': draft['title'], 'content': draft['content'], 'updated_date': timezone.now()}
+        if not cls.objects.filter(post_id=post_id, version__lt=draft['version']).update(**fields):
+            cls.objects.bulk_create([cls(post_id=post_id, **fields)], ignore_conflicts=True)  # Первая запись; существующую не трогает
+
+# Готовые похожие посты (считаются фоновой задачей, см. blog.related)
+class RelatedPost(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_links')  # Пост, для которого подобраны похожие
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')  # Похожий пост
+    rank = models.PositiveSmallIntegerField()  # Место в списке (0 - самый похожий)
+    score = models.FloatField()  # Оценка сходства
+
+    class Meta:
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'], name='blog_relatedpost_rank_unique'),  # Индекс для выборки списка поста
+        ]
+
+    @classmethod
+    def replace(cls, lists):
+        """Заменяет списки похожих постов: {id поста: [(id похожего, оценка), ...]}"""
+        if not lists:
+            return
+        with transaction.atomic():
+            cls.objects.filter(post_id__in=lists).delete()
+            cls.objects.bulk_create([
+                cls(post_id=post_id, related_id=related_id, rank=rank, score=score)
+                for post_id, related in lists.items()
+                for rank, (related_id, score) in enumerate(related)
+            ])
+
 # Модель комментариев к постам с поддержкой вложенности (ответы на комментарии)
 class Comment(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'На модерации'),  # Ожидает проверки (скрыт)
+        ('approved', 'Одобрен'),  # Опубликован
+        ('rejected', 'Отклонен'),  # Отклонен модератором (скрыт)
+    ]
+
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')  # Связанный пост
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='blog_comments')  # Автор комментария
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')  # Родительский комментарий (для ответов)
@@ -89,10 +427,14 @@ class Comment(models.Model):
     created_date = models.DateTimeField(default=timezone.now)  # Дата создания
     updated_date = models.DateTimeField(auto_now=True)  # Дата последнего редактирования
     is_active = models.BooleanField(default=True)  # Активность комментария (для модерации)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='approved')  # Состояние модерации (is_active = одобрен)
     likes = models.ManyToManyField(User, related_name='comment_likes', blank=True)  # Пользователи, лайкнувшие комментарий
     
     class Meta:
         ordering = ['-created_date']  # Сортировка: сначала новые комментарии
+        indexes = [
+            models.Index(fields=['status', 'id'], name='blog_comment_queue_idx'),  # Очередь модерации с keyset пагинацией по id
+        ]
     
     def __str__(self):
         return f'Comment by {self.author} on {self.post}'  # Строковое представление
@@ -103,6 +445,48 @@ class Comment(models.Model):
     def like_count(self):
         return self.likes.count()  # Количество лайков комментария
 
+    @staticmethod
+    def initial_state(user):
+        """Поля нового комментария: на модерации, если она включена (комментарии staff публикуются сразу)"""
+        if SiteSettings.load().moderate_comments and not user.is_staff:
+            return {'status': 'pending', 'is_active': False}
+        return {'status': 'approved', 'is_active': True}
+
+    def hold_for_moderation(self, user):
+        """Применяет initial_state к несохраненному комментарию; True - комментарий ждет модерации"""
+        for field, value in self.initial_state(user).items():
+            setattr(self, field, value)
+        return self.status == 'pending'
+
+    @classmethod
+    def approve(cls, comment_ids):
+        """Одобряет комментарии одним UPDATE и ставит уведомление авторов в очередь; возвращает число одобренных"""
+        from .tasks import enqueue, notify_approved_comments, recount_author_stats  # Локальный импорт: tasks импортирует модели
+        with transaction.atomic():
+            ids = list(cls.objects.select_for_update().filter(pk__in=comment_ids).exclude(status='approved').order_by('pk').values_list('pk', flat=True))
+            cls.objects.filter(pk__in=ids).update(status='approved', is_active=True)
+        if ids:
+            enqueue(notify_approved_comments, ids)
+            enqueue(recount_author_stats, comment_ids=ids)  # UPDATE не отправляет post_save
+        return len(ids)
+
+    @classmethod
+    def reject(cls, comment_ids):
+        """Отклоняет комментарии одним UPDATE; возвращает число отклоненных"""
+        from .tasks import enqueue, recount_author_stats  # Локальный импорт: tasks импортирует модели
+        updated = cls.objects.filter(pk__in=comment_ids).exclude(status='rejected').update(status='rejected', is_active=False)
+        if updated:
+            enqueue(recount_author_stats, comment_ids=list(comment_ids))  # UPDATE не отправляет post_save
+        return updated
+
+def active_comment_count():
+    """Выражение для annotate(): число активных комментариев поста одним подзапросом, без запроса на строку"""
+    comments = (
+        Comment.objects.filter(post=OuterRef('pk'), is_active=True)
+        .order_by().values('post').annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(comments), 0)
+
 # Модель профиля пользователя с дополнительной информацией
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')  # Связанный пользователь
@@ -110,6 +494,7 @@ class UserProfile(models.Model):
     location = models.CharField(max_length=100, blank=True)  # Местоположение
     website = models.URLField(blank=True)  # Личный сайт
     avatar = models.ImageField(upload_to='avatars/%Y/%m/%d/', blank=True, null=True)  # Аватар пользователя
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)  # Уменьшенные копии аватара (заполняет Celery задача)
     birth_date = models.DateField(null=True, blank=True)  # Дата рождения
     is_banned = models.BooleanField(default=False)  # Флаг блокировки
     ban_reason = models.TextField(blank=True)  # Причина блокировки
@@ -120,16 +505,163 @@ class UserProfile(models.Model):
     
     def __str__(self):
         return f'{self.user.username} Profile'  # Строковое представление профиля
+
+    @property
+    def avatar_small_url(self):
+        return variant_url(self.avatar, self.avatar_variants, 'small')  # Аватар для списков
+
+    @property
+    def avatar_medium_url(self):
+        return variant_url(self.avatar, self.avatar_variants, 'medium')  # Аватар для страницы профиля
     
+    @classmethod
+    def for_user(cls, user):
+        # Профиль пользователя; создается при первом обращении, если его нет
+        try:
+            return user.profile
+        except cls.DoesNotExist:
+            profile, _ = cls.objects.get_or_create(user=user)  # Безопасно при параллельных запросах (user_id уникален)
+            user.profile = profile  # Кэшируем профиль на объекте пользователя
+            return profile
+
     def is_currently_banned(self):
         if not self.is_banned:
             return False  # Не заблокирован
-        # Проверяем, не истекла ли блокировка
-        if self.ban_expires and timezone.now() > self.ban_expires:
-            self.is_banned = False  # Снимаем блокировку если время истекло
-            self.save()
-            return False
-        return True  # Все еще заблокирован
+        # Истекшая блокировка не действует; флаг сбрасывает периодическая задача expire_bans
+        return self.ban_expires is None or self.ban_expires > timezone.now()
+
+    @classmethod
+    def ban_users(cls, user_ids, reason='', expires=None):
+        # Блокировка пользователей одним UPDATE (профили создаются только для тех, у кого их нет)
+        user_ids = list(user_ids)
+        changes = {'is_banned': True, 'ban_reason': reason, 'ban_expires': expires}
+        updated = cls.objects.filter(user_id__in=user_ids).update(updated_at=timezone.now(), **changes)
+        if updated < len(user_ids):
+            missing = set(user_ids) - set(cls.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+            cls.objects.bulk_create([cls(user_id=user_id, **changes) for user_id in missing], ignore_conflicts=True)
+            updated += len(missing)
+        invalidate_principal(*user_ids)  # Сбрасываем кэшированное состояние блокировки
+        return updated
+
+    @classmethod
+    def unban_users(cls, user_ids):
+        # Разблокировка пользователей одним UPDATE
+        user_ids = list(user_ids)
+        updated = cls.objects.filter(user_id__in=user_ids, is_banned=True).update(
+            is_banned=False, ban_reason='', ban_expires=None, updated_at=timezone.now()
+        )
+        invalidate_principal(*user_ids)
+        return updated
+
+    @classmethod
+    def expire_bans(cls):
+        # Снимает истекшие блокировки одним UPDATE; возвращает количество разблокированных
+        expired = cls.objects.filter(is_banned=True, ban_expires__lte=timezone.now())
+        user_ids = list(expired.values_list('user_id', flat=True))
+        if not user_ids:
+            return 0
+        updated = expired.filter(user_id__in=user_ids).update(
+            is_banned=False, ban_reason='', ban_expires=None, updated_at=timezone.now()
+        )
+        invalidate_principal(*user_ids)
+        return updated
+
+# Счетчики автора: обновляются инкрементально при записи, профили читают готовые числа
+class AuthorStats(models.Model):
+    COUNTERS = ('posts_published', 'comments_made', 'likes_received', 'views_received', 'followers')  # Поля счетчиков
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')  # Автор
+    posts_published = models.PositiveIntegerField(default=0)  # Опубликованных постов
+    comments_made = models.PositiveIntegerField(default=0)  # Видимых (активных одобренных) комментариев
+    likes_received = models.PositiveIntegerField(default=0)  # Лайков на постах автора
+    views_received = models.PositiveBigIntegerField(default=0)  # Просмотров постов автора (по Post.views в ночной сверке)
+    followers = models.PositiveIntegerField(default=0)  # Подписчиков (решает, рассылать ли посты автора по лентам)
+
+    class Meta:
+        verbose_name_plural = 'Author stats'
+
+    @classmethod
+    def for_user(cls, user_id):
+        """Счетчики пользователя (несохраненный нулевой объект, если записи еще нет)"""
+        return cls.objects.filter(user_id=user_id).first() or cls(user_id=user_id)
+
+    @classmethod
+    def adjust(cls, user_id, **deltas):
+        """Изменяет счетчики одним UPDATE: adjust(user_id, likes_received=-1); не уходит ниже нуля"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not user_id or not deltas:
+            return
+        changes = {field: Greatest(models.F(field) + delta, 0) for field, delta in deltas.items()}
+        if not cls.objects.filter(user_id=user_id).update(**changes) and any(delta > 0 for delta in deltas.values()):
+            cls.objects.bulk_create([cls(user_id=user_id)], ignore_conflicts=True)  # Первая запись (уменьшать нулевые счетчики незачем)
+            cls.objects.filter(user_id=user_id).update(**changes)
+
+    @classmethod
+    def recount(cls, user_ids):
+        """Пересчитывает счетчики указанных пользователей по исходным таблицам одним UPDATE"""
+        user_ids = {user_id for user_id in user_ids if user_id}
+        if not user_ids:
+            return 0
+        cls.objects.bulk_create([cls(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+        return cls.objects.filter(user_id__in=user_ids).update(**cls.counter_expressions())
+
+    @classmethod
+    def reconcile(cls, batch_size=1000):
+        """Полная сверка: пересчитывает счетчики всех пользователей пакетами, возвращает число строк"""
+        total, last_pk = 0, 0
+        while True:
+            user_ids = list(User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not user_ids:
+                return total
+            last_pk = user_ids[-1]
+            total += cls.recount(user_ids)  # Каждый пакет - отдельный короткий UPDATE
+
+    @staticmethod
+    def counter_expressions():
+        """Подзапросы, вычисляющие счетчики для строки AuthorStats (OuterRef('user_id'))"""
+        def total(queryset, field, aggregate=Count('pk')):
+            return Coalesce(Subquery(queryset.order_by().values(field).annotate(total=aggregate).values('total')), 0)
+        return {
+            'posts_published': total(Post.objects.filter(author_id=OuterRef('user_id'), status='published'), 'author'),
+            'comments_made': total(Comment.objects.filter(author_id=OuterRef('user_id'), is_active=True, status='approved'), 'author'),
+            'likes_received': total(Post.likes.through.objects.filter(post__author_id=OuterRef('user_id')), 'post__author'),
+            'views_received': total(Post.objects.filter(author_id=OuterRef('user_id')), 'author', Sum('views')),  # Просмотры остаются за автором и после снятия с публикации
+            'followers': total(Follow.objects.filter(author_id=OuterRef('user_id')), 'author'),
+        }
+
+# Подписка пользователя на автора (лента подписок - blog.feed)
+class Follow(models.Model):
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')  # Подписчик
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')  # Автор
+    created_date = models.DateTimeField(auto_now_add=True)  # Дата подписки
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'author'], name='blog_follow_unique'),  # Подписки пользователя
+            models.CheckConstraint(check=~models.Q(follower=models.F('author')), name='blog_follow_not_self'),  # На себя не подписываются
+        ]
+        indexes = [
+            models.Index(fields=['author', 'follower'], name='blog_follow_author_idx'),  # Подписчики автора по порядку id (рассылка пакетами)
+        ]
+
+    def __str__(self):
+        return f'{self.follower_id} -> {self.author_id}'
+
+    @classmethod
+    def follow(cls, follower_id, author_id):
+        """Подписывает пользователя на автора; False - подписка уже есть"""
+        try:
+            with transaction.atomic():
+                cls.objects.create(follower_id=follower_id, author_id=author_id)
+        except IntegrityError:
+            return False  # Повторный или параллельный запрос
+        return True
+
+    @classmethod
+    def unfollow(cls, follower_id, author_id):
+        """Отменяет подписку; False - подписки не было"""
+        deleted, _counts = cls.objects.filter(follower_id=follower_id, author_id=author_id).delete()  # post_delete обновляет счетчик и ленту
+        return bool(deleted)
 
 # Модель уведомлений для пользователей
 class Notification(models.Model):
@@ -148,14 +680,135 @@ class Notification(models.Model):
     related_post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True)  # Связанный пост
     related_comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True)  # Связанный комментарий
     is_read = models.BooleanField(default=False)  # Статус прочтения
-    created_date = models.DateTimeField(default=timezone.now)  # Дата создания
+    created_date = models.DateTimeField(default=timezone.now)  # Дата создания (для объединенных - дата последнего события)
+    actor_count = models.PositiveIntegerField(default=1)  # Сколько пользователей объединено в уведомлении
+    recent_actors = models.JSONField(default=list, blank=True)  # Имена последних участников, новые первыми
+    
+    COALESCE_WINDOW = timedelta(hours=1)  # Окно объединения по умолчанию
+    RECENT_ACTORS = 3  # Сколько последних участников хранить
+    ARCHIVE_FIELDS = ['id', 'user_id', 'notification_type', 'title', 'message', 'related_post_id', 'related_comment_id', 'created_date']  # Поля, переносимые в архив
     
     class Meta:
         ordering = ['-created_date']  # Сортировка: сначала новые уведомления
+        indexes = [
+            models.Index(fields=['user', 'is_read', '-created_date'], name='blog_notif_user_unread_idx'),  # Непрочитанные пользователя, новые первыми
+            models.Index(fields=['created_date'], name='blog_notif_read_age_idx', condition=models.Q(is_read=True)),  # Кандидаты на архивацию
+        ]
     
     def __str__(self):
         return f'Notification for {self.user.username}: {self.title}'  # Строковое представление
 
+    @classmethod
+    def archive_read(cls, before, batch_size=1000, archive=True):
+        """
+        Переносит прочитанные уведомления старше before в NotificationArchive
+        (или удаляет при archive=False) пакетами. Каждый пакет - отдельная
+        короткая транзакция, поэтому блокировки не держатся долго.
+        """
+        total = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    cls.objects.filter(is_read=True, created_date__lt=before)
+                    .order_by('created_date').values(*cls.ARCHIVE_FIELDS)[:batch_size]  # Индекс blog_notif_read_age_idx
+                )
+                if not rows:
+                    return total
+                if archive:
+                    NotificationArchive.objects.bulk_create([NotificationArchive(**row) for row in rows], ignore_conflicts=True)
+                cls.objects.filter(pk__in=[row['id'] for row in rows]).delete()  # Один DELETE: на уведомления ничто не ссылается
+            total += len(rows)
+            if len(rows) < batch_size:
+                return total
+
+    @staticmethod
+    def describe_actors(names, count):
+        """'alice', 'alice and bob' или 'alice and 12 others'"""
+        if count <= 1 or not names:
+            return names[0] if names else 'Someone'
+        if count == 2 and len(names) > 1:
+            return f'{names[0]} and {names[1]}'
+        others = count - 1
+        return f'{names[0]} and {others} other' + ('s' if others > 1 else '')
+
+    @classmethod
+    def coalesce(cls, user_id, notification_type, actor, title, verb, related_post=None, related_comment=None, window=None):
+        """
+        Добавляет событие к непрочитанному уведомлению того же типа о том же посте
+        за последние window (одна строка со счетчиком) или создает новое.
+        Возвращает (уведомление, изменилось ли оно).
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            notification = (
+                cls.objects.select_for_update()  # Одновременные лайки одного поста обновляют строку по очереди
+                .filter(user_id=user_id, notification_type=notification_type, related_post=related_post,
+                        is_read=False, created_date__gte=now - (window or cls.COALESCE_WINDOW))
+                .order_by('-created_date').first()  # Индекс blog_notif_user_unread_idx
+            )
+            if notification is None:
+                return cls.objects.create(
+                    user_id=user_id, notification_type=notification_type, title=title, message=f'{actor} {verb}',
+                    related_post=related_post, related_comment=related_comment, recent_actors=[actor], created_date=now,
+                ), True
+            if actor in notification.recent_actors:
+                return notification, False  # Повторный лайк после отмены не считается новым событием
+            notification.actor_count += 1
+            notification.recent_actors = [actor] + notification.recent_actors[:cls.RECENT_ACTORS - 1]
+            notification.message = f'{cls.describe_actors(notification.recent_actors, notification.actor_count)} {verb}'
+            notification.related_comment = related_comment or notification.related_comment
+            notification.created_date = now  # Поднимаем уведомление наверх списка
+            notification.save(update_fields=['actor_count', 'recent_actors', 'message', 'related_comment', 'created_date'])
+            return notification, True
+
+    @classmethod
+    def for_comment(cls, comment):
+        """Несохраненное уведомление автора поста о новом комментарии или None"""
+        if comment.parent_id or comment.post.author_id == comment.author_id:
+            return None  # Ответы и комментарии к своему посту не уведомляют
+        return cls(
+            user_id=comment.post.author_id,  # Получатель уведомления - автор поста
+            notification_type='comment',  # Тип уведомления - комментарий
+            title='New Comment on Your Post',  # Заголовок уведомления
+            message=f'{comment.author.username} commented on your post "{comment.post.title}"',  # Текст уведомления с именем комментатора и заголовком поста
+            related_post=comment.post,  # Связанный пост
+            related_comment=comment,  # Связанный комментарий
+        )
+
+# Архив прочитанных уведомлений: горячая таблица Notification остается маленькой
+class NotificationArchive(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # id исходного уведомления
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')  # Получатель уведомления
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)  # Тип уведомления
+    title = models.CharField(max_length=200)  # Заголовок уведомления
+    message = models.TextField()  # Текст уведомления
+    related_post_id = models.BigIntegerField(null=True, blank=True)  # id связанного поста (без внешнего ключа: архив не блокирует удаление постов)
+    related_comment_id = models.BigIntegerField(null=True, blank=True)  # id связанного комментария
+    created_date = models.DateTimeField()  # Дата создания исходного уведомления
+    archived_date = models.DateTimeField(default=timezone.now)  # Дата переноса в архив
+
+    class Meta:
+        ordering = ['-created_date']  # Сортировка: сначала новые уведомления
+        indexes = [
+            models.Index(fields=['user', '-created_date'], name='blog_notifarch_user_idx'),  # История пользователя
+            models.Index(fields=['created_date'], name='blog_notifarch_age_idx'),  # Очистка устаревшего архива
+        ]
+
+    def __str__(self):
+        return f'Archived notification {self.pk}: {self.title}'  # Строковое представление
+
+    @classmethod
+    def purge(cls, before, batch_size=1000):
+        """Удаляет записи архива старше before пакетами по первичному ключу"""
+        total = 0
+        while True:
+            ids = list(cls.objects.filter(created_date__lt=before).order_by('created_date').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return total
+            total += cls.objects.filter(pk__in=ids).delete()[0]
+            if len(ids) < batch_size:
+                return total
+
 # Модель глобальных настроек сайта (Singleton)
 class SiteSettings(models.Model):
     site_name = models.CharField(max_length=100, default='The Matrix Blog')  # Название сайта
@@ -166,7 +819,10 @@ class SiteSettings(models.Model):
     allow_comments = models.BooleanField(default=True)  # Разрешить комментарии
     moderate_comments = models.BooleanField(default=False)  # Модерация комментариев
     maintenance_mode = models.BooleanField(default=False)  # Режим технического обслуживания
-    
+
+    CACHE_KEY = 'site_settings'  # Ключ кэша (семейство 'site_settings' обслуживается L1 кэшем)
+    CACHE_TIMEOUT = 3600  # Время жизни настроек в кэше (секунды)
+
     class Meta:
         verbose_name_plural = "Site Settings"  # Множественное название в админ панели
     
@@ -174,10 +830,74 @@ class SiteSettings(models.Model):
         # Ограничение: может существовать только один экземпляр настроек
         if not self.pk and SiteSettings.objects.exists():
             raise ValidationError('There can be only one SiteSettings instance')
-        return super().save(*args, **kwargs)
-    
+        result = super().save(*args, **kwargs)
+        cache.delete(self.CACHE_KEY)  # Сбрасываем закэшированные настройки (во всех воркерах через L1 инвалидацию)
+        return result
+
+    def delete(self, *args, **kwargs):
+        cache.delete(self.CACHE_KEY)  # Удаленные настройки не должны оставаться в кэше
+        return super().delete(*args, **kwargs)
+
     @classmethod
     def load(cls):
-        # Получаем или создаем единственный экземпляр настроек
-        obj, created = cls.objects.get_or_create(pk=1)
+        # Настройки читаются на каждом запросе - сначала смотрим в кэш
+        obj = cache.get(cls.CACHE_KEY)
+        if obj is None:
+            # Получаем или создаем единственный экземпляр настроек
+            obj, created = cls.objects.get_or_create(pk=1)
+            cache.set(cls.CACHE_KEY, obj, cls.CACHE_TIMEOUT)
         return obj
+
+# Модель загрузки файла по частям (возобновляемая загрузка больших изображений через API)
+class ChunkedUpload(models.Model):
+    STATUS_CHOICES = [
+        ('uploading', 'Загружается'),  # Части еще поступают
+        ('complete', 'Завершена'),  # Файл собран и проверен
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # Непредсказуемый идентификатор загрузки
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')  # Владелец загрузки
+    filename = models.CharField(max_length=255)  # Исходное имя файла
+    content_type = models.CharField(max_length=100)  # Заявленный MIME тип
+    size = models.PositiveBigIntegerField()  # Заявленный полный размер файла в байтах
+    offset = models.PositiveBigIntegerField(default=0)  # Сколько байт уже получено
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')  # Статус загрузки
+    created_at = models.DateTimeField(auto_now_add=True)  # Дата начала загрузки
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Дата последней части (по ней удаляются брошенные загрузки)
+
+    class Meta:
+        ordering = ['-created_at']  # Сортировка: сначала новые загрузки
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'  # Строковое представление
+
+    @property
+    def is_complete(self):
+        return self.status == 'complete'  # Файл собран полностью
+
+# Модель счетчика ссылок на блоб в хранилище с адресацией по содержимому
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True)  # Имя блоба в storage (blobs/ab/cd/<sha256>.<ext>)
+    ref_count = models.IntegerField(default=0)  # Количество полей, ссылающихся на блоб
+    created_at = models.DateTimeField(auto_now_add=True)  # Дата первой ссылки
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Дата последнего изменения счетчика
+
+    class Meta:
+        indexes = [models.Index(fields=['ref_count', 'updated_at'])]  # Поиск кандидатов на удаление в gc_media
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count})'  # Строковое представление
+
+    @classmethod
+    def retain(cls, names):
+        # Увеличиваем счетчики ссылок (строка создается при первой ссылке)
+        for name in names:
+            blob, created = cls.objects.get_or_create(name=name, defaults={'ref_count': 1})
+            if not created:
+                cls.objects.filter(pk=blob.pk).update(ref_count=models.F('ref_count') + 1, updated_at=timezone.now())
+
+    @classmethod
+    def release(cls, names):
+        # Уменьшаем счетчики ссылок; блобы с нулевым счетчиком удалит gc_media
+        if names:
+            cls.objects.filter(name__in=names).update(ref_count=models.F('ref_count') - 1, updated_at=timezone.now())
@@ -0,0 +1,88 @@
+# Объединение уведомлений о лайках и ограничение частоты WebSocket сообщений
+import logging  # Импортируем модуль логирования
+from datetime import timedelta  # Импортируем интервалы времени
+
+from django.conf import settings  # Импортируем настройки Django
+from django.core.cache import cache  # Импортируем кэш Django (счетчики частоты)
+from django.db import transaction  # Импортируем управление транзакциями
+
+from .live import group_send  # Отправка событий через слой каналов
+from .models import Notification  # Импортируем модель уведомлений
+
+logger = logging.getLogger(__name__)  # Логгер модуля
+COALESCE_WINDOW = timedelta(minutes=getattr(settings, 'NOTIFICATION_COALESCE_MINUTES', 60))  # Окно объединения уведомлений
+PUSH_INTERVAL = getattr(settings, 'NOTIFICATION_PUSH_INTERVAL', 10)  # Не чаще одного сообщения получателю за столько секунд
+PUSH_BATCH_SIZE = 10  # Сколько непрочитанных уведомлений отправлять в отложенном сообщении
+LIKE_MESSAGES = {  # Заголовок и текст уведомления по типу лайка
+    'like_post': ('Your Post Was Liked', 'liked your post "{title}"'),
+    'like_comment': ('Your Comment Was Liked', 'liked your comment on "{title}"'),
+}
+
+
+def group_name(user_id):
+    """Группа каналов получателя (см. NotificationConsumer)"""
+    return f'notifications_{user_id}'
+
+
+def serialize(notification):
+    """Данные уведомления для WebSocket сообщения"""
+    return {
+        'id': notification.id,  # ID уведомления
+        'title': notification.title,  # Заголовок уведомления
+        'message': notification.message,  # Сообщение уведомления
+        'type': notification.notification_type,  # Тип уведомления
+        'created_date': notification.created_date.isoformat(),  # Дата создания в ISO формате
+        'is_read': notification.is_read,  # Статус прочитанности
+        'actor_count': notification.actor_count,  # Сколько пользователей объединено
+        'recent_actors': notification.recent_actors,  # Последние участники
+    }
+
+
+def send_to_user(user_id, event):
+    """Отправляет событие в группу получателя"""
+    group_send(group_name(user_id), event)
+
+
+def push_notification(notification):
+    """
+    Отправляет уведомление по WebSocket не чаще раза в PUSH_INTERVAL секунд
+    на получателя. События внутри интервала не теряются: одно отложенное
+    сообщение в конце интервала присылает актуальный список непрочитанных.
+    """
+    user_id = notification.user_id
+    if cache.add(f'notification_push:{user_id}', 1, PUSH_INTERVAL):  # Первое событие в интервале - сразу
+        payload = serialize(notification)
+        transaction.on_commit(lambda: send_to_user(user_id, {'type': 'send_notification', 'notification': payload}))
+    elif cache.add(f'notification_push_pending:{user_id}', 1, PUSH_INTERVAL):  # Отложенное сообщение еще не запланировано
+        from .tasks import flush_notifications  # Локальный импорт: tasks импортирует этот модуль
+
+        def schedule():
+            try:
+                flush_notifications.apply_async((user_id,), countdown=PUSH_INTERVAL)
+            except Exception:  # Недоступный брокер не должен ломать запрос пользователя
+                logger.exception('Failed to schedule notification flush for user %s', user_id)
+        transaction.on_commit(schedule)
+
+
+def flush_pending(user_id):
+    """Отправляет получателю последние непрочитанные уведомления одним сообщением"""
+    cache.delete(f'notification_push_pending:{user_id}')
+    cache.set(f'notification_push:{user_id}', 1, PUSH_INTERVAL)  # Следующее событие снова ждет интервал
+    notifications = Notification.objects.filter(user_id=user_id, is_read=False).order_by('-created_date')[:PUSH_BATCH_SIZE]
+    send_to_user(user_id, {'type': 'send_notifications', 'notifications': [serialize(n) for n in notifications]})
+
+
+def notify_like(actor, post, comment=None):
+    """Уведомляет автора поста или комментария о лайке, объединяя лайки за окно"""
+    notification_type = 'like_comment' if comment else 'like_post'
+    recipient_id = comment.author_id if comment else post.author_id
+    if recipient_id == actor.pk:
+        return None  # Свои лайки не уведомляют
+    title, verb = LIKE_MESSAGES[notification_type]
+    notification, changed = Notification.coalesce(
+        recipient_id, notification_type, actor.username, title, verb.format(title=post.title),
+        related_post=post, related_comment=comment, window=COALESCE_WINDOW,
+    )
+    if changed:
+        push_notification(notification)
+    return notification
@@ -0,0 +1,57 @@
+# Пагинация больших таблиц без точного COUNT(*)
+import json  # Импортируем json для разбора плана запроса
+
+from django.core.paginator import Paginator  # Импортируем базовый пагинатор Django
+from django.db import connections  # Импортируем подключения к базам данных
+from django.utils.functional import cached_property  # Импортируем кэширующее свойство
+
+ESTIMATE_THRESHOLD = 10000  # Ниже этого числа строк точный COUNT(*) дешев и считается как обычно
+
+
+# Пагинатор, который на PostgreSQL берет число строк из статистики планировщика
+class EstimatedCountPaginator(Paginator):
+    estimate_threshold = ESTIMATE_THRESHOLD  # Порог, начиная с которого используется оценка
+
+    @cached_property
+    def count(self):
+        """Оценка числа строк для больших таблиц, точный COUNT(*) для маленьких"""
+        estimate = self.estimate()  # None, если оценка недоступна (не PostgreSQL или не QuerySet)
+        if estimate is not None and estimate >= self.estimate_threshold:
+            return estimate
+        return super().count  # Точный подсчет
+
+    def estimate(self):
+        """Число строк по pg_class.reltuples (без фильтров) или по EXPLAIN (с фильтрами)"""
+        query = getattr(self.object_list, 'query', None)  # Только QuerySet можно оценить
+        if query is None:
+            return None
+        connection = connections[self.object_list.db]  # Подключение, которое выполнит запрос
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            if not query.where:  # Вся таблица - статистика из каталога, без чтения строк
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [self.object_list.model._meta.db_table])
+                row = cursor.fetchone()
+                return row[0] if row and row[0] >= 0 else None  # -1: таблица еще не анализировалась
+            sql, params = self.object_list.order_by().query.sql_with_params()  # Сортировка не влияет на число строк
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):  # psycopg2 без json адаптера возвращает строку
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+# Пагинатор с ограниченным подсчетом: COUNT(*) читает не больше count_limit + 1 строк
+class CappedCountPaginator(Paginator):
+    def __init__(self, object_list, per_page, count_limit=1000, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_limit = count_limit  # Сколько результатов считать точно
+
+    @cached_property
+    def count(self):
+        """Точное число строк до count_limit, дальше count_limit + 1 (см. count_is_capped)"""
+        return self.object_list.order_by().values('pk')[:self.count_limit + 1].count()  # COUNT(*) по подзапросу с LIMIT
+
+    @property
+    def count_is_capped(self):
+        return self.count > self.count_limit  # Результатов больше, чем считалось
@@ -0,0 +1,107 @@
+# Отложенная публикация: посты публикуют таймеры Celery (ETA) точно в срок, периодический обход страхует потерянные таймеры
+import logging  # Импортируем модуль логирования
+from datetime import timedelta  # Импортируем интервалы времени
+
+from django.conf import settings  # Импортируем настройки Django
+from django.core.cache import cache  # Импортируем кэш Django (взведенные таймеры)
+from django.db import transaction  # Импортируем управление транзакциями
+from django.db.models import F  # Импортируем ссылки на поля
+from django.utils import timezone  # Импортируем утилиты времени
+
+from . import autocomplete  # Префиксные деревья подсказок
+from .models import AuthorStats, Notification, Post, PostTag, Tag  # Импортируем модели приложения
+from .notifications import push_notification  # Отправка уведомлений по WebSocket
+
+logger = logging.getLogger(__name__)  # Логгер модуля
+SWEEP_INTERVAL = getattr(settings, 'SCHEDULED_PUBLISH_SWEEP_INTERVAL', 60)  # Период обхода (beat) в секундах
+PUBLISH_BATCH_SIZE = 500  # Постов в одной транзакции публикации
+
+
+def due_time(publish_at):
+    """Срок таймера: publish_at, округленное вверх до секунды (один таймер на все посты этой секунды)"""
+    if publish_at.microsecond:
+        publish_at = publish_at.replace(microsecond=0) + timedelta(seconds=1)
+    return publish_at
+
+
+def arm(publish_at):
+    """
+    Взводит таймер публикации на publish_at, если срок наступит до следующего
+    обхода. Более дальние сроки взводит обход, так что в брокере не копятся
+    задачи с ETA на недели вперед.
+    """
+    now = timezone.now()
+    if publish_at is None or publish_at > now + timedelta(seconds=SWEEP_INTERVAL):
+        return
+    eta = due_time(publish_at)
+    if not cache.add(f'scheduled_publish_timer:{int(eta.timestamp())}', 1, SWEEP_INTERVAL * 2):
+        return  # Таймер на эту секунду уже взведен
+    from .tasks import publish_scheduled_posts  # Локальный импорт: tasks импортирует этот модуль
+
+    def schedule():
+        try:
+            publish_scheduled_posts.apply_async(eta=max(eta, now))
+        except Exception:  # Недоступный брокер не должен ломать сохранение поста (пост опубликует обход)
+            logger.exception('Failed to schedule publishing at %s', eta)
+    transaction.on_commit(schedule)
+
+
+def publish_due(now=None, batch_size=PUBLISH_BATCH_SIZE):
+    """
+    Публикует запланированные посты со сроком до now (по индексу blog_post_due_idx)
+    пакетами по batch_size и взводит таймеры постов, срок которых наступит до
+    следующего обхода. Возвращает число опубликованных постов.
+    """
+    now = now or timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Post.objects.select_for_update(skip_locked=True)  # Параллельный таймер или обход пропускает захваченные посты
+                .filter(status='scheduled', publish_at__lte=now).order_by('publish_at')
+                .values_list('pk', 'author_id', 'title')[:batch_size]
+            )
+            if not rows:
+                break
+            post_ids = [pk for pk, _author_id, _title in rows]
+            # Дата публикации - запланированное время, а не время срабатывания таймера
+            Post.objects.filter(pk__in=post_ids).update(status='published', published_date=F('publish_at'))
+            published(rows)
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    for publish_at in (
+        Post.objects.filter(status='scheduled', publish_at__lte=now + timedelta(seconds=SWEEP_INTERVAL))
+        .order_by().values_list('publish_at', flat=True).distinct()
+    ):
+        arm(publish_at)
+    return total
+
+
+def published(rows):
+    """
+    Обновления после публикации пакета одним UPDATE (сигналы post_save не
+    отправляются): счетчики тегов и авторов, подсказки, похожие посты, ленты
+    подписчиков и уведомления авторов одним INSERT.
+    """
+    from .tasks import enqueue, fan_out_posts, update_related_posts  # Локальный импорт: tasks импортирует этот модуль
+
+    post_ids = [pk for pk, _author_id, _title in rows]
+    Tag.recount(set(PostTag.objects.filter(post_id__in=post_ids).values_list('tag_id', flat=True)))
+    AuthorStats.recount({author_id for _pk, author_id, _title in rows})
+    autocomplete.invalidate('posts')
+    for pk in post_ids:
+        enqueue(update_related_posts, pk)
+    enqueue(fan_out_posts, post_ids)  # Ленты подписчиков
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            user_id=author_id,
+            notification_type='system',
+            title='Your Post Was Published',
+            message=f'Your scheduled post "{title}" has been published',
+            related_post_id=pk,
+        )
+        for pk, author_id, title in rows
+    ])
+    for notification in notifications:
+        push_notification(notification)  # После коммита, не чаще PUSH_INTERVAL на автора
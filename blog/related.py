@@ -0,0 +1,200 @@
+# Похожие посты: общая категория, общие теги и TF-IDF сходство заголовка и описания
+import heapq  # Импортируем выбор лучших N без полной сортировки
+import math  # Импортируем логарифм и корень для TF-IDF
+import re  # Импортируем регулярные выражения для разбиения текста на слова
+from collections import Counter, defaultdict  # Импортируем счетчик и словарь со значениями по умолчанию
+
+from django.conf import settings  # Импортируем настройки Django
+from django.core.cache import cache  # Импортируем кэш Django (статистика корпуса)
+from django.db.models import Q  # Импортируем Q объекты для выборки кандидатов
+
+from .models import Post, PostTag, RelatedPost  # Импортируем модели приложения
+
+RELATED_POSTS_LIMIT = getattr(settings, 'RELATED_POSTS_LIMIT', 5)  # Похожих постов в списке
+TEXT_WEIGHT = 0.5  # Вклад косинусного сходства TF-IDF
+TAG_WEIGHT = 0.4  # Вклад доли общих тегов (коэффициент Жаккара)
+CATEGORY_WEIGHT = 0.1  # Бонус за общую категорию (только кандидатам с общими словами или тегами)
+STOP_TERM_RATIO = 0.5  # Слова из большей доли постов не учитываются...
+STOP_TERM_MIN_POSTS = 50  # ...если они встречаются хотя бы в стольких постах
+MIN_TERM_LENGTH = 3  # Более короткие слова не учитываются
+TOKEN_RE = re.compile(r'\w+')  # Слово: буквы, цифры и подчеркивание
+STATS_CACHE_KEY = 'related_posts_stats'  # Число постов и документные частоты слов из последней полной пересборки
+STATS_CACHE_TIMEOUT = getattr(settings, 'RELATED_POSTS_STATS_TIMEOUT', 2 * 24 * 3600)  # Переживает сутки между ночными пересборками
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре без коротких слов и чисел"""
+    return [token for token in TOKEN_RE.findall(text.lower()) if len(token) >= MIN_TERM_LENGTH and not token.isdigit()]
+
+
+def idf_weights(stats, terms):
+    """IDF слов terms по статистике корпуса; стоп-слова отсутствуют, новые слова считаются встречающимися в одном посте"""
+    total, frequency = stats['total'], stats['df']
+    stop_limit = max(STOP_TERM_RATIO * total, STOP_TERM_MIN_POSTS)
+    idf = {}
+    for term in terms:
+        df = frequency.get(term, 1)
+        if df <= stop_limit:
+            idf[term] = math.log((1 + total) / (1 + df)) + 1
+    return idf
+
+
+def _load_rows(posts, tag_links):
+    """Строки (id, заголовок, описание, категория) и теги опубликованных постов для Corpus"""
+    tags = defaultdict(set)
+    for post_id, tag_id in tag_links.values_list('post_id', 'tag_id').iterator(chunk_size=2000):
+        tags[post_id].add(tag_id)
+    return posts.values_list('pk', 'title', 'excerpt', 'category_id').iterator(chunk_size=2000), tags
+
+
+# Корпус опубликованных постов: нормированные разреженные TF-IDF векторы и инвертированные индексы.
+# По умолчанию частоты слов считаются по самим строкам (полный корпус); для части корпуса
+# передается stats полной пересборки, чтобы веса совпадали с ночным расчетом
+class Corpus:
+    def __init__(self, rows, tags, stats=None):
+        self.categories = {}  # id поста -> id категории
+        self.tags = tags  # id поста -> множество id тегов
+        counts = {}
+        for pk, title, excerpt, category_id in rows:
+            self.categories[pk] = category_id
+            counts[pk] = Counter(tokenize(f'{title} {excerpt}'))
+
+        if stats is None:
+            frequency = Counter()
+            for terms in counts.values():
+                frequency.update(terms.keys())  # Число постов со словом
+            stats = {'total': len(counts), 'df': dict(frequency)}
+        self.stats = stats  # {'total': число постов, 'df': {слово: число постов}}
+        idf = idf_weights(stats, {term for terms in counts.values() for term in terms})
+
+        self.vectors = {}  # id поста -> {слово: вес}, длина вектора 1
+        self.postings = defaultdict(list)  # Слово -> [(id поста, вес)]
+        for pk, terms in counts.items():
+            vector = {term: (1 + math.log(count)) * idf[term] for term, count in terms.items() if term in idf}
+            norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+            self.vectors[pk] = {term: weight / norm for term, weight in vector.items()} if norm else {}
+            for term, weight in self.vectors[pk].items():
+                self.postings[term].append((pk, weight))
+
+        self.tag_postings = defaultdict(list)  # id тега -> [id поста]
+        for pk, tag_ids in tags.items():
+            for tag_id in tag_ids:
+                self.tag_postings[tag_id].append(pk)
+
+    @classmethod
+    def load(cls):
+        """Корпус всех опубликованных постов (два запроса, построчное чтение)"""
+        return cls(*_load_rows(Post.objects.filter(status='published'), PostTag.objects.filter(post__status='published')))
+
+    @classmethod
+    def load_around(cls, post_ids, stats):
+        """
+        Часть корпуса для пересчета списков post_ids: сами посты и все опубликованные
+        посты с общими значимыми словами или тегами. Оценки этих списков совпадают с
+        полным корпусом - посты без общих слов и тегов не получают оценку.
+        """
+        published = Post.objects.filter(status='published')
+        seeds = cls(*_load_rows(published.filter(pk__in=post_ids), PostTag.objects.filter(post_id__in=post_ids, post__status='published')), stats)
+        terms = {term for vector in seeds.vectors.values() for term in vector}  # Без стоп-слов
+        tag_ids = set().union(*seeds.tags.values())
+        condition = Q(pk__in=list(seeds))
+        if tag_ids:
+            condition |= Q(pk__in=PostTag.objects.filter(tag_id__in=tag_ids).values('post_id'))
+        for term in terms:  # Подстрока отбирает с запасом, точное совпадение слов проверяет токенизация
+            condition |= Q(title__icontains=term) | Q(excerpt__icontains=term)
+        posts = published.filter(condition)
+        return cls(*_load_rows(posts, PostTag.objects.filter(post__in=posts)), stats)
+
+    def __contains__(self, pk):
+        return pk in self.categories
+
+    def __iter__(self):
+        return iter(self.categories)
+
+    def scores(self, pk):
+        """Оценки сходства поста с постами, у которых есть общие слова или теги (оценка симметрична)"""
+        text = defaultdict(float)  # Скалярное произведение по общим словам
+        for term, weight in self.vectors.get(pk, {}).items():
+            for other, other_weight in self.postings[term]:
+                text[other] += weight * other_weight
+        own_tags = self.tags.get(pk, set())
+        shared = Counter(other for tag_id in own_tags for other in self.tag_postings[tag_id])  # Число общих тегов
+        category = self.categories.get(pk)
+
+        scores = {}
+        for other in text.keys() | shared.keys():
+            if other == pk:
+                continue
+            score = TEXT_WEIGHT * text.get(other, 0.0)
+            if shared[other]:
+                score += TAG_WEIGHT * shared[other] / len(own_tags | self.tags[other])
+            if category is not None and self.categories.get(other) == category:
+                score += CATEGORY_WEIGHT
+            scores[other] = round(score, 6)
+        return scores
+
+    def top(self, pk, limit=RELATED_POSTS_LIMIT):
+        """Лучшие limit похожих постов [(id, оценка)]; при равной оценке новее (больший id) первым"""
+        return ranked(self.scores(pk).items(), limit)
+
+
+def ranked(items, limit=RELATED_POSTS_LIMIT):
+    return heapq.nlargest(limit, items, key=lambda item: (item[1], item[0]))
+
+
+def load_full_corpus():
+    """Полный корпус; его статистика кэшируется для инкрементальных пересчетов"""
+    corpus = Corpus.load()
+    cache.set(STATS_CACHE_KEY, corpus.stats, STATS_CACHE_TIMEOUT)
+    return corpus
+
+
+def rebuild_related_posts(batch_size=500):
+    """Пересчитывает списки похожих постов для всех опубликованных постов; возвращает число списков"""
+    corpus = load_full_corpus()
+    lists, total = {}, 0
+    for pk in corpus:
+        lists[pk] = corpus.top(pk)
+        if len(lists) >= batch_size:
+            RelatedPost.replace(lists)
+            total, lists = total + len(lists), {}
+    RelatedPost.replace(lists)
+    RelatedPost.objects.exclude(post__status='published').delete()  # Списки снятых с публикации постов
+    return total + len(lists)
+
+
+def update_related_posts(post_id):
+    """
+    Пересчитывает список измененного поста и списки, в которые он входил или может войти.
+    Читаются только эти посты и посты с общими словами или тегами, веса слов - из
+    статистики ночной пересборки. Остальные списки не трогаются (их уточняет ночная
+    полная пересборка).
+    """
+    current = defaultdict(list)
+    listed_in = RelatedPost.objects.filter(related_id=post_id).values('post_id')
+    for owner_id, related_id, score in (
+        RelatedPost.objects.filter(post_id__in=listed_in).order_by('post', 'rank').values_list('post_id', 'related_id', 'score')
+    ):
+        current[owner_id].append((related_id, score))
+
+    stats = cache.get(STATS_CACHE_KEY)
+    corpus = Corpus.load_around([post_id, *current], stats) if stats is not None else load_full_corpus()  # Кэш пуст - один полный расчет
+    scores = corpus.scores(post_id) if post_id in corpus else {}
+    lists = {post_id: ranked(scores.items())}  # Пустой список, если пост снят с публикации
+
+    for owner_id in current:  # Пост выпал или сместился: освободившееся место занимает следующий кандидат
+        if owner_id in corpus:
+            lists[owner_id] = corpus.top(owner_id)
+
+    candidates = [pk for pk in scores if pk not in current]
+    for owner_id, related_id, score in (
+        RelatedPost.objects.filter(post_id__in=candidates).order_by('post', 'rank').values_list('post_id', 'related_id', 'score')
+    ):
+        current[owner_id].append((related_id, score))
+    for owner_id in candidates:  # Сходство симметрично: пост вставляется в чужой список, если обгоняет последний
+        entries = ranked(current[owner_id] + [(post_id, scores[owner_id])])
+        if entries != current[owner_id]:
+            lists[owner_id] = entries
+
+    RelatedPost.replace(lists)
+    return len(lists)
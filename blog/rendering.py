@@ -0,0 +1,66 @@
+# Рендеринг текста поста: безопасный HTML, оглавление, число слов и время чтения (используется моделями и миграцией данных)
+import hashlib  # Импортируем md5 для отпечатка исходного текста
+import math  # Импортируем округление вверх для времени чтения
+import re  # Импортируем регулярные выражения
+
+from django.conf import settings  # Импортируем настройки Django
+from django.utils.html import escape, linebreaks  # Экранирование и абзацы как у фильтра linebreaks
+from django.utils.text import slugify  # Якоря заголовков
+
+RENDER_INLINE_MAX_LENGTH = getattr(settings, 'RENDER_INLINE_MAX_LENGTH', 20000)  # Более длинные посты рендерит Celery задача
+WORDS_PER_MINUTE = 200  # Скорость чтения для оценки времени
+HEADING_RE = re.compile(r'^(#{1,3})[ \t]+(.+?)[ \t#]*$')  # Строка-заголовок: "# ", "## " или "### "
+WORD_RE = re.compile(r'\w+')  # Слово: буквы, цифры и подчеркивание
+
+
+def source_hash(text):
+    """Отпечаток текста, по которому построен HTML"""
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def render_content(text):
+    """
+    HTML и метаданные текста: {'html', 'toc', 'word_count', 'reading_time'}.
+
+    Весь текст экранируется, абзацы и переносы строк - как у фильтра linebreaks,
+    которым шаблон выводил пост раньше. Строки "# ", "## " и "### " становятся
+    заголовками h2-h4 с якорями и попадают в оглавление.
+    """
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    parts, toc, anchors, paragraph = [], [], set(), []
+
+    def flush():
+        chunk = '\n'.join(paragraph)
+        if chunk.strip():
+            parts.append(linebreaks(chunk.strip('\n'), autoescape=True))
+        paragraph.clear()
+
+    for line in text.split('\n'):
+        match = HEADING_RE.match(line)
+        if not match:
+            paragraph.append(line)
+            continue
+        flush()
+        level, title = len(match.group(1)) + 1, match.group(2)
+        anchor = unique_anchor(title, anchors)
+        toc.append({'level': level, 'title': title, 'anchor': anchor})
+        parts.append(f'<h{level} id="{anchor}">{escape(title)}</h{level}>')
+    flush()
+
+    word_count = len(WORD_RE.findall(text))
+    return {
+        'html': '\n\n'.join(parts),
+        'toc': toc,
+        'word_count': word_count,
+        'reading_time': math.ceil(word_count / WORDS_PER_MINUTE),  # Минут, 0 для пустого текста
+    }
+
+
+def unique_anchor(title, used):
+    """Якорь заголовка, уникальный в пределах поста"""
+    base = slugify(title, allow_unicode=True) or 'section'
+    anchor, number = base, 2
+    while anchor in used:
+        anchor, number = f'{base}-{number}', number + 1
+    used.add(anchor)
+    return anchor
@@ -0,0 +1,44 @@
+# История правок постов: построчные дельты и полные снимки, сжатые zlib (используется моделью PostRevision)
+import difflib  # Импортируем сравнение последовательностей строк
+import json  # Импортируем сериализацию данных ревизии
+import zlib  # Импортируем сжатие
+
+
+def split_lines(text):
+    return text.splitlines(keepends=True)
+
+
+def make_delta(old, new):
+    """
+    Дельта old -> new: список операций, где [начало, конец] - скопировать строки
+    old с начала до конца, а строка - вставить ее. Размер дельты пропорционален
+    измененным строкам, неизмененные кодируются парой чисел.
+    """
+    old_lines, new_lines = split_lines(old), split_lines(new)
+    delta = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines).get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        else:
+            delta.extend(new_lines[j1:j2])  # Удаленные строки просто не копируются
+    return delta
+
+
+def apply_delta(old, delta):
+    """Текст, полученный применением дельты к old"""
+    old_lines = split_lines(old)
+    return ''.join(''.join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op for op in delta)
+
+
+def unified_diff(old, new, from_label, to_label):
+    """Построчная разница двух версий в формате unified diff"""
+    return list(difflib.unified_diff(split_lines(old), split_lines(new), from_label, to_label))
+
+
+def pack(value):
+    """Сжатые данные ревизии: текст снимка или дельта"""
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode())
+
+
+def unpack(data):
+    return json.loads(zlib.decompress(bytes(data)))
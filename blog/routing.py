@@ -6,4 +6,5 @@ from . import consumers  # Импортируем модуль с потреби
 websocket_urlpatterns = [
     re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),  # WebSocket для уведомлений (отправка real-time уведомлений пользователям)
     re_path(r'ws/chat/(?P<room_name>\w+)/$', consumers.ChatConsumer.as_asgi()),  # WebSocket для чат-комнат (динамический параметр room_name)
+    re_path(r'ws/posts/(?P<post_id>\d+)/comments/$', consumers.PostCommentsConsumer.as_asgi()),  # WebSocket для live-потока комментариев поста (группа post_<pk>)
 ]
\ No newline at end of file
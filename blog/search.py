@@ -0,0 +1,39 @@
+# Поиск по постам и пользователям с ограниченной выборкой и постраничным выводом
+from django.contrib.auth.models import User  # Импортируем модель пользователя Django
+from django.db.models import Q  # Импортируем выражения для условий
+from django.utils.text import slugify  # Импортируем генерацию slug для поиска по тегу
+
+from .models import Post, PostTag, active_comment_count  # Импортируем модели приложения
+from .paginators import CappedCountPaginator  # Пагинатор с ограниченным подсчетом
+
+SEARCH_PAGE_SIZE = 10  # Результатов одного типа на странице
+SEARCH_COUNT_LIMIT = 1000  # Сколько результатов каждого типа считать точно
+
+
+def post_match(query):
+    """Условие поиска постов: текст, точный тег или точное имя автора"""
+    tagged = PostTag.objects.filter(tag__slug=slugify(query, allow_unicode=True)).values('post_id')  # Подзапрос вместо JOIN: без дублей постов
+    return (
+        Q(title__icontains=query) | Q(content__icontains=query) | Q(excerpt__icontains=query) |
+        Q(pk__in=tagged) | Q(author__username=query)
+    )
+
+
+def search_posts(query):
+    """Опубликованные посты по запросу, новые первыми, с числом комментариев"""
+    return (
+        Post.objects.filter(post_match(query), status='published')
+        .select_related('author', 'category')
+        .annotate(comment_total=active_comment_count())  # Подзапрос выполняется только для строк страницы
+        .order_by('-published_date', '-pk')
+    )
+
+
+def search_users(query):
+    """Пользователи по префиксу имени (индекс username, а не сканирование таблицы)"""
+    return User.objects.filter(username__startswith=query).select_related('profile').order_by('username')
+
+
+def paginate(queryset, page, per_page=SEARCH_PAGE_SIZE):
+    """Страница результатов; номер страницы вне диапазона дает ближайшую страницу"""
+    return CappedCountPaginator(queryset, per_page, count_limit=SEARCH_COUNT_LIMIT).get_page(page)
@@ -1,34 +1,302 @@
 # Импорт необходимых модулей Django для работы с сигналами
-from django.db.models.signals import post_save, post_delete  # Импортируем сигналы после сохранения и удаления
+from django.db.models.signals import m2m_changed, post_init, post_save, pre_delete, post_delete  # Импортируем сигналы загрузки, сохранения, удаления и связей
 from django.dispatch import receiver  # Импортируем декоратор для регистрации обработчиков сигналов
+from django.db import IntegrityError, transaction  # Импортируем ошибку целостности и управление транзакциями
 from django.contrib.auth.models import User  # Импортируем модель пользователя Django
-from .models import UserProfile, Comment, Notification  # Импортируем наши модели приложения
+from .models import AuthorStats, Category, Follow, Post, PostRevision, PostTag, Tag, UserProfile, Comment, Notification, MediaBlob  # Импортируем наши модели приложения
+from .images import image_needs_processing  # Проверка актуальности уменьшенных копий изображений
+from .storage import media_references  # Ссылки объекта на блобы хранилища
+from .auth import invalidate_principal  # Сброс кэшированного принципала пользователя
+from . import autocomplete, feed, publishing  # Префиксные деревья подсказок, ленты подписок и отложенная публикация
+from .tasks import enqueue, fan_out_posts, process_post_image, process_avatar, render_post_content, update_related_posts  # Фоновые задачи Celery
 
 # Сигнал автоматического создания профиля пользователя
 @receiver(post_save, sender=User)  # Регистрируем обработчик для сигнала после сохранения объекта User
-def create_user_profile(sender, instance, created, **kwargs):  # Функция-обработчик сигнала
-    if created:  # Проверяем, что пользователь только что создан (а не обновлен)
-        UserProfile.objects.create(user=instance)  # Создаем профиль пользователя для нового пользователя
+def create_user_profile(sender, instance, created, raw=False, **kwargs):  # Функция-обработчик сигнала
+    if created and not raw:  # Проверяем, что пользователь только что создан (фикстуры загружают профили сами)
+        try:
+            with transaction.atomic():  # Точка сохранения: ошибка уникальности не ломает внешнюю транзакцию
+                profile = UserProfile.objects.create(user=instance)  # Один INSERT для нового пользователя
+        except IntegrityError:
+            profile = UserProfile.objects.get(user=instance)  # Профиль уже создан параллельно
+        instance.profile = profile  # Кэшируем профиль на объекте пользователя
 
-# Сигнал автоматического сохранения профиля пользователя
+# Сигнал проверки наличия профиля при обновлении пользователя (профиль не пересохраняется)
 @receiver(post_save, sender=User)  # Регистрируем обработчик для сигнала после сохранения объекта User
-def save_user_profile(sender, instance, **kwargs):  # Функция-обработчик сигнала (вызывается при создании и обновлении)
-    try:  # Пытаемся сохранить существующий профиль
-        instance.profile.save()  # Сохраняем профиль пользователя
-    except UserProfile.DoesNotExist:  # Если профиль не существует (может произойти при миграциях)
-        UserProfile.objects.create(user=instance)  # Создаем профиль для пользователя
+def save_user_profile(sender, instance, created, raw=False, update_fields=None, **kwargs):  # Функция-обработчик сигнала
+    if created or raw or update_fields is not None:
+        return  # Частичные сохранения (last_login при входе) профиль не затрагивают
+    cached = instance._state.fields_cache.get('profile')  # Профиль, уже загруженный вместе с пользователем
+    if cached is not None and cached.pk is not None:
+        return  # Профиль существует - запрос не нужен
+    profile, _ = UserProfile.objects.get_or_create(user=instance)  # Создаем профиль, только если его нет (может произойти при миграциях)
+    instance.profile = profile
 
 # Сигнал уведомления автора поста о новом комментарии
 @receiver(post_save, sender=Comment)  # Регистрируем обработчик для сигнала после сохранения объекта Comment
 def notify_post_author_on_comment(sender, instance, created, **kwargs):  # Функция-обработчик сигнала
-    if created and not instance.parent:  # Проверяем, что комментарий новый и это не ответ на другой комментарий
-        post_author = instance.post.author  # Получаем автора поста, к которому оставлен комментарий
-        if post_author != instance.author:  # Проверяем, что автор поста не комментирует свой же пост
-            Notification.objects.create(  # Создаем уведомление для автора поста
-                user=post_author,  # Получатель уведомления - автор поста
-                notification_type='comment',  # Тип уведомления - комментарий
-                title='New Comment on Your Post',  # Заголовок уведомления
-                message=f'{instance.author.username} commented on your post "{instance.post.title}"',  # Текст уведомления с именем комментатора и заголовком поста
-                related_post=instance.post,  # Связанный пост
-                related_comment=instance  # Связанный комментарий
-            )
+    if created and instance.status == 'approved':  # Комментарии на модерации уведомляют после одобрения (задача notify_approved_comments)
+        notification = Notification.for_comment(instance)  # Уведомление автору поста (не для ответов и своих постов)
+        if notification:
+            notification.save()
+
+# Сигнал запуска обработки изображения поста (уменьшенные копии генерируются в Celery)
+@receiver(post_save, sender=Post)  # Регистрируем обработчик для сигнала после сохранения объекта Post
+def schedule_post_image_processing(sender, instance, **kwargs):  # Функция-обработчик сигнала
+    if image_needs_processing(instance.image, instance.image_variants):  # Изображение новое, изменено или удалено
+        enqueue(process_post_image, instance.pk)  # Ставим задачу в очередь после коммита транзакции
+
+# Сигнал запуска рендеринга крупного поста (небольшие рендерятся в Post.save())
+@receiver(post_save, sender=Post)
+def schedule_post_rendering(sender, instance, raw=False, **kwargs):
+    if not raw and not instance.__dict__.get('rendered_hash', True):  # '' - текст изменен, HTML еще не построен
+        enqueue(render_post_content, [instance.pk])
+
+# Сигнал взвода таймера отложенной публикации (дальние сроки взводит периодический обход)
+@receiver(post_save, sender=Post)
+def schedule_post_publishing(sender, instance, raw=False, **kwargs):
+    if not raw and instance.status == 'scheduled':
+        publishing.arm(instance.publish_at)
+
+# Рассылка поста в ленты подписчиков при первой публикации (снятые с публикации убираются из лент при чтении)
+@receiver(post_init, sender=Post)
+def remember_publication(sender, instance, **kwargs):
+    instance._was_published = bool(instance.pk) and instance.__dict__.get('status') == 'published'
+
+
+@receiver(post_save, sender=Post)
+def schedule_feed_fan_out(sender, instance, raw=False, **kwargs):
+    published = instance.__dict__.get('status') == 'published'
+    if not raw and published and not getattr(instance, '_was_published', False):
+        enqueue(fan_out_posts, [instance.pk])
+    instance._was_published = published
+
+# История правок: версия запоминается при загрузке, новая ревизия пишется при изменении заголовка или текста
+@receiver(post_init, sender=Post)
+def remember_revision_source(sender, instance, **kwargs):
+    data = instance.__dict__
+    instance._revision_source = (data['title'], data['content']) if instance.pk and 'title' in data and 'content' in data else None
+
+
+@receiver(post_save, sender=Post)
+def record_post_revision(sender, instance, created, raw=False, **kwargs):
+    source, current = getattr(instance, '_revision_source', None), (instance.title, instance.content)
+    if raw or (not created and (source is None or source == current)):
+        return  # Например, счетчик просмотров или статус
+    editor = getattr(instance, 'edited_by', None)  # Выставляют представления правки; иначе правка считается авторской
+    PostRevision.record(instance, None if created else source, editor.pk if editor else instance.author_id)
+    instance._revision_source = current
+
+# Сигнал запуска обработки аватара пользователя
+@receiver(post_save, sender=UserProfile)  # Регистрируем обработчик для сигнала после сохранения объекта UserProfile
+def schedule_avatar_processing(sender, instance, **kwargs):  # Функция-обработчик сигнала
+    if image_needs_processing(instance.avatar, instance.avatar_variants):  # Аватар новый, изменен или удален
+        enqueue(process_avatar, instance.pk)  # Ставим задачу в очередь после коммита транзакции
+
+# Поля с изображениями, ссылки которых учитываются в счетчиках MediaBlob: модель -> (поле файла, поле копий)
+MEDIA_FIELDS = {
+    Post: ('image', 'image_variants'),
+    UserProfile: ('avatar', 'avatar_variants'),
+}
+
+
+# Запоминаем ссылки объекта при загрузке из БД, чтобы после сохранения учесть только изменения
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=UserProfile)
+def remember_media_references(sender, instance, **kwargs):
+    instance._media_references = media_references(instance, *MEDIA_FIELDS[sender]) if instance.pk else set()
+
+
+# Сигнал обновления счетчиков ссылок на блобы после сохранения
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=UserProfile)
+def update_media_references(sender, instance, **kwargs):
+    old = getattr(instance, '_media_references', None)
+    new = media_references(instance, *MEDIA_FIELDS[sender])
+    if old is None or new is None:
+        return  # Ссылки не отслеживаются; расхождения исправит gc_media --recount
+    MediaBlob.retain(new - old)
+    MediaBlob.release(old - new)
+    instance._media_references = new
+
+
+# Сигнал освобождения блобов при удалении объекта
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=UserProfile)
+def release_media_references(sender, instance, **kwargs):
+    MediaBlob.release(getattr(instance, '_media_references', None) or set())
+
+
+# Сигнал сброса кэшированного принципала при изменении пользователя, его прав или блокировки
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.user_id)
+
+
+# Запоминаем строку тегов и статус поста, чтобы синхронизировать теги только при их изменении
+@receiver(post_init, sender=Post)
+def remember_post_tags(sender, instance, **kwargs):
+    instance._tag_state = (instance.__dict__.get('tags'), instance.__dict__.get('status')) if instance.pk else None
+
+
+# Сигнал синхронизации нормализованных тегов и счетчиков после сохранения поста
+@receiver(post_save, sender=Post)
+def sync_post_tags(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {'tags', 'status'} & set(update_fields)):
+        return  # Например, обновление счетчика просмотров
+    state = (instance.tags, instance.status)
+    if (created and instance.tags) or (not created and getattr(instance, '_tag_state', None) != state):
+        PostTag.sync([instance])
+    instance._tag_state = state
+
+
+# Теги удаляемого опубликованного поста (связи удаляются каскадно до post_delete)
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_tags(sender, instance, **kwargs):
+    instance._deleted_tag_ids = list(instance.post_tags.values_list('tag_id', flat=True)) if instance.status == 'published' else []
+
+
+@receiver(post_delete, sender=Post)
+def recount_deleted_post_tags(sender, instance, **kwargs):
+    Tag.recount(getattr(instance, '_deleted_tag_ids', None))
+
+
+# Сброс префиксных деревьев подсказок при изменении индексируемых полей
+AUTOCOMPLETE_FIELDS = {Post: ('posts', {'title', 'status'}), User: ('users', {'username', 'is_active'}), Category: ('categories', {'name'})}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Category)
+def invalidate_autocomplete(sender, instance, update_fields=None, **kwargs):
+    name, fields = AUTOCOMPLETE_FIELDS[sender]
+    if update_fields is not None and not fields & set(update_fields):
+        return  # Например, last_login при входе или счетчик просмотров
+    autocomplete.invalidate(name)
+
+
+# Сброс кэшированного списка категорий с числом постов (Category.with_post_counts)
+@receiver(post_init, sender=Post)
+def remember_post_category(sender, instance, **kwargs):
+    instance._category_state = instance.__dict__.get('category_id') if instance.pk else False  # False - поста еще нет
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Category)
+def invalidate_category_counts(sender, instance, **kwargs):
+    if sender is Post and 'created' in kwargs and getattr(instance, '_category_state', False) == instance.category_id:
+        return  # Категория поста не менялась - счетчики те же
+    instance._category_state = instance.category_id if sender is Post else None
+    Category.invalidate_cache()
+
+
+# Поля поста, от которых зависят похожие посты (см. blog.related)
+RELATED_FIELDS = ('title', 'excerpt', 'category_id', 'tags', 'status')
+
+
+@receiver(post_init, sender=Post)
+def remember_related_state(sender, instance, **kwargs):
+    instance._related_state = tuple(instance.__dict__.get(field) for field in RELATED_FIELDS) if instance.pk else None
+
+
+@receiver(post_save, sender=Post)
+def schedule_related_posts_update(sender, instance, raw=False, **kwargs):
+    before, state = getattr(instance, '_related_state', None), tuple(getattr(instance, field) for field in RELATED_FIELDS)
+    if raw or state == before:
+        return  # Например, счетчик просмотров на странице поста
+    instance._related_state = state
+    if instance.status == 'published' or (before and before[-1] == 'published'):  # Черновики ни в какие списки не входят
+        enqueue(update_related_posts, instance.pk)
+
+
+# Счетчики автора (AuthorStats): поле счетчика и условие, при котором объект в нем учитывается
+STATS_COUNTERS = {
+    Post: ('posts_published', lambda data: data.get('status') == 'published'),
+    Comment: ('comments_made', lambda data: data.get('is_active') and data.get('status') == 'approved'),
+}
+
+
+def counted_author(instance):
+    """id автора, в счетчике которого учитывается пост или комментарий (None - не учитывается)"""
+    _field, counted = STATS_COUNTERS[type(instance)]
+    data = instance.__dict__  # Отложенные поля не загружаются
+    return data.get('author_id') if counted(data) else None
+
+
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=Comment)
+def remember_counted_author(sender, instance, **kwargs):
+    instance._counted_author = counted_author(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def update_author_counter(sender, instance, raw=False, **kwargs):
+    before, after = getattr(instance, '_counted_author', None), counted_author(instance)
+    if raw or before == after:
+        return  # Например, счетчик просмотров или правка текста
+    instance._counted_author = after
+    field, _counted = STATS_COUNTERS[sender]
+    AuthorStats.adjust(before, **{field: -1})
+    AuthorStats.adjust(after, **{field: 1})
+
+
+# Лайки удаляемого поста (связи удаляются каскадно без m2m_changed)
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_likes(sender, instance, **kwargs):
+    instance._like_count = instance.likes.count()
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def release_author_counter(sender, instance, **kwargs):
+    field, _counted = STATS_COUNTERS[sender]
+    if sender is Post:
+        AuthorStats.adjust(
+            instance.author_id,
+            likes_received=-getattr(instance, '_like_count', 0), views_received=-(instance.__dict__.get('views') or 0),
+        )
+    AuthorStats.adjust(getattr(instance, '_counted_author', None), **{field: -1})
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def update_likes_received(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:  # user.post_likes.add(...): затронуты авторы нескольких постов
+        if action == 'pre_clear':
+            instance._liked_authors = set(Post.objects.filter(likes=instance).values_list('author_id', flat=True))
+        elif action in ('post_add', 'post_remove'):
+            AuthorStats.recount(Post.objects.filter(pk__in=pk_set).values_list('author_id', flat=True))
+        elif action == 'post_clear':
+            AuthorStats.recount(getattr(instance, '_liked_authors', ()))
+        return
+    if action == 'pre_clear':
+        instance._like_count = instance.likes.count()
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        delta = {'post_add': len(pk_set or ()), 'post_remove': -len(pk_set or ())}.get(action, -getattr(instance, '_like_count', 0))
+        AuthorStats.adjust(instance.author_id, likes_received=delta)
+
+
+# Подписки: счетчик подписчиков автора и лента подписчика (строится заново при следующем чтении)
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.adjust(instance.author_id, followers=1)
+        transaction.on_commit(lambda: feed.reset(instance.follower_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    AuthorStats.adjust(instance.author_id, followers=-1)
+    transaction.on_commit(lambda: feed.reset(instance.follower_id))
@@ -0,0 +1,85 @@
+# Выделение уникальных slug одним запросом вместо перебора суффиксов
+import re  # Импортируем регулярные выражения для экранирования базового slug
+from functools import reduce  # Импортируем reduce для объединения условий
+from operator import or_  # Импортируем оператор ИЛИ для Q объектов
+
+from django.db.models import BigIntegerField, Count, Max, Q  # Импортируем агрегаты и Q объекты
+from django.db.models.functions import Cast, Substr  # Импортируем функции для разбора суффикса в БД
+from django.utils.text import slugify  # Импортируем функцию генерации slug
+
+SUFFIX_RESERVE = 8  # Сколько символов оставить под суффикс "-NNNNNNN"
+BASES_PER_QUERY = 100  # Сколько базовых slug проверять одним запросом при массовом назначении
+MAX_SUFFIX_DIGITS = 18  # Более длинные числа ("title-2024...") не суффиксы: не помещаются в BIGINT при Cast
+
+
+def slug_base(title, max_length=200, fallback='post'):
+    """Базовый slug из заголовка, укороченный так, чтобы поместился суффикс"""
+    base = slugify(title)[:max_length - SUFFIX_RESERVE].strip('-')  # Обрезаем, не оставляя дефис в конце
+    return base or fallback  # Fallback slug если заголовок пустой или без латиницы
+
+
+def _numbering(queryset, bases, field='slug'):
+    """
+    Для каждого базового slug: занят ли он сам и максимальный номер base-N.
+
+    Один агрегирующий запрос возвращает одну строку независимо от числа
+    занятых суффиксов; startswith позволяет использовать индекс по slug.
+    """
+    condition = reduce(or_, (Q(**{field: base}) | Q(**{f'{field}__startswith': f'{base}-'}) for base in bases))
+    aggregates = {}
+    for index, base in enumerate(bases):
+        aggregates[f'exact_{index}'] = Count('pk', filter=Q(**{field: base}))  # Занят ли сам base
+        aggregates[f'max_{index}'] = Max(  # Максимальный числовой суффикс (base-other-title не учитывается)
+            Cast(Substr(field, len(base) + 2), BigIntegerField()),
+            filter=Q(**{f'{field}__regex': rf'^{re.escape(base)}-[0-9]{{1,{MAX_SUFFIX_DIGITS}}}$'}),
+        )
+    row = queryset.filter(condition).aggregate(**aggregates)
+    return {base: [row[f'exact_{index}'] > 0, row[f'max_{index}'] or 0] for index, base in enumerate(bases)}
+
+
+def _take_next(state):
+    # Выдает следующий slug для базы и отмечает его занятым
+    base_taken, max_suffix = state
+    if not base_taken:
+        state[0] = True
+        return 0
+    state[1] = max_suffix + 1
+    return state[1]
+
+
+def _with_suffix(base, number):
+    return base if number == 0 else f'{base}-{number}'
+
+
+def allocate_slug(queryset, base, field='slug'):
+    """Свободный slug для base (один запрос к БД)"""
+    state = _numbering(queryset, [base], field)[base]
+    return _with_suffix(base, _take_next(state))
+
+
+def assign_slugs(objects, queryset, title_field='title', field='slug', max_length=200):
+    """
+    Назначает уникальные slug объектам без slug перед bulk_create.
+
+    Один запрос на BASES_PER_QUERY разных базовых slug, совпадения
+    внутри самого списка (одинаковые заголовки, явные slug) учитываются.
+    """
+    pending = [obj for obj in objects if not getattr(obj, field)]  # Объекты, которым нужен slug
+    bases = [slug_base(getattr(obj, title_field), max_length) for obj in pending]
+    unique_bases = list(dict.fromkeys(bases))  # Уникальные базовые slug с сохранением порядка
+
+    numbering = {}
+    for start in range(0, len(unique_bases), BASES_PER_QUERY):
+        numbering.update(_numbering(queryset, unique_bases[start:start + BASES_PER_QUERY], field))
+
+    for obj in objects:  # Явно заданные slug в той же пачке тоже занимают номера
+        slug = getattr(obj, field) or ''
+        if slug in numbering:
+            numbering[slug][0] = True
+        base, _, number = slug.rpartition('-')
+        if base in numbering and number.isdigit():
+            numbering[base][1] = max(numbering[base][1], int(number))
+
+    for obj, base in zip(pending, bases):
+        setattr(obj, field, _with_suffix(base, _take_next(numbering[base])))
+    return objects
@@ -0,0 +1,88 @@
+# Хранилище медиа файлов с адресацией по содержимому (дедупликация одинаковых загрузок)
+import hashlib  # Импортируем hashlib для вычисления SHA-256
+import os  # Импортируем os для работы с файлами
+import tempfile  # Импортируем tempfile для атомарной записи
+
+from django.conf import settings  # Импортируем настройки Django
+from django.core.files.storage import FileSystemStorage  # Импортируем файловое хранилище Django
+from django.utils.deconstruct import deconstructible  # Импортируем декоратор для сериализации в миграциях
+
+from .images import variant_names  # Имена файлов уменьшенных копий
+
+BLOB_PREFIX = getattr(settings, 'MEDIA_BLOB_PREFIX', 'blobs')  # Каталог блобов внутри MEDIA_ROOT (nginx отдает его как immutable)
+
+
+def blob_name(digest, ext):
+    """Имя блоба: blobs/ab/cd/<sha256>.<ext> (два уровня каталогов, чтобы не переполнять один)"""
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def is_blob(name):
+    """Лежит ли файл в хранилище блобов"""
+    return bool(name) and name.startswith(BLOB_PREFIX + '/')
+
+
+def blob_references(field_file, variants):
+    """Множество блобов, на которые ссылается поле изображения вместе с его копиями"""
+    names = variant_names(variants)
+    if field_file:
+        names.add(field_file.name)
+    return {name for name in names if is_blob(name)}
+
+
+def media_references(instance, field_name, variants_field):
+    """Блобы, на которые ссылается объект, или None, если ссылки не отслеживаются"""
+    if not isinstance(instance._meta.get_field(field_name).storage, ContentAddressedStorage):
+        return None  # Обычное хранилище - счетчики не нужны
+    if {field_name, variants_field} & instance.get_deferred_fields():
+        return None  # Поля не загружены - не делаем лишних запросов
+    return blob_references(getattr(instance, field_name), getattr(instance, variants_field))
+
+
+# Хранилище, в котором имя файла - хэш содержимого: повторная загрузка не создает копию,
+# а блоб никогда не перезаписывается и может кэшироваться навсегда. delete() блобы не трогает -
+# они могут быть общими; неиспользуемые блобы удаляет gc_media по счетчикам ссылок MediaBlob
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        return name  # Итоговое имя определяется содержимым в _save
+
+    def _save(self, name, content):
+        _, ext = os.path.splitext(name)
+        ext = ext.lower()
+        directory = os.path.join(self.location, BLOB_PREFIX)
+        os.makedirs(directory, exist_ok=True)
+
+        # Один проход по данным: пишем во временный файл и одновременно считаем хэш
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+
+            name = blob_name(digest.hexdigest(), ext)
+            full_path = self.path(name)
+            if os.path.exists(full_path):
+                os.remove(temp_path)  # Такой файл уже есть - дедупликация
+                os.utime(full_path)  # Свежая ссылка: gc_media не удалит блоб в течение grace периода
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, full_path)  # Атомарно; при гонке оба процесса пишут одинаковое содержимое
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name.replace('\\', '/')
+
+    def delete(self, name):
+        if is_blob(name):
+            return  # Блобы удаляются только сборщиком мусора
+        super().delete(name)  # Файлы, загруженные до перехода на блобы, удаляются как раньше
+
+    def purge(self, name):
+        """Физически удаляет блоб (используется gc_media)"""
+        super().delete(name)
@@ -0,0 +1,24 @@
+# Разбор строки тегов поста (используется моделями и миграцией данных)
+from django.utils.text import slugify  # Импортируем функцию генерации slug
+
+TAG_NAME_MAX_LENGTH = 50  # Максимальная длина названия тега
+MAX_TAGS_PER_POST = 20  # Сколько тегов учитывать у одного поста
+
+
+def parse_tags(text):
+    """
+    Список пар (slug, название) из строки тегов без дубликатов.
+
+    Теги разделяются запятыми; строки без запятых (старые посты)
+    разделяются по пробелам, как их показывал шаблон post_detail.
+    """
+    if not text:
+        return []
+    parts = text.split(',') if ',' in text else text.split()
+    tags = {}
+    for part in parts:
+        name = ' '.join(part.split())[:TAG_NAME_MAX_LENGTH].lstrip('#')  # Схлопываем пробелы, убираем "#" хэштегов
+        slug = slugify(name, allow_unicode=True)  # Кириллические теги сохраняют читаемый slug
+        if slug and slug not in tags:
+            tags[slug] = name
+    return list(tags.items())[:MAX_TAGS_PER_POST]
@@ -0,0 +1,209 @@
+# Фоновые задачи Celery приложения блога
+import logging  # Импортируем модуль логирования
+from datetime import timedelta  # Импортируем интервалы времени
+
+from celery import shared_task  # Импортируем декоратор задач, не привязанный к конкретному экземпляру Celery
+from django.conf import settings  # Импортируем настройки Django
+from django.db import transaction  # Импортируем управление транзакциями
+from django.utils import timezone  # Импортируем утилиты времени
+
+from .images import AVATAR_SIZES, POST_IMAGE_SIZES, build_variants, delete_variants, variant_names  # Конвейер изображений
+from .models import AuthorStats, ChunkedUpload, Comment, MediaBlob, Notification, NotificationArchive, Post, UserProfile  # Импортируем модели приложения
+from .live import send_comment  # Live-поток комментариев поста
+from .notifications import flush_pending  # Отложенная отправка уведомлений по WebSocket
+from . import drafts, feed, publishing, related  # Черновики автосохранения, ленты подписок, отложенная публикация и расчет похожих постов
+from .storage import media_references  # Ссылки объекта на блобы хранилища
+from .uploads import discard_chunked_upload  # Удаление временных файлов загрузок
+
+logger = logging.getLogger(__name__)  # Логгер модуля
+CHUNKED_UPLOAD_EXPIRE_HOURS = getattr(settings, 'CHUNKED_UPLOAD_EXPIRE_HOURS', 24)  # Срок жизни незавершенной загрузки
+NOTIFICATION_RETENTION_DAYS = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 30)  # Через сколько дней прочитанное уведомление уходит в архив
+NOTIFICATION_ARCHIVE = getattr(settings, 'NOTIFICATION_ARCHIVE', True)  # Переносить в архив (False - просто удалять)
+NOTIFICATION_ARCHIVE_DAYS = getattr(settings, 'NOTIFICATION_ARCHIVE_DAYS', 365)  # Сколько дней хранится архив (0 - бессрочно)
+NOTIFICATION_RETENTION_BATCH_SIZE = getattr(settings, 'NOTIFICATION_RETENTION_BATCH_SIZE', 1000)  # Строк в одной транзакции
+
+
+def enqueue(task, *args, **kwargs):
+    """Ставит задачу в очередь после коммита текущей транзакции"""
+    def send():
+        try:
+            task.delay(*args, **kwargs)
+        except Exception:  # Недоступный брокер не должен ломать запрос пользователя
+            logger.exception('Failed to enqueue %s', task.name)
+    transaction.on_commit(send)
+
+
+def _sync_references(instance, field_name, variants_field, before):
+    """Обновляет счетчики MediaBlob после изменения объекта через QuerySet.update()"""
+    after = media_references(instance, field_name, variants_field)
+    if before is not None and after is not None:
+        MediaBlob.retain(after - before)
+        MediaBlob.release(before - after)
+
+
+def _process_image(model, pk, field_name, variants_field, sizes):
+    """Общая обработка изображения: строит варианты и записывает их в БД одним UPDATE"""
+    instance = model.objects.filter(pk=pk).only('pk', field_name, variants_field).first()
+    if instance is None:
+        return None  # Объект удален до выполнения задачи
+    field_file = getattr(instance, field_name)
+    old_variants = getattr(instance, variants_field) or {}
+    storage = field_file.storage
+    references = media_references(instance, field_name, variants_field)
+
+    if not field_file:
+        delete_variants(storage, old_variants)  # Изображение удалено - чистим старые варианты
+        model.objects.filter(pk=pk).update(**{variants_field: {}})
+        setattr(instance, variants_field, {})
+        _sync_references(instance, field_name, variants_field, references)
+        return {}
+    if old_variants.get('source') == field_file.name:
+        return old_variants  # Варианты уже актуальны
+
+    variants = build_variants(field_file, sizes)
+    delete_variants(storage, old_variants, keep=variant_names(variants))
+    changes = {variants_field: variants}
+    if variants['source'] != field_file.name:
+        changes[field_name] = variants['source']  # Storage переименовал перекодированный оригинал
+    # Обновляем только если изображение не сменили, пока шла обработка
+    updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**changes)
+    if not updated:
+        delete_variants(storage, variants)
+        return variants
+    for name, value in changes.items():
+        setattr(instance, name, value)
+    _sync_references(instance, field_name, variants_field, references)
+    return variants
+
+
+@shared_task(ignore_result=True)
+def process_post_image(post_id):
+    """Генерирует уменьшенные копии изображения поста"""
+    return _process_image(Post, post_id, 'image', 'image_variants', POST_IMAGE_SIZES)
+
+
+@shared_task(ignore_result=True)
+def process_avatar(profile_id):
+    """Генерирует уменьшенные копии аватара пользователя"""
+    return _process_image(UserProfile, profile_id, 'avatar', 'avatar_variants', AVATAR_SIZES)
+
+
+@shared_task(ignore_result=True)
+def cleanup_chunked_uploads():
+    """Удаляет брошенные загрузки по частям вместе с временными файлами"""
+    cutoff = timezone.now() - timedelta(hours=CHUNKED_UPLOAD_EXPIRE_HOURS)
+    stale = list(ChunkedUpload.objects.filter(updated_at__lt=cutoff).only('pk'))
+    for upload in stale:
+        discard_chunked_upload(upload)
+    ChunkedUpload.objects.filter(pk__in=[upload.pk for upload in stale]).delete()
+    return len(stale)
+
+
+@shared_task(ignore_result=True)
+def expire_bans():
+    """Снимает истекшие блокировки пользователей (проверка блокировки на чтении ничего не пишет)"""
+    return UserProfile.expire_bans()
+
+
+@shared_task(ignore_result=True)
+def archive_notifications():
+    """Переносит старые прочитанные уведомления в архив и чистит устаревший архив"""
+    now = timezone.now()
+    cutoff = now - timedelta(days=NOTIFICATION_RETENTION_DAYS)
+    archived = Notification.archive_read(cutoff, NOTIFICATION_RETENTION_BATCH_SIZE, archive=NOTIFICATION_ARCHIVE)
+    purged = 0
+    if NOTIFICATION_ARCHIVE_DAYS:
+        purged = NotificationArchive.purge(now - timedelta(days=NOTIFICATION_ARCHIVE_DAYS), NOTIFICATION_RETENTION_BATCH_SIZE)
+    return archived, purged
+
+
+@shared_task(ignore_result=True)
+def flush_notifications(user_id):
+    """Отправляет получателю уведомления, накопившиеся за интервал ограничения частоты"""
+    flush_pending(user_id)
+
+
+@shared_task(ignore_result=True)
+def notify_approved_comments(comment_ids):
+    """Уведомляет авторов одобренных комментариев и авторов постов одним bulk_create"""
+    comments = Comment.objects.filter(pk__in=comment_ids, status='approved').select_related('author', 'post')
+    notifications = []
+    for comment in comments:
+        notifications.append(Notification(
+            user_id=comment.author_id,
+            notification_type='system',
+            title='Your Comment Was Approved',
+            message=f'Your comment on "{comment.post.title}" has been approved',
+            related_post=comment.post,
+            related_comment=comment,
+        ))
+        post_notification = Notification.for_comment(comment)  # То же уведомление, что отправляется без модерации
+        if post_notification:
+            notifications.append(post_notification)
+    Notification.objects.bulk_create(notifications, batch_size=500)
+    for comment in comments:
+        send_comment(comment)  # Одобренный комментарий появляется у читателей поста без перезагрузки
+    return len(notifications)
+
+
+@shared_task(ignore_result=True)
+def update_related_posts(post_id):
+    """Обновляет похожие посты после изменения поста"""
+    return related.update_related_posts(post_id)
+
+
+@shared_task(ignore_result=True)
+def rebuild_related_posts():
+    """Пересчитывает похожие посты для всех опубликованных постов"""
+    return related.rebuild_related_posts()
+
+
+@shared_task(ignore_result=True)
+def recount_author_stats(post_ids=(), comment_ids=()):
+    """Пересчитывает счетчики авторов постов и комментариев, измененных массовым UPDATE"""
+    author_ids = set(Post.objects.filter(pk__in=post_ids).values_list('author_id', flat=True))
+    author_ids.update(Comment.objects.filter(pk__in=comment_ids).values_list('author_id', flat=True))
+    return AuthorStats.recount(author_ids)
+
+
+@shared_task(ignore_result=True)
+def reconcile_author_stats():
+    """Ночная сверка счетчиков всех авторов с исходными таблицами"""
+    return AuthorStats.reconcile()
+
+
+@shared_task(ignore_result=True)
+def render_post_content(post_ids):
+    """Строит HTML, оглавление и время чтения крупных постов, отложенных при сохранении"""
+    rendered = 0
+    for post in Post.objects.filter(pk__in=post_ids, rendered_hash='').only('pk', 'content', 'rendered_hash', 'updated_date'):
+        post.render()
+        # Пост успели изменить: новое сохранение уже поставило свою задачу
+        rendered += Post.objects.filter(pk=post.pk, updated_date=post.updated_date).update(
+            **{field: getattr(post, field) for field in Post.RENDERED_FIELDS}
+        )
+    return rendered
+
+
+@shared_task(ignore_result=True)
+def persist_post_draft(post_id):
+    """Записывает автосохраненный черновик поста из кэша в БД"""
+    return drafts.persist(post_id)
+
+
+@shared_task(ignore_result=True)
+def publish_scheduled_posts():
+    """Публикует запланированные посты, срок которых наступил (таймер ETA или периодический обход)"""
+    return publishing.publish_due()
+
+
+@shared_task(ignore_result=True)
+def fan_out_posts(post_ids):
+    """Рассылает опубликованные посты в ленты подписчиков (по задаче на пакет подписчиков)"""
+    return feed.fan_out(post_ids)
+
+
+@shared_task(ignore_result=True)
+def push_to_timelines(user_ids, entries):
+    """Добавляет посты в ленты пакета подписчиков"""
+    return feed.push(user_ids, entries)
@@ -0,0 +1,71 @@
+"""
+Тесты списков админ-панели
+"""
+
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+
+from blog.models import Category, Comment, Notification, Post, Tag
+from blog.paginators import EstimatedCountPaginator
+
+
+class AdminChangelistTest(TestCase):
+    """Тесты счетчиков, фильтров и действий в списках админки"""
+
+    def setUp(self):
+        self.staff = User.objects.create_superuser(username='boss', email='boss@example.com', password='testpass123')
+        self.author = User.objects.create_user(username='writer', password='testpass123')
+        self.category = Category.objects.create(name='Go')
+        self.post = Post.objects.create(title='Пост', content='Текст', author=self.author, category=self.category, status='published', tags='go')
+        Post.objects.create(title='Чужой', content='Текст', author=self.staff, status='published')
+        self.post.likes.add(self.staff, self.author)
+        comment = Comment.objects.create(post=self.post, author=self.staff, text='Первый')
+        Comment.objects.create(post=self.post, author=self.author, text='Ответ', parent=comment)
+        Comment.objects.create(post=self.post, author=self.author, text='Скрытый', is_active=False)
+
+    def changelist(self, model, **params):
+        request = RequestFactory().get('/', params)
+        request.user = self.staff
+        return admin.site._registry[model].get_changelist_instance(request)
+
+    def test_post_counts_are_annotated(self):
+        """Тест счетчиков постов без запросов на строку"""
+        changelist = self.changelist(Post)
+        with self.assertNumQueries(1):
+            rows = {post.title: (post._like_count, post._comment_count, post.author.username) for post in changelist.result_list}
+        self.assertEqual(rows, {'Пост': (2, 2, 'writer'), 'Чужой': (0, 0, 'boss')})
+
+    def test_category_and_comment_counts(self):
+        """Тест счетчиков категорий и комментариев"""
+        category = self.changelist(Category).result_list[0]
+        self.assertEqual(category._post_count, 1)
+        comments = {comment.text: comment._reply_count for comment in self.changelist(Comment).result_list}
+        self.assertEqual(comments, {'Первый': 1, 'Ответ': 0, 'Скрытый': 0})
+
+    def test_author_filter_by_username(self):
+        """Тест фильтра по имени автора вместо списка пользователей"""
+        changelist = self.changelist(Post, author_username='writer')
+        self.assertEqual([post.title for post in changelist.result_list], ['Пост'])
+        Notification.objects.create(user=self.author, notification_type='system', title='Привет', message='Текст')
+        self.assertEqual(self.changelist(Notification, user_username='boss').result_count, 0)
+
+    def test_status_actions_recount_tags(self):
+        """Тест массовой смены статуса с пересчетом счетчиков тегов"""
+        model_admin = admin.site._registry[Post]
+        request = RequestFactory().post('/')
+        request.user = self.staff
+        self.assertEqual(Tag.objects.get(slug='go').post_count, 1)
+        with patch.object(model_admin, 'message_user'):
+            model_admin.archive_posts(request, Post.objects.filter(pk=self.post.pk))
+            self.assertEqual(Tag.objects.get(slug='go').post_count, 0)
+            model_admin.publish_posts(request, Post.objects.filter(pk=self.post.pk))
+        self.assertEqual(Tag.objects.get(slug='go').post_count, 1)
+
+    def test_estimated_paginator_falls_back_to_count(self):
+        """Тест точного подсчета там, где оценка недоступна"""
+        self.assertIsNone(EstimatedCountPaginator(Comment.objects.all(), 10).estimate())
+        self.assertEqual(EstimatedCountPaginator(Comment.objects.all(), 10).count, 3)
+        self.assertEqual(EstimatedCountPaginator(list(range(5)), 2).count, 5)
@@ -0,0 +1,113 @@
+"""
+Тесты кэшированного принципала пользователя
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, RequestFactory, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from blog.api.authentication import CachedJWTAuthentication
+from blog.auth import CachedPrincipalUser, get_principal, principal_cache_key
+from blog.models import UserProfile
+from blog.views import is_user_banned
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-tests'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CachedPrincipalTest(TestCase):
+    """Тесты кэширования данных пользователя для авторизации"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='principal', password='testpass123', is_staff=True)
+
+    def tearDown(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_principal_cached(self):
+        """Тест что повторное чтение принципала не обращается к БД"""
+        principal = get_principal(self.user.pk)
+        self.assertTrue(principal['is_staff'])
+        self.assertFalse(principal['is_banned'])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_principal(self.user.pk), principal)
+
+    def test_ban_invalidates_principal(self):
+        """Тест сброса кэша при блокировке через профиль"""
+        self.assertFalse(is_user_banned(self.user))
+        profile = self.user.profile
+        profile.is_banned = True
+        profile.save()
+        self.assertTrue(is_user_banned(self.user))
+
+    def test_ban_invalidates_after_commit(self):
+        """Тест что принципал, закэшированный параллельным запросом до коммита, сбрасывается после коммита"""
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.ban_users([self.user.pk])
+            cache.set(principal_cache_key(self.user.pk), {**get_principal(self.user.pk), 'is_banned': False})  # Состояние до коммита
+        self.assertTrue(get_principal(self.user.pk)['is_banned'])
+
+    def test_expired_ban_without_write(self):
+        """Тест что истекшая блокировка не действует и не изменяет профиль"""
+        profile = self.user.profile
+        profile.is_banned = True
+        profile.ban_expires = timezone.now() - timedelta(hours=1)
+        profile.save()
+        with self.assertNumQueries(1):  # Только чтение принципала, без UPDATE профиля
+            self.assertFalse(is_user_banned(self.user))
+
+    def test_jwt_authentication_without_queries(self):
+        """Тест JWT аутентификации из кэша"""
+        token = str(AccessToken.for_user(self.user))
+        request = RequestFactory().get('/api/posts/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        authentication = CachedJWTAuthentication()
+        authentication.authenticate(request)  # Прогреваем кэш
+        with self.assertNumQueries(0):
+            user, _ = authentication.authenticate(request)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertTrue(user.is_staff)
+            self.assertTrue(user.is_authenticated)
+            self.assertFalse(is_user_banned(user))
+
+    def test_inactive_user_rejected(self):
+        """Тест отказа неактивному пользователю"""
+        from rest_framework.exceptions import AuthenticationFailed
+        self.user.is_active = False
+        self.user.save()
+        token = str(AccessToken.for_user(self.user))
+        request = RequestFactory().get('/api/posts/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertRaises(AuthenticationFailed):
+            CachedJWTAuthentication().authenticate(request)
+
+    def test_admin_deactivation_rejects_jwt(self):
+        """Тест что JWT пользователя, деактивированного действием админки, сразу перестает приниматься"""
+        from django.contrib import admin
+        from rest_framework.exceptions import AuthenticationFailed
+        token = str(AccessToken.for_user(self.user))
+        request = RequestFactory().get('/api/posts/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        CachedJWTAuthentication().authenticate(request)  # Принципал в кэше
+        admin_request = RequestFactory().post('/')
+        admin_request.user = User.objects.create_superuser(username='boss', email='boss@example.com', password='testpass123')
+        model_admin = admin.site._registry[User]
+        with patch.object(model_admin, 'message_user'):
+            model_admin.deactivate_users(admin_request, User.objects.all())
+        self.assertTrue(User.objects.get(pk=admin_request.user.pk).is_active)  # Себя не деактивирует
+        with self.assertRaises(AuthenticationFailed):
+            CachedJWTAuthentication().authenticate(request)
+        with patch.object(model_admin, 'message_user'):
+            model_admin.activate_users(admin_request, User.objects.filter(pk=self.user.pk))
+        self.assertEqual(CachedJWTAuthentication().authenticate(request)[0].pk, self.user.pk)
+
+    def test_lazy_user_loads_on_demand(self):
+        """Тест загрузки полной строки User только при необходимости"""
+        user = CachedPrincipalUser(get_principal(self.user.pk))
+        with self.assertNumQueries(0):
+            self.assertEqual(user, self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
@@ -0,0 +1,68 @@
+"""
+Тесты подсказок при вводе
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog.autocomplete import SOURCES, Trie, suggest
+from blog.models import Category, Post
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class TrieTest(TestCase):
+    """Тесты префиксного дерева"""
+
+    def test_search_by_prefix_in_key_order(self):
+        """Тест: записи возвращаются по префиксу, в порядке ключей, без повторов и не больше limit"""
+        trie = Trie()
+        for key, pk in [('django', 1), ('python', 2), ('pyramid', 3), ('py', 4), ('python', 2)]:
+            trie.insert(key, {'id': pk})
+        self.assertEqual(trie.search('py', 10), [{'id': 4}, {'id': 3}, {'id': 2}])
+        self.assertEqual(trie.search('py', 2), [{'id': 4}, {'id': 3}])
+        self.assertEqual(trie.search('ruby', 10), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SuggestTest(TestCase):
+    """Тесты подсказок по постам, пользователям и категориям"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='pythonista', password='testpass123')
+        self.post = Post.objects.create(title='Изучаем Python', content='Текст', author=self.user, status='published')
+        Post.objects.create(title='Python черновик', content='Текст', author=self.user)
+        self.category = Category.objects.create(name='Python')
+
+    def test_suggest_all_types(self):
+        """Тест: подсказки по началу любого слова, только опубликованные посты"""
+        result = suggest('  PYTH ')
+        self.assertEqual(result['posts'], [{'id': self.post.pk, 'title': 'Изучаем Python'}])
+        self.assertEqual(result['users'], [{'id': self.user.pk, 'username': 'pythonista'}])
+        self.assertEqual(result['categories'], [{'id': self.category.pk, 'name': 'Python'}])
+
+    def test_short_prefix_and_types(self):
+        """Тест: слишком короткий префикс не ищется, неизвестные типы игнорируются"""
+        self.assertEqual(suggest('p'), {'posts': [], 'users': [], 'categories': []})
+        self.assertEqual(list(suggest('py', ['users', 'secrets'])), ['users'])
+
+    def test_response_is_cached(self):
+        """Тест: повторный запрос с тем же нормализованным префиксом не обращается к БД"""
+        suggest('pyth')
+        with self.assertNumQueries(0):
+            self.assertEqual(suggest('Pyth')['users'][0]['username'], 'pythonista')
+
+    def test_trie_is_rebuilt_after_changes(self):
+        """Тест: новые данные попадают в подсказки после сброса дерева сигналом"""
+        suggest('ruby')
+        Category.objects.create(name='Ruby')
+        self.assertEqual([row['name'] for row in suggest('rub')['categories']], ['Ruby'])
+
+    def test_trie_is_rebuilt_after_changes_in_other_process(self):
+        """Тест: дерево перестраивается, если данные изменились в другом процессе (поколение в общем кэше)"""
+        suggest('ruby')
+        Category.objects.bulk_create([Category(name='Ruby')])  # Без сигналов: локальное дерево не сброшено
+        cache.incr(SOURCES['categories'].generation_key)  # Как invalidate() в другом процессе
+        self.assertEqual([row['name'] for row in suggest('rub')['categories']], ['Ruby'])
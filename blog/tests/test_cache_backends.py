@@ -0,0 +1,133 @@
+"""
+Тесты для многоуровневого кэша (L1 в памяти процесса + Redis)
+"""
+
+import json
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+
+from blog.cache_backends import L1Store, TieredRedisCache
+from blog.models import SiteSettings
+
+
+class L1StoreTest(TestCase):
+    """Тесты для локального LRU хранилища"""
+
+    def test_get_returns_copy(self):
+        """Тест что L1 возвращает копию, а не общий объект"""
+        store = L1Store()
+        store.set('key', {'a': 1}, 10)
+        value = store.get('key')
+        value['a'] = 2
+        self.assertEqual(store.get('key'), {'a': 1})
+
+    def test_lru_eviction(self):
+        """Тест вытеснения наименее недавно использованной записи"""
+        store = L1Store(max_entries=2)
+        store.set('a', 1, 10)
+        store.set('b', 2, 10)
+        store.get('a')  # 'a' становится самой свежей записью
+        store.set('c', 3, 10)
+
+        self.assertIn('a', store)
+        self.assertNotIn('b', store)
+        self.assertIn('c', store)
+        self.assertEqual(len(store), 2)
+
+    def test_expired_entry(self):
+        """Тест истечения TTL записи"""
+        store = L1Store()
+        with patch('blog.cache_backends.time.monotonic', return_value=100.0):
+            store.set('key', 'value', 5)
+        with patch('blog.cache_backends.time.monotonic', return_value=106.0):
+            self.assertNotIn('key', store)
+
+    def test_zero_ttl_not_stored(self):
+        """Тест что ключи с нулевым TTL не попадают в L1"""
+        store = L1Store()
+        store.set('key', 'value', 0)
+        self.assertNotIn('key', store)
+
+
+class TieredRedisCacheTest(TestCase):
+    """Тесты для TieredRedisCache (без реального Redis)"""
+
+    def setUp(self):
+        self.cache = TieredRedisCache('redis://localhost:6379/0', {
+            'KEY_PREFIX': 'test',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'L1_MAX_ENTRIES': 10,
+                'L1_KEY_FAMILIES': {'site_settings': 60, 'sess': 5, 'session_long': 30},
+            },
+        })
+
+    def test_l1_options_not_passed_to_redis_client(self):
+        """Тест что опции L1 не передаются в Redis клиент"""
+        self.assertEqual(self.cache._options, {})
+        self.assertEqual(self.cache._l1.max_entries, 10)
+
+    def test_family_ttl(self):
+        """Тест TTL семейств ключей"""
+        self.assertEqual(self.cache._l1_ttl('site_settings'), 60)
+        self.assertEqual(self.cache._l1_ttl('session_long:abc'), 30)  # Более длинный префикс важнее
+        self.assertEqual(self.cache._l1_ttl('sess:abc'), 5)
+        self.assertEqual(self.cache._l1_ttl('other'), 0)
+
+    def test_family_ttl_capped_by_timeout(self):
+        """Тест что L1 не хранит ключ дольше, чем Redis"""
+        self.assertEqual(self.cache._l1_ttl('site_settings', 10), 10)
+
+    def test_get_served_from_l1(self):
+        """Тест что повторный get не обращается к Redis"""
+        with patch.object(TieredRedisCache, '_cache') as redis_client, \
+                patch.object(self.cache, '_ensure_subscriber'):
+            redis_client.get.return_value = 'value'
+            self.assertEqual(self.cache.get('site_settings'), 'value')
+            self.assertEqual(self.cache.get('site_settings'), 'value')
+            redis_client.get.assert_called_once()
+
+    def test_delete_publishes_invalidation(self):
+        """Тест рассылки инвалидации при удалении ключа"""
+        with patch.object(TieredRedisCache, '_cache') as redis_client:
+            self.cache.delete('site_settings')
+            channel, payload = redis_client.get_client.return_value.publish.call_args[0]
+        self.assertEqual(channel, 'test:l1-invalidate')
+        self.assertEqual(json.loads(payload)['keys'], [self.cache.make_key('site_settings')])
+
+    def test_invalidation_message_from_other_worker(self):
+        """Тест что сообщение другого воркера удаляет ключ из L1"""
+        full_key = self.cache.make_key('site_settings')
+        self.cache._l1.set(full_key, 'stale', 60)
+        self.cache._handle_message(json.dumps({'sender': 'other', 'keys': [full_key]}))
+        self.assertNotIn(full_key, self.cache._l1)
+
+    def test_own_invalidation_message_ignored(self):
+        """Тест что собственные сообщения не сбрасывают свежие данные"""
+        full_key = self.cache.make_key('site_settings')
+        self.cache._l1.set(full_key, 'fresh', 60)
+        self.cache._handle_message(json.dumps({'sender': self.cache._instance_id, 'keys': [full_key]}))
+        self.assertIn(full_key, self.cache._l1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SiteSettingsCacheTest(TestCase):
+    """Тесты кэширования настроек сайта"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_load_uses_cache(self):
+        """Тест что повторная загрузка настроек не обращается к БД"""
+        SiteSettings.load()
+        with self.assertNumQueries(0):
+            SiteSettings.load()
+
+    def test_save_invalidates_cache(self):
+        """Тест сброса кэша при сохранении настроек"""
+        settings = SiteSettings.load()
+        settings.site_name = 'Новое имя'
+        settings.save()
+        self.assertEqual(SiteSettings.load().site_name, 'Новое имя')
@@ -0,0 +1,57 @@
+"""
+Тесты автосохранения черновиков правки
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog import drafts
+from blog.models import Post, PostDraft
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DraftTest(TestCase):
+    """Тесты дельт, версий и отложенной записи в БД"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', password='testpass123')
+        self.post = Post.objects.create(title='Пост', content='Первая строка\r\nВторая строка', author=self.user)
+
+    def test_apply_ops(self):
+        """Тест: операции применяются по порядку, выход за границы текста - ошибка"""
+        self.assertEqual(drafts.apply_ops('abcdef', [{'pos': 1, 'delete': 2, 'insert': 'X'}, {'pos': 0, 'insert': '>'}]), '>aXdef')
+        for ops in ([{'pos': 5, 'delete': 2}], [{'pos': -1}], [{'pos': 0, 'insert': 1}], {'pos': 0}):
+            with self.assertRaises(drafts.DraftError):
+                drafts.apply_ops('abcdef', ops)
+
+    def test_update_with_versions(self):
+        """Тест: дельта применяется к версии клиента, устаревшая версия дает конфликт, пост не меняется"""
+        with patch('blog.tasks.persist_post_draft.apply_async') as apply_async, self.captureOnCommitCallbacks(execute=True):
+            draft = drafts.update(self.post, 0, [{'pos': 14, 'delete': 6, 'insert': 'Новая'}], title='Черновик')
+            self.assertEqual((draft['version'], draft['content']), (1, 'Первая строка\nНовая строка'))
+            drafts.update(self.post, 1, [{'pos': 0, 'insert': '# '}])
+        apply_async.assert_called_once_with((self.post.pk,), countdown=drafts.PERSIST_DELAY)  # Одна запись на интервал
+        with self.assertRaises(drafts.DraftConflict) as conflict:
+            drafts.update(self.post, 1, [])
+        self.assertEqual(conflict.exception.version, 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'Пост')
+
+    def test_persist_and_discard(self):
+        """Тест: черновик пишется в БД, запоздавшая запись не откатывает версию, после вытеснения из кэша читается из БД"""
+        drafts.update(self.post, 0, [{'pos': 0, 'insert': 'Начало. '}])
+        self.assertEqual(drafts.persist(self.post.pk), 1)
+        PostDraft.store(self.post.pk, {'version': 0, 'title': 'Старый', 'content': ''})
+        self.assertEqual(PostDraft.objects.get(post=self.post).version, 1)
+
+        cache.clear()
+        self.assertEqual(drafts.load(self.post)['content'], 'Начало. Первая строка\nВторая строка')
+        drafts.discard(self.post.pk)
+        self.assertFalse(PostDraft.objects.filter(post=self.post).exists())
+        self.assertEqual(drafts.load(self.post)['version'], 0)
@@ -0,0 +1,95 @@
+"""
+Тесты подписок и ленты подписок
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog import feed
+from blog.models import AuthorStats, Follow, Post
+from blog.tasks import fan_out_posts, push_to_timelines
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FeedTest(TestCase):
+    """Тесты рассылки постов по лентам и чтения ленты"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.follow(self.reader.pk, self.author.pk)
+            Follow.follow(self.reader.pk, self.other.pk)
+
+    def publish(self, author, title):
+        with patch('blog.tasks.fan_out_posts.delay', side_effect=fan_out_posts), \
+                patch('blog.tasks.push_to_timelines.delay', side_effect=push_to_timelines), \
+                self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(title=title, content='Текст', author=author, status='published')
+
+    def test_follow_updates_counter(self):
+        """Тест: подписка и отписка меняют счетчик подписчиков, повторная подписка игнорируется"""
+        self.assertFalse(Follow.follow(self.reader.pk, self.author.pk))
+        self.assertFalse(Follow.follow(self.author.pk, self.author.pk))  # На себя нельзя
+        self.assertEqual(AuthorStats.for_user(self.author.pk).followers, 1)
+        self.assertTrue(Follow.unfollow(self.reader.pk, self.author.pk))
+        self.assertEqual(AuthorStats.for_user(self.author.pk).followers, 0)
+        AuthorStats.recount([self.other.pk])
+        self.assertEqual(AuthorStats.for_user(self.other.pk).followers, 1)
+
+    def test_fan_out_and_pages(self):
+        """Тест: опубликованный пост попадает в построенную ленту, страницы идут по курсору"""
+        old = self.publish(self.author, 'Старый')
+        self.assertEqual(feed.page(self.reader)[0], [old])  # Лента построена из БД
+        new = self.publish(self.other, 'Новый')
+        Post.objects.create(title='Черновик', content='Текст', author=self.author)
+        self.assertEqual(feed.timelines().page(self.reader.pk, None, 10), [(new.pk, feed.score(new.published_date)), (old.pk, feed.score(old.published_date))])
+
+        posts, before = feed.page(self.reader, limit=1)
+        self.assertEqual((posts, before), ([new], (feed.score(new.published_date), new.pk)))
+        self.assertEqual(feed.page(self.reader, before, limit=1)[0], [old])
+        self.assertEqual(feed.page(self.author)[0], [])  # Лента подписок, а не своих постов
+
+    def test_unfollow_and_unpublish(self):
+        """Тест: отписка перестраивает ленту, снятый с публикации пост убирается при чтении"""
+        first, second = self.publish(self.author, 'Первый'), self.publish(self.other, 'Второй')
+        self.assertEqual(feed.page(self.reader)[0], [second, first])
+        Post.objects.filter(pk=second.pk).update(status='draft')
+        self.assertEqual(feed.page(self.reader)[0], [first])
+        self.assertEqual(feed.timelines().page(self.reader.pk, None, 10), [(first.pk, feed.score(first.published_date))])
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.unfollow(self.reader.pk, self.author.pk)
+        self.assertEqual(feed.page(self.reader), ([], None))
+
+    def test_equal_publish_times_are_paged(self):
+        """Тест: посты с одинаковым временем публикации не теряются на границе страниц"""
+        for number in range(5):
+            self.publish(self.author if number % 2 else self.other, f'Пост {number}')
+        Post.objects.update(published_date=Post.objects.first().published_date)  # Как у запланированных на одну минуту
+        expected = list(Post.objects.order_by('-pk'))
+        for threshold in (10000, -1):  # Посты из ленты в Redis, затем из БД (авторы с огромным числом подписчиков)
+            feed.reset(self.reader.pk)
+            with patch('blog.feed.FANOUT_MAX_FOLLOWERS', threshold):
+                seen, before = [], None
+                while True:
+                    posts, before = feed.page(self.reader, before, limit=2)
+                    seen += posts
+                    if before is None:
+                        break
+            self.assertEqual(seen, expected)
+
+    @patch('blog.feed.FANOUT_MAX_FOLLOWERS', 0)
+    def test_large_authors_are_pulled(self):
+        """Тест: посты авторов с большим числом подписчиков не рассылаются, а читаются из БД"""
+        feed.page(self.reader)
+        with patch('blog.tasks.push_to_timelines.delay') as delay:
+            post = self.publish(self.author, 'Популярный')
+        delay.assert_not_called()
+        self.assertEqual(feed.page(self.reader)[0], [post])
@@ -0,0 +1,109 @@
+"""
+Тесты для конвейера обработки изображений
+"""
+
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from blog.images import blurhash_encode, build_variants, image_needs_processing
+from blog.models import Post
+from blog.tasks import process_post_image, process_avatar
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(size=(1600, 1200), fmt='JPEG', color=(200, 30, 30)):
+    """Создает изображение в памяти с EXIF метаданными"""
+    buffer = io.BytesIO()
+    image = Image.new('RGB', size, color)
+    exif = Image.Exif()
+    exif[0x010F] = 'TestCamera'  # Производитель камеры
+    image.save(buffer, fmt, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImagePipelineTest(TestCase):
+    """Тесты генерации уменьшенных копий изображений"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='imageuser', password='testpass123')
+        self.post = Post.objects.create(
+            title='Пост с картинкой',
+            content='Текст',
+            author=self.user,
+            image=SimpleUploadedFile('photo.jpg', make_image(), content_type='image/jpeg'),
+        )
+
+    def test_variants_generated(self):
+        """Тест генерации WebP и JPEG копий"""
+        variants = process_post_image(self.post.pk)
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.post.image_variants, variants)
+        self.assertEqual(variants['source'], self.post.image.name)
+        self.assertEqual(variants['thumb']['width'], 480)
+        self.assertEqual(variants['large']['width'], 1280)
+        self.assertTrue(variants['thumb']['webp'].endswith('.webp'))  # Имя зависит от хранилища (posts/..._thumb.webp или blobs/.../<sha>.webp)
+        self.assertTrue(self.post.thumbnail_url.endswith(variants['thumb']['jpeg']))
+        self.assertTrue(self.post.large_image_webp_url.endswith(variants['large']['webp']))
+        self.assertFalse(image_needs_processing(self.post.image, self.post.image_variants))
+
+    def test_original_stripped_and_capped(self):
+        """Тест удаления метаданных и ограничения размера оригинала"""
+        variants = build_variants(self.post.image, {'thumb': 100}, max_dimension=1000)
+        with self.post.image.storage.open(variants['source'], 'rb') as f:  # В хранилище блобов оригинал сохраняется под новым именем
+            image = Image.open(f)
+            self.assertEqual(max(image.size), 1000)
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_thumbnail_falls_back_to_original(self):
+        """Тест что до обработки используется оригинал"""
+        self.assertEqual(self.post.thumbnail_url, self.post.image.url)
+
+    def test_image_removed_clears_variants(self):
+        """Тест очистки копий при удалении изображения"""
+        process_post_image(self.post.pk)
+        Post.objects.filter(pk=self.post.pk).update(image='')
+        self.assertEqual(process_post_image(self.post.pk), {})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, {})
+
+    def test_avatar_variants(self):
+        """Тест генерации копий аватара"""
+        profile = self.user.profile
+        profile.avatar = SimpleUploadedFile('avatar.png', make_image((300, 300), 'PNG'), content_type='image/png')
+        profile.save()
+        variants = process_avatar(profile.pk)
+        self.assertEqual(variants['small']['width'], 96)
+        self.assertEqual(variants['medium']['width'], 240)
+
+    def test_processing_scheduled_on_commit(self):
+        """Тест постановки задачи в очередь после сохранения поста"""
+        with patch('blog.tasks.process_post_image.delay') as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post.image = SimpleUploadedFile('other.jpg', make_image((50, 50)), content_type='image/jpeg')
+                self.post.save()
+        mock_delay.assert_called_once_with(self.post.pk)
+
+
+class BlurhashTest(TestCase):
+    """Тесты кодирования blurhash"""
+
+    def test_blurhash_length_and_color(self):
+        """Тест длины blurhash и среднего цвета однотонного изображения"""
+        blurhash, color = blurhash_encode(Image.new('RGB', (64, 48), (255, 0, 0)))
+        self.assertEqual(len(blurhash), 4 + 2 * (4 * 3 - 1) + 2)
+        self.assertEqual(color, '#ff0000')
@@ -0,0 +1,95 @@
+"""
+Тесты live-потока комментариев поста
+"""
+
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from blog.live import comment_payload, post_group
+from blog.models import Comment, Post, SiteSettings
+from blog.routing import websocket_urlpatterns
+
+IN_MEMORY_LAYER = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class CommentBroadcastTest(TestCase):
+    """Тесты рассылки новых комментариев читателям поста"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)  # SiteSettings.load() кэширует настройки: moderate_comments не переживает тест
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(title='Пост', content='Текст', author=self.user, status='published')
+        self.client.force_login(self.user)
+
+    def create(self, url, text):
+        with patch('blog.live.group_send') as send, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'text': text})
+        return send
+
+    def test_comment_is_broadcast(self):
+        """Тест: опубликованный комментарий рассылается в группу post_<pk> с готовым HTML"""
+        send = self.create(reverse('comment_create', kwargs={'post_pk': self.post.pk}), 'Первый!')
+        group, event = send.call_args[0]
+        self.assertEqual(group, f'post_{self.post.pk}')
+        self.assertEqual(event['type'], 'comment_created')
+        self.assertIsNone(event['comment']['parent'])
+        self.assertIn('Первый!', event['comment']['html'])
+        self.assertIn(f'id="comment{event["comment"]["id"]}"', event['comment']['html'])
+
+    def test_reply_is_broadcast(self):
+        """Тест: ответ рассылается с id родителя и фрагментом ответа"""
+        parent = Comment.objects.create(post=self.post, author=self.user, text='Вопрос')
+        send = self.create(reverse('reply_create', kwargs={'comment_pk': parent.pk}), 'Ответ')
+        comment = send.call_args[0][1]['comment']
+        self.assertEqual(comment['parent'], parent.pk)
+        self.assertIn('Ответ', comment['html'])
+
+    def test_payload_renders_without_queries(self):
+        """Тест: фрагмент нового комментария рендерится без запросов к БД"""
+        comment = Comment.objects.select_related('author').get(pk=Comment.objects.create(post=self.post, author=self.user, text='Быстро').pk)
+        with self.assertNumQueries(0):
+            payload = comment_payload(comment)
+        self.assertIn('Быстро', payload['html'])
+
+    def test_pending_comment_is_not_broadcast(self):
+        """Тест: комментарий на модерации не рассылается"""
+        settings = SiteSettings.load()
+        settings.moderate_comments = True
+        settings.save()
+        send = self.create(reverse('comment_create', kwargs={'post_pk': self.post.pk}), 'Скрытый')
+        send.assert_not_called()
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class PostCommentsConsumerTest(TransactionTestCase):
+    """Тесты WebSocket потребителя потока комментариев"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='writer', password='testpass123')
+        self.post = Post.objects.create(title='Пост', content='Текст', author=user, status='published')
+        self.draft = Post.objects.create(title='Черновик', content='Текст', author=user)
+
+    def test_readers_receive_new_comments(self):
+        """Тест: подписчик группы получает событие нового комментария"""
+        async def scenario():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/posts/{self.post.pk}/comments/')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await get_channel_layer().group_send(post_group(self.post.pk), {'type': 'comment_created', 'comment': {'id': 1}})
+            message = await communicator.receive_json_from()
+            self.assertEqual(message, {'type': 'new_comment', 'comment': {'id': 1}})
+            await communicator.disconnect()
+
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/posts/{self.draft.pk}/comments/')
+            connected, _ = await communicator.connect()
+            self.assertFalse(connected)  # Черновики не транслируются
+        async_to_sync(scenario)()
@@ -2,16 +2,19 @@
 Тесты для моделей блога
 """
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
 from datetime import datetime, timedelta
+from unittest.mock import patch
 import tempfile
 import os
 
 from blog.models import Post, Comment, Category, UserProfile, Notification, SiteSettings
+from blog.slugs import allocate_slug
 
 
 class CategoryModelTest(TestCase):
@@ -49,6 +52,26 @@ class CategoryModelTest(TestCase):
         with self.assertRaises(Exception):
             Category.objects.create(name='Технологии')
 
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_category_counts_cache(self):
+        """Тест: список категорий с числом постов кэшируется и сбрасывается при изменениях"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user(username='writer', password='testpass123')
+        self.assertEqual([c.post_count for c in Category.with_post_counts()], [0])
+        with self.assertNumQueries(0):
+            Category.with_post_counts()
+        post = Post.objects.create(title='Пост', content='Текст', author=user, category=self.category)
+        self.assertEqual([c.post_count for c in Category.with_post_counts()], [1])
+        post.views = 10
+        post.save()  # Категория не менялась - кэш остается
+        with self.assertNumQueries(0):
+            Category.with_post_counts()
+        Category.objects.create(name='Наука')
+        self.assertEqual([(c.name, c.post_count) for c in Category.with_post_counts()], [('Наука', 0), ('Технологии', 1)])
+        post.delete()
+        self.assertEqual([c.post_count for c in Category.with_post_counts()], [0, 0])
+
 
 class PostModelTest(TestCase):
     """Тесты для модели Post"""
@@ -300,7 +323,98 @@ class UserProfileModelTest(TestCase):
         profile.save()
         
         self.assertFalse(profile.is_currently_banned())
-        self.assertFalse(profile.is_banned)  # Должен автоматически сброситься
+        self.assertTrue(profile.is_banned)  # Проверка ничего не пишет в БД
+
+        # Флаг сбрасывает периодическая задача
+        UserProfile.expire_bans()
+        profile.refresh_from_db()
+        self.assertFalse(profile.is_banned)
+
+
+class UserBanTest(TestCase):
+    """Тесты массовой блокировки пользователей"""
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f'ban{i}', password='testpass123') for i in range(3)]
+        self.ids = [user.pk for user in self.users]
+
+    def test_ban_and_unban_bulk(self):
+        """Тест блокировки и разблокировки одним UPDATE"""
+        with self.assertNumQueries(1):
+            self.assertEqual(UserProfile.ban_users(self.ids, reason='Спам'), 3)
+        self.assertEqual(UserProfile.objects.filter(is_banned=True, ban_reason='Спам').count(), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(UserProfile.unban_users(self.ids), 3)
+        self.assertFalse(UserProfile.objects.filter(is_banned=True).exists())
+
+    def test_ban_creates_missing_profile(self):
+        """Тест блокировки пользователя без профиля"""
+        UserProfile.objects.filter(user=self.users[0]).delete()
+        UserProfile.ban_users(self.ids)
+        self.assertTrue(UserProfile.objects.get(user=self.users[0]).is_banned)
+
+    def test_expire_bans(self):
+        """Тест снятия только истекших блокировок"""
+        UserProfile.ban_users(self.ids[:1], expires=timezone.now() - timedelta(minutes=1))
+        UserProfile.ban_users(self.ids[1:2], expires=timezone.now() + timedelta(days=1))
+        UserProfile.ban_users(self.ids[2:])
+        self.assertEqual(UserProfile.expire_bans(), 1)
+        banned = set(UserProfile.objects.filter(is_banned=True).values_list('user_id', flat=True))
+        self.assertEqual(banned, set(self.ids[1:]))
+
+
+class PostSlugTest(TestCase):
+    """Тесты выделения уникальных slug"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sluguser', password='testpass123')
+
+    def create_post(self, title='Hello world', **kwargs):
+        return Post.objects.create(title=title, content='Текст', author=self.user, **kwargs)
+
+    def test_duplicate_titles_get_suffixes(self):
+        """Тест суффиксов для одинаковых заголовков"""
+        slugs = [self.create_post().slug for _ in range(3)]
+        self.assertEqual(slugs, ['hello-world', 'hello-world-1', 'hello-world-2'])
+        self.assertEqual(self.create_post('Hello world again').slug, 'hello-world-again')
+
+    def test_allocation_single_query(self):
+        """Тест что свободный slug находится одним запросом при любом числе занятых"""
+        for number in range(10):
+            self.create_post(slug=f'hello-world-{number}' if number else 'hello-world')
+        self.create_post(slug='hello-world-other')
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug(Post.objects.all(), 'hello-world'), 'hello-world-10')
+
+    def test_long_number_is_not_suffix(self):
+        """Тест что число длиннее BIGINT в конце slug не считается суффиксом"""
+        self.create_post(slug='hello-world')
+        self.create_post(slug='hello-world-' + '9' * 25)
+        self.assertEqual(allocate_slug(Post.objects.all(), 'hello-world'), 'hello-world-1')
+
+    def test_long_title_leaves_room_for_suffix(self):
+        """Тест что длинный заголовок не превышает длину поля вместе с суффиксом"""
+        first, second = self.create_post('a' * 200), self.create_post('a' * 200)
+        self.assertLessEqual(len(second.slug), 200)
+        self.assertEqual(second.slug, f'{first.slug}-1')
+
+    def test_retry_on_integrity_error(self):
+        """Тест повторной попытки, если slug заняли параллельно"""
+        self.create_post()
+        with patch('blog.models.allocate_slug', side_effect=['hello-world', 'hello-world-1']):
+            post = self.create_post()
+        self.assertEqual(post.slug, 'hello-world-1')
+
+    def test_bulk_create_with_slugs(self):
+        """Тест назначения slug при массовом создании"""
+        self.create_post()
+        posts = [Post(title='Hello world', content='Текст ' * 100, author=self.user, status='published') for _ in range(3)]
+        posts.append(Post(title='Hello world', slug='hello-world-7', content='Текст', author=self.user))
+        with self.assertNumQueries(4):  # Выделение slug, savepoint, INSERT, освобождение savepoint
+            Post.bulk_create_with_slugs(posts)
+        self.assertEqual([post.slug for post in posts], ['hello-world-8', 'hello-world-9', 'hello-world-10', 'hello-world-7'])
+        self.assertTrue(all(post.excerpt and post.published_date for post in posts[:3]))
+        self.assertEqual(Post.objects.count(), 5)
 
 
 class NotificationModelTest(TestCase):
@@ -450,7 +564,8 @@ class PostImageFieldTest(TestCase):
         )
         
         self.assertTrue(post.image)
-        self.assertIn('posts/', post.image.name)
+        self.assertRegex(post.image.name, r'^(posts|blobs)/')  # upload_to или блоб ContentAddressedStorage
+        self.assertTrue(post.image.storage.exists(post.image.name))
     
     def test_post_without_image(self):
         """Тест поста без изображения"""
@@ -0,0 +1,96 @@
+"""
+Тесты очереди модерации комментариев
+"""
+
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+
+from blog.models import Comment, Notification, Post, SiteSettings
+from blog.tasks import notify_approved_comments
+from blog.views import pending_comments_page
+
+
+class CommentModerationTest(TestCase):
+    """Тесты удержания, одобрения и отклонения комментариев"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)  # SiteSettings.load() кэширует настройки: moderate_comments не переживает тест
+        settings = SiteSettings.load()
+        settings.moderate_comments = True
+        settings.save()
+        self.author = User.objects.create_user(username='postauthor', password='testpass123')
+        self.commenter = User.objects.create_user(username='commenter', password='testpass123')
+        self.staff = User.objects.create_user(username='moderator', password='testpass123', is_staff=True)
+        self.post = Post.objects.create(title='Пост', content='Текст', author=self.author, status='published')
+
+    def create_pending(self, count):
+        comments = []
+        for number in range(count):
+            comment = Comment(post=self.post, author=self.commenter, text=f'Комментарий {number}')
+            comment.hold_for_moderation(self.commenter)
+            comment.save()
+            comments.append(comment)
+        return comments
+
+    def test_comment_held_when_moderation_enabled(self):
+        """Тест что новый комментарий скрыт и не создает уведомление до одобрения"""
+        self.client.login(username='commenter', password='testpass123')
+        self.client.post(reverse('comment_create', kwargs={'post_pk': self.post.pk}), {'text': 'Жду модерации'})
+        comment = Comment.objects.get()
+        self.assertEqual((comment.status, comment.is_active), ('pending', False))
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(self.post.comment_count(), 0)
+
+    def test_staff_and_disabled_moderation_publish_immediately(self):
+        """Тест что staff и выключенная модерация публикуют сразу"""
+        self.assertEqual(Comment.initial_state(self.staff)['status'], 'approved')
+        settings = SiteSettings.load()
+        settings.moderate_comments = False
+        settings.save()
+        self.assertEqual(Comment.initial_state(self.commenter), {'status': 'approved', 'is_active': True})
+
+    def test_bulk_approve_and_reject(self):
+        """Тест массового одобрения и отклонения"""
+        first, second, third = self.create_pending(3)
+        with patch('blog.tasks.notify_approved_comments.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(Comment.approve([first.pk, second.pk]), 2)
+        delay.assert_called_once_with([first.pk, second.pk])
+        self.assertEqual(Comment.approve([first.pk]), 0)  # Повторное одобрение ничего не меняет
+        with self.assertNumQueries(1):
+            self.assertEqual(Comment.reject([third.pk]), 1)
+        statuses = dict(Comment.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {first.pk: 'approved', second.pk: 'approved', third.pk: 'rejected'})
+        self.assertEqual(self.post.comment_count(), 2)
+
+    def test_notify_approved_comments(self):
+        """Тест уведомлений авторам комментария и поста после одобрения"""
+        comments = self.create_pending(2)
+        Comment.approve([comment.pk for comment in comments])
+        with self.assertNumQueries(2):  # Выборка комментариев и один INSERT
+            self.assertEqual(notify_approved_comments([comment.pk for comment in comments]), 4)
+        self.assertEqual(Notification.objects.filter(user=self.commenter, notification_type='system').count(), 2)
+        self.assertEqual(Notification.objects.filter(user=self.author, notification_type='comment').count(), 2)
+
+    def test_queue_keyset_pagination(self):
+        """Тест постраничной выборки очереди по id"""
+        comments = self.create_pending(5)
+        page, next_after = pending_comments_page(limit=2)
+        self.assertEqual([comment.pk for comment in page], [comments[0].pk, comments[1].pk])
+        page, next_after = pending_comments_page(next_after, limit=2)
+        self.assertEqual([comment.pk for comment in page], [comments[2].pk, comments[3].pk])
+        page, next_after = pending_comments_page(next_after, limit=2)
+        self.assertEqual(([comment.pk for comment in page], next_after), ([comments[4].pk], None))
+
+    def test_moderation_view_applies_action(self):
+        """Тест массового действия из очереди модерации"""
+        comments = self.create_pending(2)
+        self.client.login(username='moderator', password='testpass123')
+        response = self.client.post(reverse('comment_moderation'), {'action': 'reject', 'comment_ids': [comment.pk for comment in comments]})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Comment.objects.filter(status='pending').exists())
@@ -0,0 +1,117 @@
+"""
+Тесты хранения, архивации и объединения уведомлений
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Notification, NotificationArchive, Post
+from blog.notifications import PUSH_INTERVAL, flush_pending, notify_like
+from blog.tasks import archive_notifications
+
+
+class NotificationRetentionTest(TestCase):
+    """Тесты переноса старых прочитанных уведомлений в архив"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        self.now = timezone.now()
+
+    def notify(self, days_ago, is_read=True, title='Уведомление'):
+        return Notification.objects.create(
+            user=self.user, notification_type='system', title=title, message='Текст',
+            is_read=is_read, created_date=self.now - timedelta(days=days_ago),
+        )
+
+    def test_archive_read_moves_only_old_read(self):
+        """Тест: архивируются только прочитанные уведомления старше порога"""
+        old = [self.notify(40 + day) for day in range(5)]
+        unread = self.notify(60, is_read=False)
+        recent = self.notify(1)
+        moved = Notification.archive_read(self.now - timedelta(days=30), batch_size=2)
+        self.assertEqual(moved, 5)
+        self.assertEqual(set(Notification.objects.values_list('pk', flat=True)), {unread.pk, recent.pk})
+        archived = NotificationArchive.objects.get(pk=old[0].pk)
+        self.assertEqual((archived.user_id, archived.title, archived.created_date), (self.user.pk, 'Уведомление', old[0].created_date))
+
+    def test_archive_read_can_delete(self):
+        """Тест удаления без архива"""
+        self.notify(40)
+        self.assertEqual(Notification.archive_read(self.now - timedelta(days=30), archive=False), 1)
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(NotificationArchive.objects.exists())
+
+    def test_task_archives_and_purges(self):
+        """Тест периодической задачи: архивация и очистка устаревшего архива"""
+        self.notify(40)
+        NotificationArchive.objects.create(id=999, user=self.user, notification_type='system', title='Старое', message='', created_date=self.now - timedelta(days=400))
+        self.assertEqual(archive_notifications(), (1, 1))  # По умолчанию: 30 дней до архива, 365 дней хранения
+        self.assertEqual(list(NotificationArchive.objects.values_list('title', flat=True)), ['Уведомление'])
+
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'notifications'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class NotificationCoalescingTest(TestCase):
+    """Тесты объединения уведомлений о лайках и ограничения частоты push-сообщений"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='testpass123')
+        self.fans = [User.objects.create_user(username=name, password='testpass123') for name in ('alice', 'bob', 'carol')]
+        self.post = Post.objects.create(title='Вирусный', content='Текст', author=self.author, status='published')
+
+    def test_likes_coalesce_into_one_row(self):
+        """Тест: лайки одного поста за окно - одна строка со счетчиком"""
+        with patch('blog.notifications.push_notification'):
+            for fan in self.fans:
+                notify_like(fan, self.post)
+            notify_like(self.fans[0], self.post)  # Повторный лайк после отмены
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.recent_actors, ['carol', 'bob', 'alice'])
+        self.assertEqual(notification.message, 'carol and 2 others liked your post "Вирусный"')
+
+    def test_new_row_after_read_or_window(self):
+        """Тест: прочитанное или старое уведомление не объединяется"""
+        with patch('blog.notifications.push_notification'):
+            first = notify_like(self.fans[0], self.post)
+            Notification.objects.filter(pk=first.pk).update(is_read=True)
+            second = notify_like(self.fans[1], self.post)
+            Notification.objects.filter(pk=second.pk).update(created_date=timezone.now() - timedelta(hours=2))
+            notify_like(self.fans[2], self.post)
+            self.assertIsNone(notify_like(self.author, self.post))  # Свой лайк
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(Notification.describe_actors(['bob', 'alice'], 2), 'bob and alice')
+
+    def test_push_is_rate_limited(self):
+        """Тест: одно сообщение сразу, остальные одним отложенным сообщением"""
+        with patch('blog.notifications.send_to_user') as send, \
+                patch('blog.tasks.flush_notifications.apply_async') as schedule, \
+                self.captureOnCommitCallbacks(execute=True):
+            for fan in self.fans:
+                notify_like(fan, self.post)
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(send.call_args[0][1]['type'], 'send_notification')
+        schedule.assert_called_once_with((self.author.pk,), countdown=PUSH_INTERVAL)
+
+        with patch('blog.notifications.send_to_user') as send:
+            flush_pending(self.author.pk)
+        event = send.call_args[0][1]
+        self.assertEqual(event['type'], 'send_notifications')
+        self.assertEqual(event['notifications'][0]['actor_count'], 3)
+
+    def test_like_view_notifies_author(self):
+        """Тест: лайк через AJAX обработчик создает уведомление автору"""
+        self.client.force_login(self.fans[0])
+        with patch('blog.notifications.push_notification'):
+            self.client.post(reverse('post_like', kwargs={'pk': self.post.pk}))
+        self.assertEqual(Notification.objects.get().user, self.author)
@@ -0,0 +1,66 @@
+"""
+Тесты отложенной публикации постов
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog import publishing
+from blog.forms import PostForm
+from blog.models import AuthorStats, Notification, Post, Tag
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ScheduledPublishingTest(TestCase):
+    """Тесты таймеров и пакетной публикации запланированных постов"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', password='testpass123')
+
+    def schedule(self, title, publish_at, **kwargs):
+        return Post.objects.create(title=title, content='Текст', author=self.user, status='scheduled', publish_at=publish_at, **kwargs)
+
+    def test_publish_due_in_one_batch(self):
+        """Тест: наступившие посты публикуются на запланированное время, счетчики и уведомления обновляются"""
+        now = timezone.now()
+        with patch('blog.tasks.publish_scheduled_posts.apply_async'):
+            due = self.schedule('Пора', now + timedelta(seconds=30), tags='python')
+            later = self.schedule('Позже', now + timedelta(days=1))
+        self.assertFalse(Post.objects.filter(status='published').exists())
+
+        with patch('blog.tasks.update_related_posts.delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(publishing.publish_due(now + timedelta(minutes=1)), 1)
+        due.refresh_from_db()
+        self.assertEqual((due.status, due.published_date), ('published', due.publish_at))
+        self.assertEqual(Post.objects.get(pk=later.pk).status, 'scheduled')
+        self.assertEqual(Tag.objects.get(slug='python').post_count, 1)
+        self.assertEqual(AuthorStats.for_user(self.user.pk).posts_published, 1)
+        delay.assert_called_once_with(due.pk)
+        self.assertTrue(Notification.objects.filter(user=self.user, related_post=due).exists())
+        self.assertEqual(publishing.publish_due(now + timedelta(minutes=1)), 0)
+
+    def test_timers_armed_before_due(self):
+        """Тест: таймер взводится один на секунду и только для сроков до следующего обхода"""
+        soon = timezone.now() + timedelta(seconds=10)
+        with patch('blog.tasks.publish_scheduled_posts.apply_async') as apply_async, self.captureOnCommitCallbacks(execute=True):
+            self.schedule('Первый', soon.replace(microsecond=100))
+            self.schedule('Второй', soon.replace(microsecond=900))
+            self.schedule('Через неделю', soon + timedelta(days=7))
+        apply_async.assert_called_once_with(eta=soon.replace(microsecond=0) + timedelta(seconds=1))
+
+    def test_schedule_requires_future_time(self):
+        """Тест: запланировать пост можно только на время в будущем"""
+        data = {'title': 'Пост', 'content': 'Текст', 'status': 'scheduled'}
+        self.assertFalse(PostForm(data=data).is_valid())
+        past = timezone.localtime(timezone.now() - timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')
+        self.assertFalse(PostForm(data={**data, 'publish_at': past}).is_valid())
+        future = timezone.localtime(timezone.now() + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')
+        self.assertTrue(PostForm(data={**data, 'publish_at': future}).is_valid())
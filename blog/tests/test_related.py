@@ -0,0 +1,92 @@
+"""
+Тесты расчета похожих постов
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog.models import Category, Post, RelatedPost
+from blog.related import Corpus, rebuild_related_posts, update_related_posts
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RelatedPostsTest(TestCase):
+    """Тесты оценки сходства, полной пересборки и инкрементального обновления"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', password='testpass123')
+        self.category = Category.objects.create(name='Python')
+        self.django = self.create('Django ORM и запросы', 'python, django', category=self.category)
+        self.orm = self.create('Оптимизация запросов ORM', 'django')
+        self.asyncio = self.create('Асинхронный Python', 'python, asyncio', category=self.category)
+        self.cooking = self.create('Рецепт борща', 'кухня')
+
+    def create(self, title, tags, **kwargs):
+        return Post.objects.create(title=title, content=title, tags=tags, author=self.user, status='published', **kwargs)
+
+    def related_ids(self, post):
+        return list(RelatedPost.objects.filter(post=post).values_list('related_id', flat=True))
+
+    def test_scores_combine_text_tags_and_category(self):
+        """Тест: общие слова и теги дают более высокую оценку, посты без общего не кандидаты"""
+        scores = Corpus.load().scores(self.django.pk)
+        self.assertGreater(scores[self.orm.pk], scores[self.asyncio.pk])
+        self.assertNotIn(self.cooking.pk, scores)
+        self.assertNotIn(self.django.pk, scores)
+        self.assertAlmostEqual(scores[self.asyncio.pk], Corpus.load().scores(self.asyncio.pk)[self.django.pk])
+
+    def test_rebuild(self):
+        """Тест: полная пересборка сохраняет упорядоченные списки опубликованных постов"""
+        self.assertEqual(rebuild_related_posts(), 4)
+        self.assertEqual(self.related_ids(self.django), [self.orm.pk, self.asyncio.pk])
+        self.assertEqual(self.related_ids(self.cooking), [])
+
+    def test_incremental_update(self):
+        """Тест: новый пост попадает в списки похожих, снятый с публикации - исчезает из них"""
+        rebuild_related_posts()
+        post = self.create('Асинхронный Django ORM', 'python, django, asyncio', category=self.category)
+        update_related_posts(post.pk)
+        self.assertIn(post.pk, self.related_ids(self.asyncio))
+        self.assertEqual(self.related_ids(post)[0], self.django.pk)
+
+        Post.objects.filter(pk=post.pk).update(status='draft')
+        update_related_posts(post.pk)
+        self.assertNotIn(post.pk, self.related_ids(self.asyncio))
+        self.assertEqual(self.related_ids(post), [])
+
+    def test_incremental_update_reads_only_neighbours(self):
+        """Тест: пересчет после пересборки читает только посты с общими словами и тегами, списки совпадают с полным расчетом"""
+        rebuild_related_posts()
+        post = self.create('Асинхронный Django ORM', 'python, django, asyncio', category=self.category)
+        loaded = []
+        original = Corpus.__init__
+
+        def record(corpus, rows, tags, stats=None):
+            rows = list(rows)
+            loaded.extend(pk for pk, *_ in rows)
+            original(corpus, rows, tags, stats)
+
+        with patch.object(Corpus, 'load', side_effect=AssertionError('полный корпус')), patch.object(Corpus, '__init__', record):
+            update_related_posts(post.pk)
+        self.assertNotIn(self.cooking.pk, loaded)
+        incremental = {pk: self.related_ids(pk) for pk in Post.objects.values_list('pk', flat=True)}
+        rebuild_related_posts()
+        self.assertEqual(incremental, {pk: self.related_ids(pk) for pk in Post.objects.values_list('pk', flat=True)})
+
+    def test_update_is_scheduled_only_for_relevant_changes(self):
+        """Тест: просмотр поста не ставит пересчет, изменение заголовка ставит"""
+        with patch('blog.tasks.update_related_posts.delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.get(pk=self.django.pk)
+            post.views += 1
+            post.save()
+        delay.assert_not_called()
+        with patch('blog.tasks.update_related_posts.delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            post.title = 'Django ORM подробно'
+            post.save()
+        delay.assert_called_once_with(post.pk)
@@ -0,0 +1,82 @@
+"""
+Тесты рендеринга содержимого постов
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils.html import linebreaks
+
+from blog.models import Post
+from blog.rendering import render_content
+from blog.tasks import render_post_content
+
+
+class RenderContentTest(TestCase):
+    """Тесты HTML, оглавления и времени чтения"""
+
+    def test_plain_text_matches_linebreaks(self):
+        """Тест: текст без заголовков выводится как раньше фильтром linebreaks, HTML экранируется"""
+        text = 'Первый абзац\nс переносом\n\n<script>alert(1)</script>'
+        result = render_content(text)
+        self.assertEqual(result['html'], linebreaks(text, autoescape=True))
+        self.assertNotIn('<script>', result['html'])
+        self.assertEqual(result['toc'], [])
+
+    def test_headings_and_toc(self):
+        """Тест: заголовки получают уникальные якоря и попадают в оглавление"""
+        result = render_content('# Введение\nТекст\n## Детали <b>\nЕще\n# Введение')
+        self.assertEqual([item['anchor'] for item in result['toc']], ['введение', 'детали-b', 'введение-2'])
+        self.assertEqual([item['level'] for item in result['toc']], [2, 3, 2])
+        self.assertIn('<h3 id="детали-b">Детали &lt;b&gt;</h3>', result['html'])
+        self.assertIn('<p>Текст</p>', result['html'])
+
+    def test_reading_metadata(self):
+        """Тест: число слов и время чтения с округлением вверх"""
+        result = render_content(' '.join(['слово'] * 201))
+        self.assertEqual((result['word_count'], result['reading_time']), (201, 2))
+        self.assertEqual(render_content('')['reading_time'], 0)
+
+
+class PostRenderingTest(TestCase):
+    """Тесты рендеринга при сохранении и в Celery задаче"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', password='testpass123')
+
+    def test_rendered_on_save_only_when_content_changes(self):
+        """Тест: HTML строится при сохранении и перестраивается только после изменения текста"""
+        post = Post.objects.create(title='Пост', content='# Глава\nТекст', author=self.user)
+        self.assertEqual(post.toc[0]['title'], 'Глава')
+        self.assertFalse(post.render())
+        post.content = 'Новый текст'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual((post.content_html, post.toc, post.word_count), ('<p>Новый текст</p>', [], 2))
+
+    @patch('blog.models.RENDER_INLINE_MAX_LENGTH', 10)
+    def test_large_post_rendered_by_task(self):
+        """Тест: крупный пост рендерится задачей, до нее HTML строится на лету"""
+        with patch('blog.tasks.render_post_content.delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='Длинный', content='Очень длинный текст', author=self.user)
+        delay.assert_called_once_with([post.pk])
+        post.refresh_from_db()
+        self.assertEqual((post.content_html, post.rendered_hash), ('', ''))
+        self.assertEqual(post.rendered['html'], '<p>Очень длинный текст</p>')
+
+        self.assertEqual(render_post_content([post.pk]), 1)
+        post = Post.objects.get(pk=post.pk)
+        self.assertEqual(post.content_html, '<p>Очень длинный текст</p>')
+        self.assertEqual(post.rendered['word_count'], 3)
+
+    @patch('blog.models.RENDER_INLINE_MAX_LENGTH', 10)
+    def test_bulk_create_schedules_large_posts(self):
+        """Тест: массовое создание рендерит небольшие посты сразу, крупные ставит в задачу"""
+        with patch('blog.tasks.render_post_content.delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            short, long = Post.bulk_create_with_slugs([
+                Post(title='Короткий', content='Текст', author=self.user),
+                Post(title='Длинный', content='Очень длинный текст', author=self.user),
+            ])
+        self.assertEqual(Post.objects.get(pk=short.pk).content_html, '<p>Текст</p>')
+        delay.assert_called_once_with([long.pk])
@@ -0,0 +1,78 @@
+"""
+Тесты истории правок постов
+"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from blog.models import Post, PostRevision
+from blog.revisions import apply_delta, make_delta, pack
+
+
+class DeltaTest(TestCase):
+    """Тесты построчных дельт"""
+
+    def test_delta_roundtrip_and_size(self):
+        """Тест: дельта восстанавливает текст и не содержит неизмененных строк"""
+        old = ''.join(f'Строка номер {number}\n' for number in range(200))
+        new = old.replace('Строка номер 100\n', 'Исправленная строка\n') + 'Хвост без перевода строки'
+        delta = make_delta(old, new)
+        self.assertEqual(apply_delta(old, delta), new)
+        self.assertEqual([op for op in delta if isinstance(op, str)], ['Исправленная строка\n', 'Хвост без перевода строки'])
+        self.assertLess(len(pack(delta)), len(pack(new)) / 4)
+
+
+class PostRevisionTest(TestCase):
+    """Тесты записи и восстановления ревизий"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', password='testpass123')
+        self.editor = User.objects.create_user(username='editor', password='testpass123', is_staff=True)
+        self.post = Post.objects.create(title='Пост', content=self.text(0), author=self.user)
+
+    def text(self, version):
+        return ''.join(f'Абзац {number}, версия {version if number == version % 30 else 0}\n' for number in range(30))
+
+    def edit(self, version, **kwargs):
+        post = Post.objects.get(pk=self.post.pk)
+        post.content = self.text(version)
+        for field, value in kwargs.items():
+            setattr(post, field, value)
+        post.save()
+
+    def test_versions_are_reconstructed(self):
+        """Тест: любая версия восстанавливается, снимки пишутся раз в SNAPSHOT_INTERVAL ревизий"""
+        for version in range(1, 45):
+            self.edit(version)
+        revisions = {revision.number: revision for revision in PostRevision.objects.filter(post=self.post)}
+        self.assertEqual(len(revisions), 45)
+        self.assertEqual([number for number, revision in sorted(revisions.items()) if revision.is_snapshot], [1, 21, 41])
+        for number in (1, 20, 21, 37, 45):
+            self.assertEqual(revisions[number].content(), self.text(number - 1))
+        with self.assertNumQueries(1):
+            revisions[40].content()  # Снимок и 19 дельт одним запросом
+
+    def test_unrelated_save_and_editor(self):
+        """Тест: сохранение без изменения текста и заголовка не пишет ревизию, редактор запоминается"""
+        post = Post.objects.get(pk=self.post.pk)
+        post.status = 'published'
+        post.save()
+        self.assertEqual(PostRevision.objects.filter(post=self.post).count(), 1)
+        post.title = 'Новый заголовок'
+        post.edited_by = self.editor
+        post.save()
+        revision = PostRevision.objects.get(post=self.post, number=2)
+        self.assertEqual((revision.title, revision.editor, revision.content()), ('Новый заголовок', self.editor, self.text(0)))
+
+    def test_history_starts_from_untracked_version(self):
+        """Тест: у поста без истории сохраняется прежняя версия, расхождение с историей дает снимок"""
+        PostRevision.objects.filter(post=self.post).delete()
+        self.edit(1)
+        first, second = PostRevision.objects.filter(post=self.post).order_by('number')
+        self.assertEqual((first.content(), second.content(), second.is_snapshot), (self.text(0), self.text(1), False))
+
+        Post.objects.filter(pk=self.post.pk).update(content='Изменено мимо save()')
+        self.edit(2)
+        third = PostRevision.objects.get(post=self.post, number=3)
+        self.assertTrue(third.is_snapshot)
+        self.assertEqual(third.content(), self.text(2))
@@ -0,0 +1,53 @@
+"""
+Тесты ограниченного поиска по постам и пользователям
+"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from blog.models import Comment, Post
+from blog.paginators import CappedCountPaginator
+from blog.search import paginate, search_posts, search_users
+
+
+class SearchTest(TestCase):
+    """Тесты выборок и постраничного вывода поиска"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='pythonista', email='secret@python.org', password='testpass123')
+        self.post = Post.objects.create(title='Python и Django', content='Текст', author=self.author, status='published', tags='python, django')
+        Post.objects.create(title='Черновик про Python', content='Текст', author=self.author)
+        Comment.objects.create(post=self.post, author=self.author, text='Первый')
+        Comment.objects.create(post=self.post, author=self.author, text='Скрытый', is_active=False)
+
+    def test_posts_match_text_tag_and_author(self):
+        """Тест: пост находится по тексту, тегу и имени автора, без дублей и черновиков"""
+        for query in ['Django', 'python', 'pythonista']:
+            self.assertEqual(list(search_posts(query)), [self.post])
+
+    def test_comment_total_is_annotated(self):
+        """Тест: число активных комментариев считается в том же запросе"""
+        with self.assertNumQueries(1):
+            self.assertEqual([post.comment_total for post in search_posts('Django')], [1])
+
+    def test_users_match_username_prefix_only(self):
+        """Тест: пользователи ищутся по префиксу имени, email не участвует в поиске"""
+        self.assertEqual(list(search_users('python')), [self.author])
+        self.assertEqual(list(search_users('secret')), [])
+        self.assertEqual(list(search_users('ista')), [])
+
+    def test_pages_are_bounded(self):
+        """Тест: страница читает не больше page_size строк, номер вне диапазона дает последнюю страницу"""
+        User.objects.bulk_create([User(username=f'python{i:02d}') for i in range(25)])
+        page = paginate(search_users('python'), 99)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 6)
+        self.assertEqual(page.paginator.count, 26)
+
+    def test_count_is_capped(self):
+        """Тест: подсчет останавливается на count_limit + 1"""
+        User.objects.bulk_create([User(username=f'python{i:02d}') for i in range(5)])
+        paginator = CappedCountPaginator(search_users('python'), 2, count_limit=3)
+        self.assertEqual(paginator.count, 4)
+        self.assertTrue(paginator.count_is_capped)
+        self.assertFalse(CappedCountPaginator(search_users('python'), 2, count_limit=10).count_is_capped)
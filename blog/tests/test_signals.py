@@ -125,6 +125,38 @@ class UserProfileSignalsTest(TestCase):
         mock_create.assert_called_once()
 
 
+class UserProfileWritesTest(TestCase):
+    """Тесты отсутствия лишних записей профиля при сохранении пользователя"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='writes', password='testpass123')
+
+    def test_last_login_update_skips_profile(self):
+        """Тест что обновление last_login не обращается к профилю"""
+        from django.contrib.auth.models import update_last_login
+        with self.assertNumQueries(1):  # Только UPDATE auth_user
+            update_last_login(None, self.user)
+
+    def test_full_save_does_not_write_profile(self):
+        """Тест что сохранение пользователя не пересохраняет профиль"""
+        updated_at = self.user.profile.updated_at
+        self.user.first_name = 'Имя'
+        with self.assertNumQueries(1):  # Профиль уже загружен - только UPDATE auth_user
+            self.user.save()
+        self.assertEqual(UserProfile.objects.get(user=self.user).updated_at, updated_at)
+
+    def test_backfill_command(self):
+        """Тест создания недостающих профилей командой"""
+        from io import StringIO
+        from django.core.management import call_command
+        UserProfile.objects.filter(user=self.user).delete()
+        User.objects.create_user(username='with_profile', password='testpass123')  # Профиль уже есть - не считается
+        out = StringIO()
+        call_command('backfill_profiles', stdout=out)
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+        self.assertIn('Создано профилей: 1', out.getvalue())
+
+
 class NotificationSignalsTest(TestCase):
     """Тесты сигналов уведомлений"""
     
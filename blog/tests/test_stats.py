@@ -0,0 +1,103 @@
+"""
+Тесты счетчиков автора и страниц профиля
+"""
+
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from blog.models import AuthorStats, Comment, Post
+from blog.tasks import recount_author_stats
+
+
+class AuthorStatsTest(TestCase):
+    """Тесты инкрементального обновления AuthorStats"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='writer', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', password='testpass123')
+        self.post = Post.objects.create(title='Пост', content='Текст', author=self.author, status='published')
+
+    @contextmanager
+    def run_recount(self):
+        with patch('blog.tasks.notify_approved_comments.delay'), \
+                patch('blog.tasks.recount_author_stats.delay', side_effect=recount_author_stats), \
+                self.captureOnCommitCallbacks(execute=True):
+            yield
+
+    def stats(self, user):
+        stats = AuthorStats.for_user(user.pk)
+        return stats.posts_published, stats.comments_made, stats.likes_received
+
+    def assertMatchesRecount(self, *users):
+        expected = [self.stats(user) for user in users]
+        AuthorStats.recount(user.pk for user in users)
+        self.assertEqual([self.stats(user) for user in users], expected)
+
+    def test_posts_published(self):
+        """Тест: публикация, снятие с публикации и удаление меняют счетчик, просмотры - нет"""
+        draft = Post.objects.create(title='Черновик', content='Текст', author=self.author)
+        self.assertEqual(self.stats(self.author)[0], 1)
+        draft.status = 'published'
+        draft.save()
+        self.post.views += 1
+        self.post.save()
+        self.assertEqual(self.stats(self.author)[0], 2)
+        draft.delete()
+        self.assertEqual(self.stats(self.author)[0], 1)
+        self.assertMatchesRecount(self.author)
+
+    def test_comments_made(self):
+        """Тест: учитываются только видимые комментарии, включая массовое одобрение и отклонение"""
+        comment = Comment.objects.create(post=self.post, author=self.reader, text='Первый')
+        pending = Comment.objects.create(post=self.post, author=self.reader, text='Ждет', status='pending', is_active=False)
+        self.assertEqual(self.stats(self.reader)[1], 1)
+        with self.run_recount():  # Массовые изменения пересчитываются задачей после коммита
+            Comment.approve([pending.pk])
+        self.assertEqual(self.stats(self.reader)[1], 2)
+        with self.run_recount():
+            Comment.reject([comment.pk])
+        self.assertEqual(self.stats(self.reader)[1], 1)
+        self.assertMatchesRecount(self.reader)
+
+    def test_likes_received(self):
+        """Тест: лайки с обеих сторон связи и удаление поста меняют счетчик автора"""
+        self.post.likes.add(self.reader, self.author)
+        self.assertEqual(self.stats(self.author)[2], 2)
+        self.post.likes.remove(self.author)
+        self.reader.post_likes.clear()
+        self.assertEqual(self.stats(self.author)[2], 0)
+        self.reader.post_likes.add(self.post)
+        self.assertEqual(self.stats(self.author)[2], 1)
+        self.post.delete()
+        self.assertEqual(self.stats(self.author), (0, 0, 0))
+        self.assertMatchesRecount(self.author)
+
+    def test_user_can_be_deleted(self):
+        """Тест: удаление автора не создает заново его счетчики"""
+        Comment.objects.create(post=self.post, author=self.author, text='Свой')
+        self.author.delete()
+        self.assertFalse(AuthorStats.objects.filter(user_id=self.author.pk).exists())
+
+    def test_views_received(self):
+        """Тест: удаление поста вычитает его просмотры из счетчика автора"""
+        popular = Post.objects.create(title='Популярный', content='Текст', author=self.author, status='published')
+        Post.objects.filter(pk=popular.pk).update(views=3)
+        AuthorStats.adjust(self.author.pk, views_received=3)  # Как три открытия страницы поста
+        popular.refresh_from_db()
+        popular.delete()
+        self.assertEqual(AuthorStats.for_user(self.author.pk).views_received, 0)
+        AuthorStats.recount([self.author.pk])
+        self.assertEqual(AuthorStats.for_user(self.author.pk).views_received, 0)
+
+    def test_reconcile(self):
+        """Тест: ночная сверка исправляет расхождения и создает недостающие строки пакетами"""
+        Post.objects.filter(pk=self.post.pk).update(views=7)  # Мимо сигналов
+        AuthorStats.objects.update(posts_published=99)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        self.assertEqual(AuthorStats.reconcile(batch_size=1), 2)
+        self.assertEqual(self.stats(self.author), (1, 0, 0))
+        self.assertEqual(AuthorStats.for_user(self.author.pk).views_received, 7)
+        self.assertTrue(AuthorStats.objects.filter(user=self.reader).exists())
@@ -0,0 +1,114 @@
+"""
+Тесты хранилища медиа с адресацией по содержимому
+"""
+
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from blog.models import MediaBlob, Post
+from blog.storage import ContentAddressedStorage, is_blob
+
+
+class ContentAddressedStorageTest(TestCase):
+    """Тесты дедупликации файлов"""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location, base_url='/media/')
+
+    def tearDown(self):
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def test_same_content_stored_once(self):
+        """Тест что одинаковые файлы хранятся одним блобом"""
+        first = self.storage.save('posts/2024/01/01/a.JPG', ContentFile(b'same bytes'))
+        second = self.storage.save('avatars/b.jpg', ContentFile(b'same bytes'))
+        self.assertEqual(first, second)
+        self.assertTrue(is_blob(first))
+        self.assertTrue(first.endswith('.jpg'))
+        self.assertEqual(self.storage.open(first).read(), b'same bytes')
+
+    def test_different_content_different_names(self):
+        """Тест что разные файлы получают разные имена"""
+        self.assertNotEqual(
+            self.storage.save('a.png', ContentFile(b'one')),
+            self.storage.save('a.png', ContentFile(b'two')),
+        )
+
+    def test_delete_keeps_blob(self):
+        """Тест что delete() не удаляет общий блоб, а purge() удаляет"""
+        name = self.storage.save('a.png', ContentFile(b'data'))
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        self.storage.purge(name)
+        self.assertFalse(self.storage.exists(name))
+
+
+class MediaReferenceCountTest(TestCase):
+    """Тесты счетчиков ссылок на блобы"""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.location, base_url='/media/')
+        patcher = patch.object(Post._meta.get_field('image'), 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.location, True)
+        self.user = User.objects.create_user(username='blobuser', password='testpass123')
+
+    def create_post(self, content=b'image bytes'):
+        return Post.objects.create(
+            title='Пост', content='Текст', author=self.user,
+            image=SimpleUploadedFile('photo.jpg', content, content_type='image/jpeg'),
+        )
+
+    def test_duplicate_uploads_share_blob(self):
+        """Тест что повторная загрузка увеличивает счетчик, а не создает файл"""
+        first, second = self.create_post(), self.create_post()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).ref_count, 2)
+
+    def test_release_on_change_and_delete(self):
+        """Тест уменьшения счетчика при замене изображения и удалении поста"""
+        post = self.create_post()
+        old_name = post.image.name
+        other = Post.objects.get(pk=post.pk)  # Объект, загруженный из БД
+        other.image = SimpleUploadedFile('new.jpg', b'other bytes', content_type='image/jpeg')
+        other.save()
+        self.assertEqual(MediaBlob.objects.get(name=old_name).ref_count, 0)
+        Post.objects.get(pk=post.pk).delete()
+        self.assertEqual(MediaBlob.objects.get(name=other.image.name).ref_count, 0)
+
+    def test_gc_removes_unreferenced_blobs(self):
+        """Тест удаления блобов без ссылок командой gc_media"""
+        kept = self.create_post(b'kept')
+        removed = self.create_post(b'removed')
+        removed_name = removed.image.name
+        removed.delete()
+        orphan = self.storage.save('x.jpg', ContentFile(b'never referenced'))
+
+        with patch('blog.management.commands.gc_media.default_storage', self.storage):
+            call_command('gc_media', '--grace-hours=0', '--recount', stdout=StringIO())
+
+        self.assertTrue(self.storage.exists(kept.image.name))
+        self.assertFalse(self.storage.exists(removed_name))
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertFalse(MediaBlob.objects.filter(name=removed_name).exists())
+
+    def test_gc_respects_grace_period(self):
+        """Тест что недавно освобожденные блобы не удаляются"""
+        post = self.create_post()
+        name = post.image.name
+        post.delete()
+        with patch('blog.management.commands.gc_media.default_storage', self.storage):
+            call_command('gc_media', stdout=StringIO())
+        self.assertTrue(os.path.exists(self.storage.path(name)))
@@ -0,0 +1,113 @@
+"""
+Тесты нормализованных тегов
+"""
+
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from blog.models import Post, PostTag, Tag
+from blog.tags import parse_tags
+
+
+class ParseTagsTest(TestCase):
+    """Тесты разбора строки тегов"""
+
+    def test_comma_separated(self):
+        """Тест разбора тегов через запятую с дубликатами"""
+        self.assertEqual(parse_tags('Django, Python,  django , #веб разработка,'), [
+            ('django', 'Django'), ('python', 'Python'), ('веб-разработка', 'веб разработка'),
+        ])
+
+    def test_space_separated_legacy(self):
+        """Тест разбора старых строк без запятых"""
+        self.assertEqual([slug for slug, _ in parse_tags('go django')], ['go', 'django'])
+        self.assertEqual(parse_tags(''), [])
+
+
+class TagSyncTest(TestCase):
+    """Тесты синхронизации связей и счетчиков тегов"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='tagger', password='testpass123')
+
+    def create_post(self, tags, status='published', **kwargs):
+        return Post.objects.create(title='Пост', content='Текст', author=self.user, tags=tags, status=status, **kwargs)
+
+    def counts(self):
+        return dict(Tag.objects.values_list('slug', 'post_count'))
+
+    def test_counts_follow_posts(self):
+        """Тест счетчиков при создании, смене тегов, статуса и удалении поста"""
+        first = self.create_post('go, django')
+        self.create_post('django')
+        self.create_post('django', status='draft')
+        self.assertEqual(self.counts(), {'go': 1, 'django': 2})
+
+        first.tags = 'python'
+        first.save()
+        self.assertEqual(self.counts(), {'go': 0, 'django': 1, 'python': 1})
+        self.assertEqual(list(first.tag_set.values_list('slug', flat=True)), ['python'])
+
+        first.status = 'archived'
+        first.save()
+        self.assertEqual(self.counts()['python'], 0)
+
+        first.status = 'published'
+        first.save()
+        first.delete()
+        self.assertEqual(self.counts()['python'], 0)
+
+    def test_unrelated_save_skips_sync(self):
+        """Тест что сохранение без изменения тегов не трогает таблицы тегов"""
+        post = self.create_post('go')
+        post.views += 1
+        with self.assertNumQueries(1):  # Только UPDATE поста
+            post.save()
+
+    def test_bulk_create_syncs_tags(self):
+        """Тест тегов постов, созданных массово (импорт)"""
+        Post.bulk_create_with_slugs([
+            Post(title='Импорт', content='Текст', author=self.user, tags=f'import, tag{number}', status='published')
+            for number in range(3)
+        ])
+        self.assertEqual(self.counts()['import'], 3)
+        self.assertEqual(PostTag.objects.count(), 6)
+
+    def test_populate_migration(self):
+        """Тест миграции данных из строковых тегов"""
+        post = self.create_post('')
+        Post.objects.filter(pk=post.pk).update(tags='legacy tags')  # Строка без синхронизации, как до миграции
+        import_module('blog.migrations.0006_populate_tags').populate_tags(apps, None)
+        self.assertEqual(self.counts(), {'legacy': 1, 'tags': 1})
+
+
+class TagViewsTest(TestCase):
+    """Тесты страниц тегов"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='tagviews', password='testpass123')
+        self.go = Post.objects.create(title='Go', content='Текст', author=user, tags='go', status='published')
+        self.django = Post.objects.create(title='Django', content='Текст', author=user, tags='django', status='published')
+
+    def test_tag_page_exact_match(self):
+        """Тест что тег go не находит посты с тегом django"""
+        response = self.client.get(reverse('tag_posts', kwargs={'slug': 'go'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post.pk for post in response.context['posts']], [self.go.pk])
+
+    def test_search_by_tag_without_duplicates(self):
+        """Тест что пост с несколькими тегами находится поиском один раз"""
+        self.go.title, self.go.tags = 'Go и Django', 'go, django, web'  # Совпадение и по заголовку, и по тегу
+        self.go.save()
+        response = self.client.get(reverse('post_list'), {'query': 'django'})
+        self.assertEqual(sorted(post.pk for post in response.context['posts']), sorted([self.go.pk, self.django.pk]))
+        response = self.client.get(reverse('search'), {'query': 'django', 'search_in': 'posts'})
+        self.assertEqual(sorted(post.pk for post in response.context['posts_page']), sorted([self.go.pk, self.django.pk]))
+
+    def test_unknown_tag(self):
+        """Тест 404 для несуществующего тега"""
+        self.assertEqual(self.client.get(reverse('tag_posts', kwargs={'slug': 'nope'})).status_code, 404)
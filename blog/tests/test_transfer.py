@@ -0,0 +1,140 @@
+"""
+Тесты импорта и экспорта постов
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from blog.models import Category, Post
+
+
+class PostTransferTest(TestCase):
+    """Тесты команд import_posts и export_posts"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', password='testpass123')
+        self.category = Category.objects.create(name='Технологии')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def import_file(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_posts', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_jsonl(self):
+        """Тест импорта JSONL с авторами, категориями и ошибочными строками"""
+        rows = [
+            {'title': 'First post', 'content': 'Текст ' * 100, 'author': 'importer', 'category': 'Технологии', 'status': 'published'},
+            {'title': 'First post', 'content': 'Текст', 'published_date': '2024-01-02T10:00:00Z'},
+            {'title': 'Unknown author', 'content': 'Текст', 'author': 'nobody'},
+            {'title': 'Bad status', 'content': 'Текст', 'status': 'deleted'},
+        ]
+        path = self.write_file('posts.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\n{broken\n')
+        out, err = self.import_file(path, '--author=importer', '--batch-size=2')
+
+        self.assertIn('Импортировано постов: 2', out)
+        self.assertIn('ошибок: 3', out)
+        self.assertIn('Строка 3: Автор не найден: nobody', err)
+        first, second = Post.objects.order_by('pk')
+        self.assertEqual((first.slug, second.slug), ('first-post', 'first-post-1'))
+        self.assertEqual(first.category, self.category)
+        self.assertTrue(first.published_date and first.excerpt.endswith('...'))
+        self.assertEqual(second.published_date.year, 2024)
+
+    def test_import_csv_with_multiline_content(self):
+        """Тест импорта CSV с переводами строк внутри полей"""
+        path = self.write_file('posts.csv', 'title,content,author,category\nCSV post,"строка 1\nстрока 2",importer,Новая\n')
+        out, _ = self.import_file(path, '--create-categories')
+        self.assertIn('Импортировано постов: 1', out)
+        post = Post.objects.get()
+        self.assertEqual(post.content, 'строка 1\nстрока 2')
+        self.assertEqual(post.category.name, 'Новая')
+
+    def test_import_not_utf8(self):
+        """Тест что файл не в UTF-8 дает ошибку в отчете, а не исключение"""
+        path = os.path.join(self.directory, 'posts.csv')
+        with open(path, 'wb') as f:
+            f.write('title,content,author\nFirst,Текст,importer\n'.encode('utf-8') + 'Second,Текст,importer\n'.encode('cp1251'))
+        out, err = self.import_file(path)
+        self.assertIn('Импортировано постов: 1', out)
+        self.assertIn('Строка 3: Файл не в кодировке UTF-8', err)
+
+    def test_import_long_slug(self):
+        """Тест что slug длиннее поля дает ошибку строки, а не ошибку базы данных"""
+        rows = [
+            {'title': 'Long slug', 'content': 'Текст', 'slug': 'a' * 250},
+            {'title': 'Short slug', 'content': 'Текст', 'slug': 'short'},
+        ]
+        path = self.write_file('posts.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\n')
+        out, err = self.import_file(path, '--author=importer')
+        self.assertIn('Импортировано постов: 1', out)
+        self.assertIn('Строка 1: Слишком длинный slug', err)
+        self.assertEqual(Post.objects.get().slug, 'short')
+
+    def test_import_scheduled(self):
+        """Тест что запланированный пост импортируется только со временем публикации в будущем"""
+        publish_at = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        rows = [
+            {'title': 'Scheduled', 'content': 'Текст', 'status': 'scheduled', 'publish_at': publish_at.isoformat()},
+            {'title': 'No time', 'content': 'Текст', 'status': 'scheduled'},
+            {'title': 'Past', 'content': 'Текст', 'status': 'scheduled', 'publish_at': '2020-01-01T10:00:00Z'},
+        ]
+        path = self.write_file('posts.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\n')
+        with patch('blog.publishing.arm') as arm:
+            out, err = self.import_file(path, '--author=importer')
+        self.assertIn('Импортировано постов: 1', out)
+        self.assertIn('Строка 2: Для отложенной публикации укажите время в будущем', err)
+        self.assertIn('Строка 3: Для отложенной публикации укажите время в будущем', err)
+        post = Post.objects.get()
+        self.assertEqual((post.status, post.publish_at), ('scheduled', publish_at))
+        arm.assert_called_once_with(publish_at)
+        export = StringIO()
+        call_command('export_posts', stdout=export, stderr=StringIO())
+        self.assertEqual(json.loads(export.getvalue())['publish_at'], publish_at.isoformat())
+
+    def test_export_import_roundtrip(self):
+        """Тест что экспорт импортируется обратно, а повторный импорт пропускает существующие slug"""
+        Post.objects.create(title='Roundtrip', content='Текст', author=self.user, category=self.category, tags='a,b')
+        for data_format in ('jsonl', 'csv'):
+            path = os.path.join(self.directory, f'export.{data_format}')
+            call_command('export_posts', f'--output={path}', stdout=StringIO(), stderr=StringIO())
+            out, _ = self.import_file(path)
+            self.assertIn('Импортировано постов: 0', out)
+            self.assertIn('пропущено: 1', out)
+
+        path = os.path.join(self.directory, 'export.jsonl')
+        Post.objects.all().delete()
+        self.import_file(path)
+        post = Post.objects.get()
+        self.assertEqual((post.slug, post.author, post.category, post.tags), ('roundtrip', self.user, self.category, 'a,b'))
+
+    def test_export_to_stdout(self):
+        """Тест что stdout содержит только данные"""
+        Post.objects.create(title='Stdout', content='Текст', author=self.user)
+        out = StringIO()
+        call_command('export_posts', stdout=out, stderr=StringIO())
+        self.assertEqual(json.loads(out.getvalue())['slug'], 'stdout')
+
+    def test_unknown_default_author(self):
+        """Тест ошибки для несуществующего автора по умолчанию"""
+        path = self.write_file('posts.jsonl', '')
+        with self.assertRaises(CommandError):
+            self.import_file(path, '--author=nobody')
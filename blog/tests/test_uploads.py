@@ -0,0 +1,180 @@
+"""
+Тесты потоковой загрузки изображений
+"""
+
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+from django.test import TestCase, RequestFactory, override_settings
+from django.contrib.auth.models import User
+from django.core.exceptions import RequestDataTooBig, ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+
+from blog import uploads
+from blog.api.serializers import ChunkedUploadSerializer
+from blog.forms import UploadImageField
+from blog.models import ChunkedUpload
+from blog.tasks import cleanup_chunked_uploads
+from blog.uploads import RejectedUpload, append_chunk, chunk_path, finalize_chunked_upload, sniff_image_type
+
+TEMP_UPLOAD_DIR = tempfile.mkdtemp()
+
+
+def make_png(size=(40, 30)):
+    """Создает PNG изображение в памяти"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (0, 128, 0)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(FILE_UPLOAD_HANDLERS=['blog.uploads.LimitedImageUploadHandler'])
+class LimitedImageUploadHandlerTest(TestCase):
+    """Тесты обработчика multipart загрузки"""
+
+    def post_files(self, data):
+        request = RequestFactory().post('/upload/', data=data)
+        return request.FILES
+
+    def test_valid_image_streamed_to_disk(self):
+        """Тест записи корректного изображения во временный файл"""
+        content = make_png()
+        files = self.post_files({'image': SimpleUploadedFile('a.png', content, content_type='image/png')})
+        uploaded = files['image']
+        self.assertIsInstance(uploaded, TemporaryUploadedFile)
+        self.assertEqual(uploaded.size, len(content))
+        self.assertEqual(uploaded.read(), content)
+
+    def test_wrong_content_type_rejected(self):
+        """Тест отклонения файла неразрешенного типа"""
+        files = self.post_files({'image': SimpleUploadedFile('a.txt', b'hello', content_type='text/plain')})
+        self.assertIsInstance(files['image'], RejectedUpload)
+
+    def test_signature_mismatch_rejected(self):
+        """Тест отклонения файла, содержимое которого не совпадает с типом"""
+        files = self.post_files({'image': SimpleUploadedFile('a.png', b'GIF89a' + b'0' * 100, content_type='image/png')})
+        self.assertIn('не соответствует', files['image'].rejection_reason)
+
+    def test_oversized_file_rejected(self):
+        """Тест прекращения записи файла больше лимита"""
+        with patch.object(uploads, 'IMAGE_UPLOAD_MAX_SIZE', 100):
+            files = self.post_files({'image': SimpleUploadedFile('a.png', make_png((200, 200)), content_type='image/png')})
+        self.assertIn('не должен превышать', files['image'].rejection_reason)
+
+    def test_oversized_request_refused_before_reading(self):
+        """Тест отказа по Content-Length без чтения тела"""
+        with patch.object(uploads, 'IMAGE_UPLOAD_MAX_SIZE', 10), self.settings(DATA_UPLOAD_MAX_MEMORY_SIZE=10):
+            with self.assertRaises(RequestDataTooBig):
+                self.post_files({'image': SimpleUploadedFile('a.png', make_png(), content_type='image/png')})
+
+
+class UploadImageFieldTest(TestCase):
+    """Тесты поля изображения с проверкой по заголовку"""
+
+    def test_valid_image(self):
+        """Тест корректного изображения"""
+        f = UploadImageField().clean(SimpleUploadedFile('a.png', make_png(), content_type='image/png'))
+        self.assertEqual(f.content_type, 'image/png')
+
+    def test_rejection_reason_reported(self):
+        """Тест вывода причины отказа обработчика загрузки"""
+        with self.assertRaisesMessage(ValidationError, 'слишком'):
+            UploadImageField().clean(RejectedUpload('a.png', 'image/png', 'Файл слишком большой.'))
+
+    def test_pixel_limit(self):
+        """Тест ограничения числа пикселей по заголовку"""
+        with patch.object(uploads, 'IMAGE_UPLOAD_MAX_PIXELS', 100):
+            with self.assertRaises(ValidationError):
+                UploadImageField().clean(SimpleUploadedFile('a.png', make_png(), content_type='image/png'))
+
+    def test_not_an_image(self):
+        """Тест отклонения файла, не являющегося изображением"""
+        with self.assertRaises(ValidationError):
+            UploadImageField().clean(SimpleUploadedFile('a.png', b'\x89PNG\r\n\x1a\nbroken', content_type='image/png'))
+
+
+@patch.object(uploads, 'CHUNKED_UPLOAD_DIR', TEMP_UPLOAD_DIR)
+class ChunkedUploadTest(TestCase):
+    """Тесты загрузки изображения по частям"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_UPLOAD_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='uploader', password='testpass123')
+        self.content = make_png((300, 200))
+        self.upload = ChunkedUpload.objects.create(
+            user=self.user, filename='big.png', content_type='image/png', size=len(self.content)
+        )
+
+    def send(self, start, end):
+        chunk = self.content[start:end]
+        return append_chunk(self.upload, io.BytesIO(chunk), start, len(chunk))
+
+    def test_chunks_assembled(self):
+        """Тест сборки файла из нескольких частей"""
+        middle = len(self.content) // 2
+        self.upload.offset = self.send(0, middle)
+        self.upload.offset = self.send(middle, len(self.content))
+        self.assertEqual(self.upload.offset, len(self.content))
+        with open(chunk_path(self.upload), 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(finalize_chunked_upload(self.upload), (chunk_path(self.upload), 'big.png'))
+
+    def test_stored_name_follows_format(self):
+        """Тест что расширение сохраняемого файла берется из формата, а не из имени клиента"""
+        self.upload.filename = 'page.html'
+        self.send(0, len(self.content))
+        self.assertEqual(finalize_chunked_upload(self.upload)[1], 'page.png')
+        serializer = ChunkedUploadSerializer(data={'filename': 'page.html', 'content_type': 'image/png', 'size': 10})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('filename', serializer.errors)
+
+    def test_offset_mismatch(self):
+        """Тест отказа при неверном смещении"""
+        with self.assertRaises(ValidationError) as ctx:
+            self.send(10, 20)
+        self.assertEqual(ctx.exception.code, 'offset_mismatch')
+
+    def test_size_exceeded(self):
+        """Тест отказа при превышении заявленного размера"""
+        with self.assertRaises(ValidationError) as ctx:
+            append_chunk(self.upload, io.BytesIO(self.content + b'x'), 0, len(self.content) + 1)
+        self.assertEqual(ctx.exception.code, 'size_exceeded')
+
+    def test_bad_signature(self):
+        """Тест проверки сигнатуры первой части"""
+        self.upload.content_type = 'image/jpeg'
+        with self.assertRaises(ValidationError) as ctx:
+            self.send(0, 100)
+        self.assertEqual(ctx.exception.code, 'invalid_signature')
+
+    def test_incomplete_chunk_not_counted(self):
+        """Тест что оборванная часть не засчитывается"""
+        with self.assertRaises(ValidationError):
+            append_chunk(self.upload, io.BytesIO(self.content[:50]), 0, 100)
+        with open(chunk_path(self.upload), 'rb') as f:
+            self.assertEqual(f.read(), b'')
+
+    def test_cleanup_stale_uploads(self):
+        """Тест удаления брошенных загрузок"""
+        self.send(0, 100)
+        ChunkedUpload.objects.filter(pk=self.upload.pk).update(updated_at='2000-01-01T00:00:00Z')
+        self.assertEqual(cleanup_chunked_uploads(), 1)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+
+class SniffImageTypeTest(TestCase):
+    """Тесты определения типа изображения по сигнатуре"""
+
+    def test_signatures(self):
+        """Тест известных сигнатур"""
+        self.assertEqual(sniff_image_type(b'\xff\xd8\xff\xe0'), 'image/jpeg')
+        self.assertEqual(sniff_image_type(make_png()[:16]), 'image/png')
+        self.assertEqual(sniff_image_type(b'GIF87a'), 'image/gif')
+        self.assertEqual(sniff_image_type(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'image/webp')
+        self.assertIsNone(sniff_image_type(b'<svg'))
@@ -12,7 +12,7 @@ from django.core.paginator import Paginator
 from django.http import HttpResponseForbidden
 from datetime import datetime, timedelta
 
-from blog.models import Post, Comment, Category, UserProfile, Notification
+from blog.models import Post, Comment, Category, UserProfile, Notification, AuthorStats
 from blog.forms import RegisterForm, LoginForm, PostForm, CommentForm
 
 
@@ -121,6 +121,9 @@ class PublicViewsTest(TestCase):
         )
         self.post1.refresh_from_db()
         self.assertEqual(self.post1.views, initial_views + 1)
+        self.assertFalse(AuthorStats.objects.filter(user=self.post1.author, views_received__gt=0).exists())  # Просмотр не пишет строку автора
+        AuthorStats.reconcile()
+        self.assertEqual(AuthorStats.for_user(self.post1.author_id).views_received, sum(Post.objects.filter(author=self.post1.author).values_list('views', flat=True)))
     
     def test_post_detail_view_invalid_slug(self):
         """Тест страницы поста с неправильным слагом"""
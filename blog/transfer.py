@@ -0,0 +1,301 @@
+# Потоковый импорт и экспорт постов (JSONL/CSV) с пакетной вставкой
+import codecs  # Импортируем codecs для распознавания BOM
+import csv  # Импортируем csv для табличного формата
+import json  # Импортируем json для формата JSON Lines
+import time  # Импортируем time для замера скорости
+
+from django.contrib.auth.models import User  # Импортируем модель пользователя Django
+from django.core.exceptions import ValidationError  # Импортируем исключение валидации
+from django.core.validators import validate_slug  # Импортируем проверку формата slug
+from django.utils import timezone  # Импортируем утилиты времени
+from django.utils.dateparse import parse_datetime  # Импортируем разбор дат в формате ISO 8601
+
+from .models import Category, Post  # Модели постов и категорий
+
+FORMATS = ('jsonl', 'csv')  # Поддерживаемые форматы
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}  # MIME типы форматов
+FIELDS = [  # Колонки экспорта (автор и категория - по имени, а не по id)
+    'id', 'title', 'slug', 'content', 'excerpt', 'author', 'category',
+    'status', 'created_date', 'published_date', 'publish_at', 'tags', 'views',
+]
+EXPORT_LOOKUPS = {'author': 'author__username', 'category': 'category__name'}  # Колонка -> выражение для values()
+STATUSES = {value for value, _ in Post.STATUS_CHOICES}  # Допустимые статусы
+READ_CHUNK_SIZE = 64 * 1024  # Размер блока чтения входного потока
+MAX_REPORTED_ERRORS = 50  # Сколько ошибок строк хранить для отчета (считаются все)
+
+
+# Ввод
+
+def _text(row, key):
+    value = row.get(key)
+    return '' if value is None else str(value)  # В JSON значения могут быть числами или null
+
+
+def _decode(line, number):
+    try:
+        return line.decode('utf-8')
+    except UnicodeDecodeError:
+        # Дальше файл не читается: ошибка попадает в отчет импорта, как некорректная строка
+        raise ValidationError('Файл не в кодировке UTF-8, импорт остановлен', code='invalid_encoding', params={'line': number})
+
+
+def iter_lines(stream, chunk_size=READ_CHUNK_SIZE):
+    """
+    Строки бинарного потока (с переводом строки) без загрузки всего файла в память;
+    строка не в UTF-8 - ValidationError с номером строки в params['line']
+    """
+    buffer = b''
+    first = True
+    number = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if first:
+            chunk = chunk[len(codecs.BOM_UTF8):] if chunk.startswith(codecs.BOM_UTF8) else chunk  # BOM от Excel
+            first = False
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            number += 1
+            yield _decode(line, number) + '\n'
+    if buffer:
+        yield _decode(buffer, number + 1)
+
+
+def read_jsonl(stream):
+    """Пары (номер строки, словарь); для некорректной строки словарь равен None"""
+    for number, line in enumerate(iter_lines(stream), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def read_csv(stream):
+    """Пары (номер строки, словарь) из CSV с заголовком; поля в кавычках могут содержать переводы строк"""
+    reader = csv.DictReader(iter_lines(stream))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_rows(stream, data_format):
+    return read_csv(stream) if data_format == 'csv' else read_jsonl(stream)
+
+
+# Вывод
+
+def export_rows(queryset=None, batch_size=1000):
+    """Словари постов для экспорта, выборка пакетами по первичному ключу"""
+    queryset = (queryset if queryset is not None else Post.objects.all()).order_by('pk')
+    lookups = [EXPORT_LOOKUPS.get(field, field) for field in FIELDS]
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).values_list(*lookups)[:batch_size])
+        if not batch:
+            break
+        for values in batch:
+            row = dict(zip(FIELDS, values))
+            for field in ('created_date', 'published_date', 'publish_at'):
+                row[field] = row[field].isoformat() if row[field] else None
+            yield row
+        last_pk = batch[-1][0]
+
+
+# Псевдо-буфер для csv.writer: возвращает строку вместо записи
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def render_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(['' if row[field] is None else row[field] for field in FIELDS])
+
+
+def render_rows(rows, data_format):
+    """Генератор строк файла выбранного формата"""
+    return render_csv(rows) if data_format == 'csv' else render_jsonl(rows)
+
+
+# Итог импорта: счетчики, первые ошибки и скорость
+class ImportResult:
+    def __init__(self):
+        self.created = 0  # Создано постов
+        self.skipped = 0  # Пропущено (slug уже существует)
+        self.failed = 0  # Строк с ошибками
+        self.errors = []  # Первые MAX_REPORTED_ERRORS ошибок: (номер строки, сообщение)
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def add_error(self, number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, message))
+
+    @property
+    def rate(self):
+        return self.created / self.elapsed if self.elapsed else 0.0  # Постов в секунду
+
+    def summary(self):
+        return (f'Импортировано постов: {self.created} за {self.elapsed:.1f} с ({self.rate:.0f} постов/с), '
+                f'пропущено: {self.skipped}, ошибок: {self.failed}')
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'errors': [{'line': number, 'error': message} for number, message in self.errors],
+            'elapsed': round(self.elapsed, 3),
+            'rate': round(self.rate, 1),
+        }
+
+
+# Импорт постов пакетами: авторы и категории берутся из словарей в памяти,
+# которые дополняются одним запросом на пакет для еще не встречавшихся имен
+class PostImporter:
+    def __init__(self, default_author_id=None, create_categories=False, batch_size=1000):
+        self.default_author_id = default_author_id  # Автор для строк без колонки author
+        self.create_categories = create_categories  # Создавать отсутствующие категории
+        self.batch_size = batch_size
+        self.authors = {}  # username -> id
+        self.categories = {}  # название -> id
+        self.result = ImportResult()
+
+    def run(self, rows):
+        """Импортирует пары (номер строки, словарь) и возвращает ImportResult"""
+        batch = []
+        try:
+            for number, row in rows:
+                if row is None:
+                    self.result.add_error(number, 'Некорректная строка')
+                    continue
+                batch.append((number, row))
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+        except ValidationError as e:  # Файл не читается дальше (кодировка); прочитанные строки импортируются
+            if e.code != 'invalid_encoding':
+                raise
+            self.result.add_error(e.params['line'], e.messages[0])
+        self.flush(batch)
+        self.result.errors.sort()  # Ошибки разбора и проверки - в порядке строк файла
+        self.result.elapsed = time.monotonic() - self.result.started
+        return self.result
+
+    def flush(self, batch):
+        if not batch:
+            return
+        self.resolve_authors({_text(row, 'author').strip() for _, row in batch})
+        self.resolve_categories({_text(row, 'category').strip() for _, row in batch})
+
+        posts = []
+        for number, row in batch:
+            try:
+                posts.append(self.build_post(row))
+            except ValidationError as e:
+                self.result.add_error(number, '; '.join(e.messages))
+        posts = self.drop_existing(posts)
+        Post.bulk_create_with_slugs(posts, batch_size=self.batch_size)
+        self.result.created += len(posts)
+        batch.clear()
+
+    def resolve_authors(self, usernames):
+        missing = usernames - self.authors.keys() - {''}
+        if missing:
+            self.authors.update(User.objects.filter(username__in=missing).values_list('username', 'pk'))
+
+    def resolve_categories(self, names):
+        missing = names - self.categories.keys() - {''}
+        if not missing:
+            return
+        self.categories.update(Category.objects.filter(name__in=missing).values_list('name', 'pk'))
+        missing -= self.categories.keys()
+        if missing and self.create_categories:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            Category.invalidate_cache()  # bulk_create не отправляет post_save
+            self.categories.update(Category.objects.filter(name__in=missing).values_list('name', 'pk'))
+
+    def build_post(self, row):
+        """Пост из строки файла (без сохранения); ошибки - ValidationError"""
+        title = _text(row, 'title').strip()
+        content = _text(row, 'content')
+        if not title or not content:
+            raise ValidationError('Поля title и content обязательны')
+        if len(title) > Post._meta.get_field('title').max_length:
+            raise ValidationError('Слишком длинный заголовок')
+
+        author = _text(row, 'author').strip()
+        author_id = self.authors.get(author) if author else self.default_author_id
+        if author_id is None:
+            raise ValidationError(f'Автор не найден: {author}' if author else 'Не указан автор')
+        category = _text(row, 'category').strip()
+        if category and category not in self.categories:
+            raise ValidationError(f'Категория не найдена: {category}')
+
+        status = _text(row, 'status') or 'draft'
+        if status not in STATUSES:
+            raise ValidationError(f'Неизвестный статус: {status}')
+        slug = _text(row, 'slug').strip()
+        if slug:
+            validate_slug(slug)
+            if len(slug) > Post._meta.get_field('slug').max_length:
+                raise ValidationError('Слишком длинный slug')
+
+        try:
+            views = int(row.get('views') or 0)
+        except (TypeError, ValueError):
+            raise ValidationError('Поле views должно быть числом')
+        post = Post(
+            title=title,
+            slug=slug,
+            content=content,
+            excerpt=_text(row, 'excerpt')[:300],
+            author_id=author_id,
+            category_id=self.categories.get(category),
+            status=status,
+            created_date=self.parse_date(row.get('created_date')) or timezone.now(),
+            published_date=self.parse_date(row.get('published_date')),
+            publish_at=self.parse_date(row.get('publish_at')) if status == 'scheduled' else None,
+            tags=_text(row, 'tags')[:200],
+            views=max(views, 0),
+        )
+        post.clean()  # Запланированному посту нужно время публикации в будущем
+        return post
+
+    @staticmethod
+    def parse_date(value):
+        if not value:
+            return None
+        try:
+            parsed = parse_datetime(str(value))
+        except ValueError:  # Формат верный, но дата не существует
+            parsed = None
+        if parsed is None:
+            raise ValidationError(f'Некорректная дата: {value}')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def drop_existing(self, posts):
+        # Посты с уже существующим slug пропускаются: повторный запуск импорта не создает дубликатов
+        slugs = [post.slug for post in posts if post.slug]
+        existing = set(Post.objects.filter(slug__in=slugs).values_list('slug', flat=True)) if slugs else set()
+        kept, seen = [], set()
+        for post in posts:
+            if post.slug and (post.slug in existing or post.slug in seen):
+                self.result.skipped += 1
+                continue
+            seen.add(post.slug)
+            kept.append(post)
+        return kept
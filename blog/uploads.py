@@ -0,0 +1,200 @@
+# Потоковая загрузка изображений с ранними проверками размера и типа
+import io  # Импортируем модуль для работы с буферами в памяти
+import os  # Импортируем os для работы с временными файлами
+import tempfile  # Импортируем tempfile для каталога по умолчанию
+
+from PIL import Image  # Импортируем Pillow (только для чтения заголовка изображения)
+from django.conf import settings  # Импортируем настройки Django
+from django.core.exceptions import RequestDataTooBig, ValidationError  # Импортируем исключения валидации
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile  # Импортируем классы загруженных файлов
+from django.core.files.uploadhandler import FileUploadHandler  # Импортируем базовый обработчик загрузок
+
+IMAGE_UPLOAD_MAX_SIZE = getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', 5 * 1024 * 1024)  # Максимальный размер файла в multipart запросе
+IMAGE_UPLOAD_MAX_PIXELS = getattr(settings, 'IMAGE_UPLOAD_MAX_PIXELS', 40_000_000)  # Защита от "decompression bomb"
+IMAGE_UPLOAD_CONTENT_TYPES = getattr(settings, 'IMAGE_UPLOAD_CONTENT_TYPES', {
+    'image/jpeg': 'JPEG',
+    'image/png': 'PNG',
+    'image/gif': 'GIF',
+    'image/webp': 'WEBP',
+})  # Разрешенные MIME типы и соответствующие форматы Pillow
+IMAGE_FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}  # Расширение сохраняемого файла по формату Pillow
+IMAGE_UPLOAD_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}  # Допустимые расширения в имени загружаемого файла
+CHUNKED_UPLOAD_MAX_SIZE = getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)  # Максимальный размер файла при загрузке по частям
+CHUNKED_UPLOAD_CHUNK_SIZE = getattr(settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024)  # Максимальный размер одной части
+CHUNKED_UPLOAD_DIR = str(getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'myblog_chunked_uploads')))  # Каталог незавершенных загрузок
+
+_STREAM_BLOCK_SIZE = 64 * 1024  # Размер блока при потоковом чтении тела запроса
+
+
+def sniff_image_type(head):
+    """Определяет MIME тип изображения по сигнатуре первых байтов"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def inspect_image_header(fileobj):
+    """
+    Проверяет изображение по заголовку без декодирования пикселей.
+
+    Возвращает (формат, ширина, высота) или выбрасывает ValidationError.
+    """
+    position = fileobj.tell() if hasattr(fileobj, 'tell') else 0
+    try:
+        image = Image.open(fileobj)  # Pillow читает только заголовок, пиксели декодируются лениво
+        image_format, (width, height) = image.format, image.size
+    except Image.DecompressionBombError:
+        raise ValidationError('Изображение слишком большое.', code='image_too_large')
+    except Exception:
+        raise ValidationError('Загрузите корректное изображение.', code='invalid_image')
+    finally:
+        if hasattr(fileobj, 'seek'):
+            fileobj.seek(position)
+    if image_format not in IMAGE_UPLOAD_CONTENT_TYPES.values():
+        raise ValidationError('Неподдерживаемый формат изображения.', code='invalid_image_format')
+    if width * height > IMAGE_UPLOAD_MAX_PIXELS:
+        raise ValidationError('Изображение слишком большое.', code='image_too_large')
+    return image_format, width, height
+
+
+# Файл, отклоненный обработчиком загрузки до полного чтения
+class RejectedUpload(UploadedFile):
+    def __init__(self, name, content_type, reason):
+        super().__init__(io.BytesIO(b''), name, content_type, 0)
+        self.rejection_reason = reason  # Причина отклонения (показывается в ошибке формы)
+
+
+# Обработчик загрузки: пишет файл на диск частями и прекращает запись при нарушении лимитов
+class LimitedImageUploadHandler(FileUploadHandler):
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Запрос заведомо больше лимита - отвечаем 400, не читая тело
+        limit = IMAGE_UPLOAD_MAX_SIZE + (settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0)
+        if content_length and content_length > limit:
+            raise RequestDataTooBig('Размер запроса превышает допустимый.')
+        return None  # Продолжаем стандартный разбор multipart
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.rejection = None
+        self.file = None
+        if self.content_type not in IMAGE_UPLOAD_CONTENT_TYPES:
+            self.rejection = 'Допустимы только изображения JPEG, PNG, GIF или WebP.'
+        elif self.content_length and self.content_length > IMAGE_UPLOAD_MAX_SIZE:
+            self.rejection = self._size_error()
+        else:
+            self.file = TemporaryUploadedFile(
+                self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+            )
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rejection:
+            return None  # Остаток отклоненного файла отбрасывается без записи
+        if start == 0 and sniff_image_type(raw_data[:16]) != self.content_type:
+            self._reject('Содержимое файла не соответствует типу изображения.')
+            return None
+        if start + len(raw_data) > IMAGE_UPLOAD_MAX_SIZE:
+            self._reject(self._size_error())
+            return None
+        self.file.write(raw_data)
+        return None  # Данные не передаются следующим обработчикам
+
+    def file_complete(self, file_size):
+        if self.rejection:
+            return RejectedUpload(self.file_name, self.content_type, self.rejection)
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def _reject(self, reason):
+        self.rejection = reason
+        self._discard()
+
+    def _discard(self):
+        if getattr(self, 'file', None) is not None:
+            temp_location = self.file.temporary_file_path()
+            try:
+                self.file.close()
+                os.remove(temp_location)
+            except FileNotFoundError:
+                pass
+            self.file = None
+
+    @staticmethod
+    def _size_error():
+        return f'Размер файла не должен превышать {IMAGE_UPLOAD_MAX_SIZE // (1024 * 1024)} МБ.'
+
+
+# ---------------------------------------------------------- chunked upload --
+
+def chunk_path(upload):
+    """Путь к файлу, в который дописываются части загрузки"""
+    return os.path.join(CHUNKED_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def append_chunk(upload, stream, offset, length):
+    """
+    Дописывает часть файла из потока запроса блоками по 64 КБ.
+
+    Возвращает новое смещение. Выбрасывает ValidationError при неверном
+    смещении, превышении размеров или неверной сигнатуре файла.
+    """
+    if upload.is_complete:
+        raise ValidationError('Загрузка уже завершена.', code='complete')
+    if offset != upload.offset:
+        raise ValidationError(f'Ожидается смещение {upload.offset}.', code='offset_mismatch')
+    if length is None or length <= 0:
+        raise ValidationError('Не указан размер части.', code='length_required')
+    if length > CHUNKED_UPLOAD_CHUNK_SIZE:
+        raise ValidationError('Часть файла слишком большая.', code='chunk_too_large')
+    if offset + length > upload.size:
+        raise ValidationError('Данные превышают заявленный размер файла.', code='size_exceeded')
+
+    os.makedirs(CHUNKED_UPLOAD_DIR, exist_ok=True)
+    path = chunk_path(upload)
+    written = 0
+    with open(path, 'ab') as target:
+        target.truncate(offset)  # Отбрасываем хвост прерванной ранее записи
+        while written < length:
+            block = stream.read(min(_STREAM_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            if offset == 0 and written == 0 and sniff_image_type(block[:16]) != upload.content_type:
+                raise ValidationError('Содержимое файла не соответствует типу изображения.', code='invalid_signature')
+            target.write(block)
+            written += len(block)
+    if written != length:
+        with open(path, 'ab') as target:
+            target.truncate(offset)  # Неполная часть не засчитывается - клиент повторит ее
+        raise ValidationError('Часть файла получена не полностью.', code='incomplete_chunk')
+    return offset + written
+
+
+def stored_filename(filename, image_format):
+    """Имя файла для хранилища: расширение по формату из заголовка, а не из имени клиента"""
+    stem = os.path.splitext(os.path.basename(filename))[0] or 'image'
+    return stem + IMAGE_FORMAT_EXTENSIONS[image_format]
+
+
+def finalize_chunked_upload(upload):
+    """Проверяет заголовок собранного файла и возвращает путь к нему и имя для хранилища"""
+    path = chunk_path(upload)
+    with open(path, 'rb') as fileobj:
+        image_format, _width, _height = inspect_image_header(fileobj)
+    return path, stored_filename(upload.filename, image_format)
+
+
+def discard_chunked_upload(upload):
+    """Удаляет временный файл загрузки"""
+    try:
+        os.remove(chunk_path(upload))
+    except FileNotFoundError:
+        pass
@@ -12,16 +12,18 @@ urlpatterns = [
     path('contact/', views.contact, name='contact'),  # Страница с формой обратной связи
     
     # ================================ РАБОТА С ПОСТАМИ ================================
+    path('post/<int:post_pk>/comment/', views.comment_create, name='comment_create'),  # Создание комментария (выше post_detail: "comment" совпадает с <slug>)
+    path('post/new/', views.post_new, name='post_new'),  # Страница создания нового поста
+    path('post/<int:pk>/edit/', views.post_edit, name='post_edit'),  # Страница редактирования поста (выше post_detail)
+    path('post/<int:pk>/like/', views.post_like, name='post_like'),  # Обработчик лайка поста (AJAX, выше post_detail)
     path('post/<int:pk>/<slug:slug>/', views.post_detail, name='post_detail'),  # Детальная страница поста (с ID и slug)
     path('post/<int:pk>/', views.post_detail, name='post_detail_short'),  # Детальная страница поста (только с ID - короткая версия)
-    path('post/new/', views.post_new, name='post_new'),  # Страница создания нового поста
-    path('post/<int:pk>/edit/', views.post_edit, name='post_edit'),  # Страница редактирования поста
-    path('post/<int:pk>/like/', views.post_like, name='post_like'),  # Обработчик лайка поста (AJAX)
+    path('tag/<str:slug>/', views.tag_posts, name='tag_posts'),  # Посты с тегом (slug может содержать кириллицу)
     
     # ================================ РАБОТА С КОММЕНТАРИЯМИ ================================
-    path('post/<int:post_pk>/comment/', views.comment_create, name='comment_create'),  # Создание нового комментария к посту
     path('comment/<int:comment_pk>/reply/', views.reply_create, name='reply_create'),  # Ответ на комментарий (вложенный комментарий)
     path('comment/<int:comment_pk>/like/', views.comment_like, name='comment_like'),  # Обработчик лайка комментария (AJAX)
+    path('moderation/comments/', views.comment_moderation, name='comment_moderation'),  # Очередь модерации комментариев (staff)
     
     # ================================ АУТЕНТИФИКАЦИЯ ПОЛЬЗОВАТЕЛЕЙ ================================
     path('register/', views.register, name='register'),  # Страница регистрации нового пользователя
@@ -34,6 +36,7 @@ urlpatterns = [
     path('profile/change-password/', views.change_password, name='change_password'),  # Страница смены пароля
     path('users/', views.user_list, name='user_list'),  # Список всех пользователей блога
     path('user/<str:username>/', views.user_profile, name='user_profile'),  # Публичная страница профиля пользователя
+    path('user/<str:username>/follow/', views.user_follow, name='user_follow'),  # Подписка на автора и отписка (POST)
     
     # ================================ УВЕДОМЛЕНИЯ ================================
     path('notification/<int:notification_pk>/read/', views.mark_notification_read, name='mark_notification_read'),  # Отметка уведомления как прочитанное
@@ -1,17 +1,30 @@
 # Импорты Django для работы с HTTP запросами, аутентификацией, моделями и формами
+from itertools import chain  # Объединение страниц результатов поиска
 from django.shortcuts import render, redirect, get_object_or_404  # Базовые функции представлений
 from django.contrib.auth import login, authenticate, logout, update_session_auth_hash  # Аутентификация пользователей
 from django.contrib.auth.decorators import login_required  # Декоратор для ограничения доступа
+from django.contrib.admin.views.decorators import staff_member_required  # Декоратор доступа только для staff
 from django.contrib.auth.forms import PasswordChangeForm  # Форма смены пароля
 from django.contrib import messages  # Система сообщений Django
 from django.utils import timezone  # Утилиты для работы с временем
-from django.db.models import Q, Count  # ORM запросы и агрегация
+from django.db.models import Count, F  # Агрегация и ссылки на поля
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger  # Пагинация
 from django.http import JsonResponse, HttpResponseForbidden  # HTTP ответы
 from django.views.decorators.http import require_POST  # Декоратор для POST запросов
+from django.urls import reverse  # Генерация URL по имени
 from django.contrib.auth.models import User  # Модель пользователя Django
-from .models import Post, Comment, UserProfile, Category, Notification, SiteSettings  # Модели приложения
+from .models import Post, Comment, UserProfile, Category, Notification, SiteSettings, Tag, RelatedPost, AuthorStats, Follow, active_comment_count  # Модели приложения
 from .forms import RegisterForm, LoginForm, PostForm, CommentForm, ReplyForm, UserProfileForm, UserUpdateForm, SearchForm, ContactForm  # Формы приложения
+from .auth import get_principal, principal_is_banned  # Кэшированное состояние пользователя
+from .notifications import notify_like  # Объединение уведомлений о лайках
+from .live import broadcast_comment  # Live-поток комментариев поста
+from .search import post_match, search_posts, search_users, paginate as search_paginate  # Ограниченный поиск
+from . import drafts, feed  # Автосохранение черновиков правки и лента подписок
+
+TAG_CLOUD_SIZE = 30  # Количество тегов в облаке на главной странице
+MODERATION_PAGE_SIZE = 50  # Комментариев на странице очереди модерации
+PROFILE_PAGE_SIZE = 10  # Постов и комментариев на странице профиля
+HOME_FEED_SIZE = 5  # Постов из ленты подписок на главной странице
 
 def get_site_settings():
     """Получить настройки сайта (Singleton паттерн)"""
@@ -21,11 +34,8 @@ def is_user_banned(user):
     """Проверить, заблокирован ли пользователь"""
     if not user.is_authenticated:
         return False  # Гость не может быть заблокирован
-    try:
-        return user.profile.is_currently_banned()  # Проверяем статус блокировки
-    except UserProfile.DoesNotExist:
-        UserProfile.objects.create(user=user)  # Создаем профиль если не существует
-        return False
+    principal = getattr(user, '_principal', None) or get_principal(user.pk)  # Из кэша, без обращения к профилю
+    return principal_is_banned(principal)  # Пользователь без профиля не заблокирован
 
 def index(request):
     """Главная страница блога - отображает избранные и последние посты"""
@@ -34,12 +44,16 @@ def index(request):
     
     featured_posts = posts_list.order_by('-views')[:3]  # Топ 3 самых просматриваемых постов
     latest_posts = posts_list.order_by('-published_date')[:6]  # 6 последних постов
-    categories = Category.objects.annotate(post_count=Count('posts'))  # Категории с количеством постов
+    categories = Category.with_post_counts()  # Категории с количеством постов (из кэша)
+    tag_cloud = Tag.objects.filter(post_count__gt=0).order_by('-post_count', 'name')[:TAG_CLOUD_SIZE]  # Популярные теги (по индексу)
+    feed_posts = feed.page(request.user, limit=HOME_FEED_SIZE)[0] if request.user.is_authenticated else []  # Лента подписок (из Redis)
     
     context = {
         'featured_posts': featured_posts,
         'latest_posts': latest_posts,
+        'feed_posts': feed_posts,
         'categories': categories,
+        'tag_cloud': tag_cloud,
         'site_settings': site_settings,
     }
     return render(request, 'blog/index.html', context)
@@ -56,11 +70,7 @@ def post_list(request):
     search_form = SearchForm(request.GET)
     if search_form.is_valid() and search_form.cleaned_data['query']:
         query = search_form.cleaned_data['query']
-        # Поиск по заголовку, содержимому, краткому описанию и тегам
-        posts_list = posts_list.filter(
-            Q(title__icontains=query) | Q(content__icontains=query) |
-            Q(excerpt__icontains=query) | Q(tags__icontains=query)
-        )
+        posts_list = posts_list.filter(post_match(query))  # Заголовок, содержимое, описание, тег или автор
     
     paginator = Paginator(posts_list, site_settings.posts_per_page)  # Пагинация
     page = request.GET.get('page')
@@ -71,7 +81,7 @@ def post_list(request):
     except EmptyPage:
         posts = paginator.page(paginator.num_pages)  # Если страница вне диапазона, показываем последнюю
     
-    categories = Category.objects.annotate(post_count=Count('posts'))  # Категории с количеством постов
+    categories = Category.with_post_counts()  # Категории с количеством постов (из кэша)
     
     context = {
         'posts': posts,
@@ -81,15 +91,37 @@ def post_list(request):
     }
     return render(request, 'blog/post_list.html', context)
 
+def tag_posts(request, slug):
+    """Опубликованные посты с тегом (выборка по индексу связи тег-пост)"""
+    site_settings = get_site_settings()
+    tag = get_object_or_404(Tag, slug=slug)
+    posts_list = Post.objects.filter(status='published', post_tags__tag=tag).select_related('author', 'category')
+
+    paginator = Paginator(posts_list, site_settings.posts_per_page)  # Пагинация
+    page = request.GET.get('page')
+    try:
+        posts = paginator.page(page)  # Получаем нужную страницу
+    except PageNotAnInteger:
+        posts = paginator.page(1)  # Если страница не число, показываем первую
+    except EmptyPage:
+        posts = paginator.page(paginator.num_pages)  # Если страница вне диапазона, показываем последнюю
+
+    context = {
+        'posts': posts,
+        'tag': tag,
+        'site_settings': site_settings,
+    }
+    return render(request, 'blog/post_list.html', context)
+
 def post_detail(request, pk, slug=None):
     """Детальная страница поста с комментариями и формой лайка"""
     # Получаем пост с связанными данными для оптимизации запросов
     post = get_object_or_404(
-        Post.objects.select_related('author', 'category').prefetch_related('comments__author'),
+        Post.objects.select_related('author', 'category').prefetch_related('comments__author', 'tag_set'),
         pk=pk, status='published'
     )
-    post.views += 1  # Увеличиваем счетчик просмотров
-    post.save()
+    Post.objects.filter(pk=post.pk).update(views=F('views') + 1)  # Атомарно, без перезаписи остальных полей
+    post.views += 1  # Счетчик автора (AuthorStats.views_received) обновляет ночная сверка, без второго UPDATE на каждый просмотр
     
     # Получаем только родительские комментарии (без ответов) в порядке убывания
     comments = post.comments.filter(is_active=True, parent=None).order_by('-created_date')
@@ -101,9 +133,12 @@ def post_detail(request, pk, slug=None):
     if request.user.is_authenticated:
         user_liked = post.likes.filter(id=request.user.id).exists()  # Проверяем, лайкнул ли пользователь пост
     
+    related_posts = RelatedPost.objects.filter(post=post, related__status='published').select_related('related')  # Готовый список (фоновая задача)
+    
     context = {
         'post': post,
         'comments': comments,
+        'related_posts': related_posts,
         'comment_form': comment_form,
         'reply_form': reply_form,
         'user_liked': user_liked,
@@ -155,14 +190,20 @@ def post_edit(request, pk):
         messages.error(request, 'Вы заблокированы и не можете редактировать посты.')
         return redirect('post_detail', pk=post.pk, slug=post.slug)
     
+    draft = drafts.load(post)  # Автосохраненный черновик или текущая версия поста (версия 0)
     if request.method == 'POST':
         form = PostForm(request.POST, request.FILES, instance=post)  # Заполняем форму данными поста
         if form.is_valid():
-            post = form.save()  # Сохраняем обновленный пост
+            post.edited_by = request.user  # Редактор ревизии (может быть администратор)
+            post = form.save()  # Сохраняем обновленный пост, прежняя версия остается в истории ревизий
+            drafts.discard(post.pk)  # Автосохраненный черновик применен
             messages.success(request, 'Пост успешно обновлен!')
             return redirect('post_detail', pk=post.pk, slug=post.slug)
     else:
-        form = PostForm(instance=post)  # Заполняем форму текущими данными поста
+        initial = {'title': draft['title'], 'content': draft['content']} if draft['version'] else None
+        form = PostForm(instance=post, initial=initial)  # Текущие данные поста или несохраненный черновик
+        if initial and (draft['title'], draft['content']) != (post.title, post.content):
+            messages.info(request, 'Восстановлен автосохраненный черновик. Сохраните пост, чтобы применить его.')
     
     categories = Category.objects.all()
     
@@ -170,6 +211,7 @@ def post_edit(request, pk):
         'form': form,
         'title': 'Редактировать пост',
         'post': post,
+        'draft_version': draft['version'],  # Версия, от которой автосохранение отправляет дельты
         'categories': categories,
         'site_settings': get_site_settings(),
     }
@@ -191,6 +233,7 @@ def post_like(request, pk):
     else:
         post.likes.add(request.user)  # Добавляем лайк
         liked = True
+        notify_like(request.user, post)  # Лайки за окно объединяются в одно уведомление
     
     # Возвращаем JSON ответ с новым статусом и количеством лайков
     return JsonResponse({'liked': liked, 'like_count': post.like_count()})
@@ -269,8 +312,10 @@ def comment_create(request, post_pk):
         comment = form.save(commit=False)  # Сохраняем без фиксации в БД
         comment.post = post  # Связываем комментарий с постом
         comment.author = request.user  # Устанавливаем автора комментария
+        pending = comment.hold_for_moderation(request.user)  # При включенной модерации комментарий скрыт до одобрения
         comment.save()  # Сохраняем в базу данных
-        messages.success(request, 'Ваш комментарий опубликован.')
+        broadcast_comment(comment)  # Читатели поста получат комментарий без перезагрузки (если он опубликован)
+        messages.success(request, 'Ваш комментарий отправлен на модерацию.' if pending else 'Ваш комментарий опубликован.')
     
     return redirect('post_detail', pk=post_pk, slug=post.slug)  # Возвращаемся к посту
 
@@ -290,11 +335,52 @@ def reply_create(request, comment_pk):
         reply.post = parent_comment.post  # Связываем ответ с постом
         reply.author = request.user  # Устанавливаем автора ответа
         reply.parent = parent_comment  # Устанавливаем родительский комментарий
+        pending = reply.hold_for_moderation(request.user)  # При включенной модерации ответ скрыт до одобрения
         reply.save()  # Сохраняем в базу данных
-        messages.success(request, 'Ваш ответ опубликован.')
+        broadcast_comment(reply)  # Читатели поста получат ответ без перезагрузки (если он опубликован)
+        messages.success(request, 'Ваш ответ отправлен на модерацию.' if pending else 'Ваш ответ опубликован.')
     
     return redirect('post_detail', pk=parent_comment.post.pk, slug=parent_comment.post.slug)
 
+def pending_comments_page(after=0, limit=MODERATION_PAGE_SIZE):
+    """Страница очереди модерации по индексу (status, id): комментарии и id для следующей страницы"""
+    comments = list(
+        Comment.objects.filter(status='pending', pk__gt=after)
+        .select_related('author', 'post').order_by('pk')[:limit + 1]
+    )
+    next_after = comments[limit - 1].pk if len(comments) > limit else None
+    return comments[:limit], next_after
+
+def parse_after(value):
+    try:
+        return max(int(value or 0), 0)
+    except (TypeError, ValueError):
+        return 0
+
+@staff_member_required  # Только staff
+def comment_moderation(request):
+    """Очередь комментариев на модерации с массовым одобрением и отклонением"""
+    if request.method == 'POST':
+        comment_ids = [int(pk) for pk in request.POST.getlist('comment_ids') if pk.isdigit()]  # Отмеченные комментарии
+        action = request.POST.get('action')
+        if action == 'approve':
+            messages.success(request, f'Одобрено комментариев: {Comment.approve(comment_ids)}')  # Один UPDATE, уведомления в Celery
+        elif action == 'reject':
+            messages.success(request, f'Отклонено комментариев: {Comment.reject(comment_ids)}')  # Один UPDATE
+        after = parse_after(request.POST.get('after'))
+        return redirect(f"{reverse('comment_moderation')}?after={after}" if after else 'comment_moderation')
+
+    after = parse_after(request.GET.get('after'))
+    comments, next_after = pending_comments_page(after)
+    context = {
+        'comments': comments,
+        'after': after,
+        'next_after': next_after,
+        'pending_count': Comment.objects.filter(status='pending').count(),  # Подсчет по индексу очереди
+        'site_settings': get_site_settings(),
+    }
+    return render(request, 'blog/comment_moderation.html', context)
+
 @login_required  # Только авторизованные пользователи
 @require_POST  # Только POST запросы
 def comment_like(request, comment_pk):
@@ -302,7 +388,7 @@ def comment_like(request, comment_pk):
     if is_user_banned(request.user):
         return JsonResponse({'error': 'Вы заблокированы'}, status=403)
     
-    comment = get_object_or_404(Comment, pk=comment_pk)  # Получаем комментарий
+    comment = get_object_or_404(Comment.objects.select_related('post'), pk=comment_pk)  # Получаем комментарий с постом (для уведомления)
     
     # Переключаем статус лайка
     if comment.likes.filter(id=request.user.id).exists():
@@ -311,20 +397,25 @@ def comment_like(request, comment_pk):
     else:
         comment.likes.add(request.user)  # Добавляем лайк
         liked = True
+        notify_like(request.user, comment.post, comment)  # Лайки за окно объединяются в одно уведомление
     
     # Возвращаем JSON ответ
     return JsonResponse({'liked': liked, 'like_count': comment.like_count()})
 
 @login_required  # Только для авторизованных пользователей
 def profile(request):
-    """Личный кабинет пользователя - показывает посты, комментарии и уведомления"""
-    user_posts = Post.objects.filter(author=request.user).order_by('-created_date')  # Посты пользователя
-    user_comments = Comment.objects.filter(author=request.user).order_by('-created_date')  # Комментарии пользователя
+    """Личный кабинет пользователя - посты, комментарии (постранично), счетчики и уведомления"""
+    user_posts = (
+        Post.objects.filter(author=request.user).select_related('category')
+        .annotate(comment_total=active_comment_count()).order_by('-created_date', '-pk')
+    )  # Посты пользователя с числом комментариев без запроса на строку
+    user_comments = Comment.objects.filter(author=request.user).select_related('post').order_by('-created_date', '-pk')  # Комментарии с постами одним JOIN
     notifications = Notification.objects.filter(user=request.user, is_read=False)[:5]  # Последние 5 непрочитанных уведомлений
     
     context = {
-        'user_posts': user_posts,
-        'user_comments': user_comments,
+        'user_posts': Paginator(user_posts, PROFILE_PAGE_SIZE).get_page(request.GET.get('posts_page')),
+        'user_comments': Paginator(user_comments, PROFILE_PAGE_SIZE).get_page(request.GET.get('comments_page')),
+        'stats': AuthorStats.for_user(request.user.pk),  # Готовые счетчики вместо COUNT(*)
         'notifications': notifications,
         'site_settings': get_site_settings(),
     }
@@ -335,16 +426,18 @@ def profile_edit(request):
     """Редактирование профиля пользователя"""
     if request.method == 'POST':
         user_form = UserUpdateForm(request.POST, instance=request.user)  # Форма обновления данных пользователя
-        profile_form = UserProfileForm(request.POST, request.FILES, instance=request.user.profile)  # Форма профиля
+        profile_form = UserProfileForm(request.POST, request.FILES, instance=UserProfile.for_user(request.user))  # Форма профиля
         
         if user_form.is_valid() and profile_form.is_valid():
-            user_form.save()  # Сохраняем обновленные данные пользователя
-            profile_form.save()  # Сохраняем обновленный профиль
+            if user_form.has_changed():
+                user_form.save()  # Сохраняем обновленные данные пользователя
+            if profile_form.has_changed():
+                profile_form.save()  # Сохраняем только измененный профиль
             messages.success(request, 'Ваш профиль обновлен!')
             return redirect('profile')
     else:
         user_form = UserUpdateForm(instance=request.user)  # Заполняем формы текущими данными
-        profile_form = UserProfileForm(instance=request.user.profile)
+        profile_form = UserProfileForm(instance=UserProfile.for_user(request.user))
     
     context = {
         'user_form': user_form,
@@ -371,7 +464,7 @@ def change_password(request):
 
 def user_list(request):
     """Список всех пользователей сайта с пагинацией"""
-    users = User.objects.filter(is_active=True).select_related('profile').order_by('-date_joined')  # Только активные пользователи
+    users = User.objects.filter(is_active=True).select_related('profile', 'stats').order_by('-date_joined')  # Только активные пользователи с готовыми счетчиками
     paginator = Paginator(users, 20)  # 20 пользователей на страницу
     page = request.GET.get('page')
     try:
@@ -386,47 +479,56 @@ def user_list(request):
 
 def user_profile(request, username):
     """Публичный профиль пользователя - доступен всем посетителям"""
-    user = get_object_or_404(User, username=username)  # Получаем пользователя по username или 404
-    posts = Post.objects.filter(author=user, status='published').order_by('-published_date')  # Опубликованные посты автора
-    comments = Comment.objects.filter(author=user, is_active=True).order_by('-created_date')[:10]  # Последние 10 активных комментариев
+    user = get_object_or_404(User.objects.select_related('profile'), username=username)  # Получаем пользователя по username или 404
+    posts = (
+        Post.objects.filter(author=user, status='published').select_related('category')
+        .annotate(comment_total=active_comment_count()).order_by('-published_date', '-pk')
+    )  # Опубликованные посты автора с числом комментариев
+    comments = Comment.objects.filter(author=user, is_active=True).select_related('post').order_by('-created_date')[:10]  # Последние 10 активных комментариев
     
     context = {
         'profile_user': user,  # Пользователь чей профиль просматривается
-        'posts': posts,
+        'posts': Paginator(posts, PROFILE_PAGE_SIZE).get_page(request.GET.get('page')),
         'comments': comments,
+        'stats': AuthorStats.for_user(user.pk),  # Готовые счетчики автора
+        'is_following': request.user.is_authenticated and Follow.objects.filter(follower=request.user, author=user).exists(),
         'site_settings': get_site_settings(),
     }
     return render(request, 'blog/user_public_profile.html', context)
 
+@login_required  # Только авторизованные пользователи
+@require_POST  # Только POST запросы
+def user_follow(request, username):
+    """Подписка на автора или отмена подписки"""
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        if Follow.unfollow(request.user.pk, author.pk):
+            messages.info(request, f'Вы отписались от {author.username}.')
+        else:
+            Follow.follow(request.user.pk, author.pk)
+            messages.success(request, f'Вы подписались на {author.username}. Новые посты появятся в вашей ленте.')
+    return redirect('user_profile', username=author.username)
+
 def search(request):
-    """Поиск по постам и пользователям"""
+    """Поиск по постам и пользователям: отдельная постраничная выдача для каждого типа"""
     form = SearchForm(request.GET)  # Форма поиска с GET параметрами
-    results = []  # Список результатов поиска
+    posts_page = users_page = None  # Страницы результатов (None, если тип не ищется)
     
     if form.is_valid() and form.cleaned_data['query']:
         query = form.cleaned_data['query']  # Поисковый запрос
-        search_in = form.cleaned_data['search_in']  # Где искать (посты, пользователи или все)
+        search_in = form.cleaned_data['search_in'] or 'all'  # Где искать (посты, пользователи или все)
         
         if search_in in ['all', 'posts']:
-            # Поиск по постам: заголовок, содержимое, краткое описание, теги
-            posts = Post.objects.filter(
-                Q(title__icontains=query) | Q(content__icontains=query) |
-                Q(excerpt__icontains=query) | Q(tags__icontains=query),
-                status='published'
-            )
-            results.extend(posts)  # Добавляем посты к результатам
+            posts_page = search_paginate(search_posts(query), request.GET.get('posts_page'))  # Одна страница постов с LIMIT
         
         if search_in in ['all', 'users']:
-            # Поиск по пользователям: логин, имя, фамилия, email
-            users = User.objects.filter(
-                Q(username__icontains=query) | Q(first_name__icontains=query) |
-                Q(last_name__icontains=query) | Q(email__icontains=query)
-            )
-            results.extend(users)  # Добавляем пользователей к результатам
+            users_page = search_paginate(search_users(query), request.GET.get('users_page'))  # Одна страница пользователей с LIMIT
     
     context = {
         'form': form,
-        'results': results,
+        'posts_page': posts_page,
+        'users_page': users_page,
+        'results': list(chain(posts_page or [], users_page or [])),  # Объединенная выдача текущих страниц
         'query': form.cleaned_data.get('query', ''),  # Передаем поисковый запрос обратно в форму
         'site_settings': get_site_settings(),
     }
@@ -51,6 +51,7 @@ INSTALLED_APPS = [  # Список установленных Django прило
     'django.contrib.sessions',  # Фреймворк сессий Django
     'django.contrib.messages',  # Фреймворк сообщений Django
     'django.contrib.staticfiles',  # Фреймворк для работы со статическими файлами
+    'django.contrib.postgres',  # Поиск по сходству trigram_similar для подсказок (pg_trgm)
     
     # Сторонние приложения
     'rest_framework',  # Django REST Framework для создания API
@@ -141,6 +142,26 @@ CACHES = {  # Настройка системы кэширования Django
     }
 }
 
+# L1 кэш в памяти процесса поверх Redis для сверхгорячих ключей (blog.cache_backends.TieredRedisCache)
+CACHE_L1_ENABLED = get_env_var('CACHE_L1_ENABLED', False, cast=bool)  # Включить L1 слой для алиасов из CACHE_L1_ALIASES
+CACHE_L1_ALIASES = parse_csv(get_env_var('CACHE_L1_ALIASES', 'default'))  # Алиасы кэша, использующие L1
+CACHE_L1_OPTIONS = {  # Опции L1 слоя (добавляются к OPTIONS алиаса)
+    'L1_MAX_ENTRIES': get_env_var('CACHE_L1_MAX_ENTRIES', 1024, cast=int),  # Размер LRU в каждом процессе
+    'L1_TIMEOUT': 0,  # Ключи вне перечисленных семейств в L1 не кэшируются
+    'L1_KEY_FAMILIES': {  # TTL в L1 (секунды) по префиксу ключа
+        'site_settings': 60,  # Настройки сайта
+        'categories': 60,  # Списки категорий
+        'auth_principal': 30,  # Принципалы JWT аутентификации (сбрасываются при блокировке и смене прав)
+        'autocomplete': 5,  # Ответы подсказок при вводе
+        'django.contrib.sessions.cache': 5,  # Сессии (короткий TTL - данные меняются при входе/выходе)
+    },
+}
+if CACHE_L1_ENABLED:  # Переключаем выбранные алиасы на многоуровневый backend
+    for _alias in CACHE_L1_ALIASES:
+        if _alias in CACHES:
+            CACHES[_alias]['BACKEND'] = 'blog.cache_backends.TieredRedisCache'
+            CACHES[_alias]['OPTIONS'] = {**CACHES[_alias].get('OPTIONS', {}), **CACHE_L1_OPTIONS}
+
 # Fallback для разработки без Redis
 if get_env_var('USE_LOCAL_CACHE', False, cast=bool):  # Если включен локальный кэш вместо Redis
     CACHES = {  # Перенастраиваем на локальный кэш
@@ -171,7 +192,7 @@ CHANNEL_LAYERS = {  # Настройка слоя каналов для Django C
 # Конфигурация Django REST Framework
 REST_FRAMEWORK = {  # Настройки Django REST Framework
     'DEFAULT_AUTHENTICATION_CLASSES': [  # Классы аутентификации по умолчанию
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  # JWT аутентификация
+        'blog.api.authentication.CachedJWTAuthentication',  # JWT аутентификация (пользователь из кэша, без запроса к БД)
         'rest_framework.authentication.SessionAuthentication',  # Сессионная аутентификация Django
     ],
     'DEFAULT_PERMISSION_CLASSES': [  # Классы разрешений по умолчанию
@@ -209,6 +230,9 @@ SIMPLE_JWT = {  # Настройки Simple JWT токенов
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),  # Время жизни refresh токена (7 дней)
     'ROTATE_REFRESH_TOKENS': True,  # Генерация нового refresh токена при каждом обновлении
 }
+AUTH_PRINCIPAL_CACHE_TIMEOUT = 300  # Время жизни кэшированного принципала (id, права, блокировка) в секундах
+AUTOCOMPLETE_CACHE_TIMEOUT = get_env_var('AUTOCOMPLETE_CACHE_TIMEOUT', 30, cast=int)  # Время жизни ответа подсказок в секундах
+AUTOCOMPLETE_LIMIT = get_env_var('AUTOCOMPLETE_LIMIT', 8, cast=int)  # Подсказок каждого типа в ответе
 
 # Настройки CORS
 CORS_ALLOWED_ORIGINS = [  # Список разрешенных источников для CORS запросов
@@ -324,6 +348,8 @@ STATICFILES_DIRS = [  # Дополнительные директории со 
 # Медиа файлы
 MEDIA_URL = '/media/'  # URL для доступа к загруженным файлам пользователей
 MEDIA_ROOT = BASE_DIR / 'media'  # Директория для хранения загруженных файлов
+DEFAULT_FILE_STORAGE = 'blog.storage.ContentAddressedStorage'  # Файлы хранятся по хэшу содержимого (media/blobs/), дубликаты не копируются
+MEDIA_BLOB_GC_GRACE_HOURS = 24  # gc_media не удаляет блобы, изменявшиеся за последние N часов
 
 # WhiteNoise временно отключен
 # STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
@@ -351,6 +377,33 @@ CELERY_ACCEPT_CONTENT = ['json']  # Типы контента, принимае
 CELERY_TASK_SERIALIZER = 'json'  # Сериализатор задач Celery
 CELERY_RESULT_SERIALIZER = 'json'  # Сериализатор результатов Celery
 CELERY_TIMEZONE = TIME_ZONE  # Часовой пояс для Celery
+SCHEDULED_PUBLISH_SWEEP_INTERVAL = get_env_var('SCHEDULED_PUBLISH_SWEEP_INTERVAL', 60, cast=int)  # Период обхода отложенных публикаций в секундах (сами посты публикуют таймеры)
+CELERY_BEAT_SCHEDULE = {  # Периодические задачи (celery -A myblog beat)
+    'cleanup-chunked-uploads': {
+        'task': 'blog.tasks.cleanup_chunked_uploads',  # Удаление брошенных загрузок по частям
+        'schedule': 3600.0,  # Раз в час
+    },
+    'expire-bans': {
+        'task': 'blog.tasks.expire_bans',  # Снятие истекших блокировок одним UPDATE
+        'schedule': 300.0,  # Каждые 5 минут
+    },
+    'archive-notifications': {
+        'task': 'blog.tasks.archive_notifications',  # Перенос старых прочитанных уведомлений в архив пакетами
+        'schedule': 3600.0,  # Раз в час (каждый запуск переносит только накопившееся за час)
+    },
+    'rebuild-related-posts': {
+        'task': 'blog.tasks.rebuild_related_posts',  # Полный пересчет похожих постов (уточняет инкрементальные обновления)
+        'schedule': 86400.0,  # Раз в сутки
+    },
+    'reconcile-author-stats': {
+        'task': 'blog.tasks.reconcile_author_stats',  # Полная сверка счетчиков авторов (исправляет расхождения инкрементальных обновлений)
+        'schedule': 86400.0,  # Раз в сутки
+    },
+    'publish-scheduled-posts': {
+        'task': 'blog.tasks.publish_scheduled_posts',  # Публикация наступивших и взвод таймеров ближайших отложенных постов
+        'schedule': float(SCHEDULED_PUBLISH_SWEEP_INTERVAL),  # Раз в минуту (страховка таймеров, потерянных брокером)
+    },
+}
 
 # Debug Toolbar (только в разработке)
 if DEBUG:  # Если включен режим отладки
@@ -399,6 +452,49 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB - максимальный разм
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB - максимальный размер данных для загрузки
 FILE_UPLOAD_PERMISSIONS = 0o644  # Права доступа для загружаемых файлов
 FILE_UPLOAD_DIRECTORY_PERMISSIONS = 0o755  # Права доступа для директорий загрузки
+FILE_UPLOAD_HANDLERS = ['blog.uploads.LimitedImageUploadHandler']  # Потоковая запись на диск с проверкой размера и сигнатуры
+IMAGE_UPLOAD_MAX_SIZE = get_env_var('FILE_UPLOAD_MAX_SIZE', 5242880, cast=int)  # 5MB - максимальный размер изображения в форме
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000  # Максимальное число пикселей (проверяется по заголовку файла)
+IMAGE_UPLOAD_CONTENT_TYPES = {  # Разрешенные типы изображений и форматы Pillow
+    'image/jpeg': 'JPEG',
+    'image/png': 'PNG',
+    'image/gif': 'GIF',
+    'image/webp': 'WEBP',
+}
+CHUNKED_UPLOAD_MAX_SIZE = get_env_var('CHUNKED_UPLOAD_MAX_SIZE', 52428800, cast=int)  # 50MB - максимальный размер файла при загрузке по частям
+CHUNKED_UPLOAD_CHUNK_SIZE = 5242880  # 5MB - максимальный размер одной части
+CHUNKED_UPLOAD_DIR = BASE_DIR / 'tmp' / 'uploads'  # Незавершенные загрузки (вне MEDIA_ROOT)
+CHUNKED_UPLOAD_EXPIRE_HOURS = 24  # Через сколько часов брошенная загрузка удаляется
+
+# Хранение уведомлений (архивацию выполняет Celery задача blog.tasks.archive_notifications)
+NOTIFICATION_RETENTION_DAYS = get_env_var('NOTIFICATION_RETENTION_DAYS', 30, cast=int)  # Прочитанные уведомления старше этого переносятся в архив
+NOTIFICATION_ARCHIVE = get_env_var('NOTIFICATION_ARCHIVE', True, cast=bool)  # False - удалять старые прочитанные уведомления без архива
+NOTIFICATION_ARCHIVE_DAYS = get_env_var('NOTIFICATION_ARCHIVE_DAYS', 365, cast=int)  # Срок хранения архива (0 - бессрочно)
+NOTIFICATION_RETENTION_BATCH_SIZE = 1000  # Строк в одной транзакции архивации
+NOTIFICATION_COALESCE_MINUTES = 60  # Лайки одного поста за это окно объединяются в одно уведомление
+NOTIFICATION_PUSH_INTERVAL = 10  # Не чаще одного WebSocket сообщения получателю за столько секунд
+
+# Похожие посты (считаются Celery задачами blog.tasks.update_related_posts и rebuild_related_posts)
+RELATED_POSTS_LIMIT = get_env_var('RELATED_POSTS_LIMIT', 5, cast=int)  # Похожих постов на странице поста
+RELATED_POSTS_STATS_TIMEOUT = get_env_var('RELATED_POSTS_STATS_TIMEOUT', 2 * 24 * 3600, cast=int)  # Время жизни частот слов ночной пересборки для инкрементальных пересчетов
+
+# Рендеринг содержимого постов (HTML, оглавление и время чтения строятся при сохранении)
+RENDER_INLINE_MAX_LENGTH = get_env_var('RENDER_INLINE_MAX_LENGTH', 20000, cast=int)  # Посты длиннее (символов) рендерит Celery задача blog.tasks.render_post_content
+
+# Автосохранение черновиков правки (рабочая копия в кэше, запись в БД задачей blog.tasks.persist_post_draft)
+DRAFT_CACHE_TIMEOUT = get_env_var('DRAFT_CACHE_TIMEOUT', 7 * 24 * 3600, cast=int)  # Время жизни черновика в кэше в секундах
+DRAFT_PERSIST_DELAY = get_env_var('DRAFT_PERSIST_DELAY', 30, cast=int)  # Черновик пишется в БД не чаще раза в столько секунд
+
+# Лента подписок (id постов в Redis на пользователя, рассылка задачами blog.tasks.fan_out_posts и push_to_timelines)
+FEED_LENGTH = get_env_var('FEED_LENGTH', 500, cast=int)  # Сколько последних постов хранит лента пользователя
+FEED_CACHE_TIMEOUT = get_env_var('FEED_CACHE_TIMEOUT', 7 * 24 * 3600, cast=int)  # Лента неактивного пользователя истекает и строится заново из БД
+FEED_FANOUT_MAX_FOLLOWERS = get_env_var('FEED_FANOUT_MAX_FOLLOWERS', 10000, cast=int)  # Посты авторов с большим числом подписчиков читаются из БД при показе ленты
+
+# Обработка изображений (уменьшенные копии генерируются Celery задачами blog.tasks)
+IMAGE_MAX_DIMENSION = 2560  # Максимальная сторона оригинала после обработки (пиксели)
+IMAGE_QUALITY = 82  # Качество сжатия WebP/JPEG копий
+POST_IMAGE_SIZES = {'thumb': 480, 'large': 1280}  # Копии изображения поста: списки и детальная страница
+AVATAR_SIZES = {'small': 96, 'medium': 240}  # Копии аватара: списки пользователей и страница профиля
 
 # Настройки админ-панели
 ADMIN_URL = 'admin/'  # URL для доступа к админ-панели
@@ -66,6 +66,13 @@ CACHES = {
     }
 }
 
+# L1 кэш в памяти процесса (CACHE_L1_ENABLED/CACHE_L1_ALIASES, например "default,api_cache,sessions")
+if CACHE_L1_ENABLED:
+    for _alias in CACHE_L1_ALIASES:
+        if _alias in CACHES:
+            CACHES[_alias]['BACKEND'] = 'blog.cache_backends.TieredRedisCache'
+            CACHES[_alias]['OPTIONS'] = {**CACHES[_alias].get('OPTIONS', {}), **CACHE_L1_OPTIONS}
+
 # Сессии через Redis для лучшей производительности
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'sessions'
@@ -120,7 +127,7 @@ connections['default'].cursor().execute("SET application_name = 'Matrix Blog Pro
 # Django REST Framework - максимальная оптимизация
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'blog.api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [